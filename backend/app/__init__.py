@@ -33,6 +33,33 @@ def create_app(config_name='default'):
     # 初始化扩展
     CORS(app)
 
+    # 初始化进程级YOLO模型注册表
+    from .services.yolo_model_registry import model_registry
+    model_registry.init_app(app)
+
+    # 按CPU核心数和请求并发数分配各计算库的线程数
+    from .services.thread_budget import thread_budget
+    thread_budget.init_app(app)
+
+    # 按图像内容哈希缓存YOLO和OpenCV的分析结果
+    from .services.result_cache import result_cache
+    result_cache.init_app(app)
+
+    if app.config.get('INFERENCE_WORKERS', 0) > 0:
+        # 多进程推理：各工作进程绑定CPU并自行预加载模型
+        from .services.inference_workers import InferenceWorkerPool
+        pool = InferenceWorkerPool(app.config['INFERENCE_WORKERS'],
+                                   app.config.get('INFERENCE_WORKER_CPUS', 0),
+                                   config_name,
+                                   app.config.get('INFERENCE_WORKER_TIMEOUT', 300))
+        pool.start(wait=not app.config.get('YOLO_PRELOAD_ASYNC', False))
+        model_registry.worker_pool = pool
+    else:
+        # 预加载并预热配置的模型，避免首个请求等待模型下载和加载
+        model_registry.preload(app.config.get('YOLO_PRELOAD', []),
+                               background=app.config.get('YOLO_PRELOAD_ASYNC', False),
+                               required=app.config.get('YOLO_PRELOAD_REQUIRED', []))
+
     # 注册蓝图
     try:
         from .api import api_bp
@@ -47,8 +74,9 @@ def create_app(config_name='default'):
     except ImportError as e:
         app.logger.warning(f"主蓝图导入失败: {e}")
 
-    # 配置日志
-    if not app.debug and not app.testing:
+    # 配置日志（推理工作进程不写日志文件，避免多个进程轮转同一文件）
+    from .services.inference_workers import WORKER_ID_ENV
+    if not app.debug and not app.testing and WORKER_ID_ENV not in os.environ:
         if not os.path.exists('logs'):
             os.mkdir('logs')
         file_handler = RotatingFileHandler('logs/gemini_app.log',
@@ -60,3 +60,10 @@ try:
 except ImportError as e:
     import logging
     logging.warning(f"视频生成API模块导入失败: {e}")
+
+try:
+    from . import runtime
+    print("✅ 运行时诊断API模块导入成功")
+except ImportError as e:
+    import logging
+    logging.warning(f"运行时诊断API模块导入失败: {e}")
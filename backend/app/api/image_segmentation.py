@@ -6,11 +6,34 @@
 
 from flask import request, jsonify, current_app
 from . import api_bp
+from ..utils.helpers import parse_bool_param, is_positive_int, save_batch_request_uploads, batch_ndjson_response
+from ..services.yolo_backends import SUPPORTED_BACKENDS, SUPPORTED_PRECISIONS
+from ..services.segmentation_output import SEGMENTATION_OUTPUT_FORMATS, is_valid_output_format
+from ..services.yolo_resolution import is_valid_imgsz
 import tempfile
 import base64
 import os
 
 
+_shared_services = {}
+
+
+def _get_shared_service(key, factory):
+    """获取进程内共享的服务实例（OpenCV、YOLO），避免每个请求重新初始化"""
+    service = _shared_services.get(key)
+    if service is None:
+        service = _shared_services.setdefault(key, factory())
+    return service
+
+
+def _invalid_output_format(output_format):
+    """不支持的掩码输出格式"""
+    return jsonify({
+        'success': False,
+        'error': f'不支持的输出格式: {output_format}，可选: {", ".join(SEGMENTATION_OUTPUT_FORMATS)}'
+    }), 400
+
+
 def get_segmentation_services(api_key=None):
     """获取图像分割服务实例"""
     try:
@@ -29,8 +52,8 @@ def get_segmentation_services(api_key=None):
 
         return {
             'gemini': ImageSegmentationService(client),
-            'opencv': OpenCVService(),
-            'yolo': YOLOSegmentationService()
+            'opencv': _get_shared_service('opencv', OpenCVService),
+            'yolo': _get_shared_service('yolo', YOLOSegmentationService)
         }
     except Exception as e:
         current_app.logger.error(f"初始化图像分割服务失败: {e}")
@@ -61,6 +84,7 @@ def image_segmentation():
     支持的参数:
     - image: 图像文件
     - object_name: 要分割的对象名称
+    - output_format: 掩码输出格式 png/rle/polygon/label_map，默认png
     """
     try:
         # 获取用户API key
@@ -79,14 +103,21 @@ def image_segmentation():
             data = request.get_json()
             object_name = data.get('object_name', '')
             image_data = data.get('image_data')
+            output_format = data.get('output_format')
+            if not is_valid_output_format(output_format):
+                return _invalid_output_format(output_format)
             result, status_code = services['gemini'].segment_image(
                 file=None,
                 object_name=object_name,
-                image_data=image_data
+                image_data=image_data,
+                output_format=output_format
             )
         else:
             file = request.files.get('image')
             object_name = request.form.get('object_name', '')
+            output_format = request.form.get('output_format')
+            if not is_valid_output_format(output_format):
+                return _invalid_output_format(output_format)
 
             if not file:
                 return jsonify({
@@ -96,7 +127,8 @@ def image_segmentation():
 
             result, status_code = services['gemini'].segment_image(
                 file=file,
-                object_name=object_name
+                object_name=object_name,
+                output_format=output_format
             )
 
         # 对于内容不匹配的情况，返回200状态码让前端正确处理
@@ -134,20 +166,28 @@ def opencv_segmentation():
             method = data.get('method', 'contour_mask')
             object_name = data.get('object_name', '')
             image_data = data.get('image_data')
+            output_format = data.get('output_format')
+            if not is_valid_output_format(output_format):
+                return _invalid_output_format(output_format)
             result, status_code = services['opencv'].segment_image_opencv(
                 file=None,
                 image_data=image_data,
                 method=method,
-                object_name=object_name
+                object_name=object_name,
+                output_format=output_format
             )
         else:
             file = request.files.get('image')
             method = request.form.get('method', 'contour_mask')
             object_name = request.form.get('object_name', '')
+            output_format = request.form.get('output_format')
+            if not is_valid_output_format(output_format):
+                return _invalid_output_format(output_format)
             result, status_code = services['opencv'].segment_image_opencv(
                 file=file,
                 method=method,
-                object_name=object_name
+                object_name=object_name,
+                output_format=output_format
             )
 
         # 对于内容不匹配的情况，返回200状态码让前端正确处理
@@ -185,24 +225,64 @@ def yolo_segmentation():
             model_name = data.get('model_name', 'yolo11n-seg')
             confidence = float(data.get('confidence', 0.5))
             user_query = data.get('user_query', '')
+            single_pass = parse_bool_param(data.get('single_pass'))
+            backend = data.get('backend')
+            precision = data.get('precision')
+            imgsz = data.get('imgsz')
+            tiled = parse_bool_param(data.get('tiled'), False)
+            output_format = data.get('output_format')
             image_data = data.get('image_data')
+            if backend and backend.lower() not in SUPPORTED_BACKENDS:
+                return jsonify({'success': False, 'error': f'不支持的推理后端: {backend}'}), 400
+            if precision and precision.lower() not in SUPPORTED_PRECISIONS:
+                return jsonify({'success': False, 'error': f'不支持的推理精度: {precision}'}), 400
+            if not is_valid_imgsz(imgsz):
+                return jsonify({'success': False, 'error': f'无效的推理尺寸: {imgsz}'}), 400
+            if not is_valid_output_format(output_format):
+                return _invalid_output_format(output_format)
             result, status_code = services['yolo'].segment_image_yolo(
                 file=None,
                 image_data=image_data,
                 model_name=model_name,
                 confidence=confidence,
-                user_query=user_query
+                user_query=user_query,
+                single_pass=single_pass,
+                backend=backend,
+                precision=precision,
+                imgsz=imgsz,
+                tiled=tiled,
+                output_format=output_format
             )
         else:
             file = request.files.get('image')
             model_name = request.form.get('model_name', 'yolo11n-seg')
             confidence = float(request.form.get('confidence', 0.5))
             user_query = request.form.get('user_query', '')
+            single_pass = parse_bool_param(request.form.get('single_pass'))
+            backend = request.form.get('backend')
+            precision = request.form.get('precision')
+            imgsz = request.form.get('imgsz')
+            tiled = parse_bool_param(request.form.get('tiled'), False)
+            output_format = request.form.get('output_format')
+            if backend and backend.lower() not in SUPPORTED_BACKENDS:
+                return jsonify({'success': False, 'error': f'不支持的推理后端: {backend}'}), 400
+            if precision and precision.lower() not in SUPPORTED_PRECISIONS:
+                return jsonify({'success': False, 'error': f'不支持的推理精度: {precision}'}), 400
+            if not is_valid_imgsz(imgsz):
+                return jsonify({'success': False, 'error': f'无效的推理尺寸: {imgsz}'}), 400
+            if not is_valid_output_format(output_format):
+                return _invalid_output_format(output_format)
             result, status_code = services['yolo'].segment_image_yolo(
                 file=file,
                 model_name=model_name,
                 confidence=confidence,
-                user_query=user_query
+                user_query=user_query,
+                single_pass=single_pass,
+                backend=backend,
+                precision=precision,
+                imgsz=imgsz,
+                tiled=tiled,
+                output_format=output_format
             )
 
         # 对于内容不匹配的情况，返回200状态码让前端正确处理
@@ -219,6 +299,69 @@ def yolo_segmentation():
         }), 500
 
 
+@api_bp.route('/image-segmentation/yolo/batch', methods=['POST'])
+def yolo_segmentation_batch():
+    """
+    YOLO 批量图像分割，每张图像的结果完成后立即以一行NDJSON返回
+
+    支持的参数:
+    - images: 多个图像文件和/或zip压缩包
+    - model_name, confidence, user_query, backend, precision, imgsz, tiled, output_format: 与单张分割相同
+    - batch_size: 每次推理的图像数
+    """
+    try:
+        # 批量接口使用单独的请求体大小限制，需在读取表单之前设置
+        request.max_content_length = current_app.config['BATCH_MAX_CONTENT_LENGTH']
+        services = get_segmentation_services(api_key=request.headers.get('X-API-Key'))
+        if not services:
+            return jsonify({
+                'success': False,
+                'error': '服务初始化失败，请检查API密钥是否正确'
+            }), 500
+
+        files = request.files.getlist('images') + request.files.getlist('image')
+        model_name = request.form.get('model_name', 'yolo11n-seg')
+        confidence = float(request.form.get('confidence', 0.5))
+        user_query = request.form.get('user_query', '')
+        backend = request.form.get('backend')
+        precision = request.form.get('precision')
+        imgsz = request.form.get('imgsz')
+        tiled = parse_bool_param(request.form.get('tiled'), False)
+        output_format = request.form.get('output_format')
+        batch_size = request.form.get('batch_size', current_app.config.get('YOLO_BATCH_JOB_SIZE', 8))
+
+        if not files:
+            return jsonify({'success': False, 'error': '未选择文件'}), 400
+        if backend and backend.lower() not in SUPPORTED_BACKENDS:
+            return jsonify({'success': False, 'error': f'不支持的推理后端: {backend}'}), 400
+        if precision and precision.lower() not in SUPPORTED_PRECISIONS:
+            return jsonify({'success': False, 'error': f'不支持的推理精度: {precision}'}), 400
+        if not is_valid_imgsz(imgsz):
+            return jsonify({'success': False, 'error': f'无效的推理尺寸: {imgsz}'}), 400
+        if not is_valid_output_format(output_format):
+            return _invalid_output_format(output_format)
+        if not is_positive_int(batch_size):
+            return jsonify({'success': False, 'error': f'无效的批大小: {batch_size}'}), 400
+
+        try:
+            uploads = save_batch_request_uploads(files)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+
+        results = services['yolo'].segment_images_batch(
+            [path for _, path in uploads if path], model_name, confidence, user_query,
+            backend, precision, imgsz, tiled, output_format, int(batch_size)
+        )
+        return batch_ndjson_response(uploads, ((path, result) for path, result, _ in results))
+
+    except Exception as e:
+        current_app.logger.error(f"YOLO批量分割API错误: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': f'YOLO批量分割失败: {str(e)}'
+        }), 500
+
+
 @api_bp.route('/image-segmentation/compare', methods=['POST'])
 def compare_segmentation():
     """对比 Gemini、OpenCV 和 YOLO 的图像分割结果"""
@@ -9,7 +9,9 @@ from . import api_bp
 from ..services.object_detection_service import ObjectDetectionService
 from ..services.opencv_service import OpenCVService
 from ..services.yolo_detection_service import YOLODetectionService
-from ..utils.helpers import init_gemini_client, save_uploaded_file, allowed_file
+from ..utils.helpers import init_gemini_client, save_uploaded_file, allowed_file, parse_bool_param, is_positive_int, is_non_negative_int, is_non_negative_number, save_batch_request_uploads, batch_ndjson_response, ndjson_response
+from ..services.yolo_backends import SUPPORTED_BACKENDS, SUPPORTED_PRECISIONS
+from ..services.yolo_resolution import is_valid_imgsz
 import tempfile
 import base64
 import os
@@ -164,6 +166,11 @@ def yolo_detection():
             confidence = float(data.get('confidence', 0.5))
             # 支持两种参数名：user_query 和 object_name
             user_query = data.get('user_query', '') or data.get('object_name', '')
+            single_pass = parse_bool_param(data.get('single_pass'))
+            backend = data.get('backend')
+            precision = data.get('precision')
+            imgsz = data.get('imgsz')
+            tiled = parse_bool_param(data.get('tiled'), False)
             image_data = data.get('image_data')
 
             # 处理base64图像数据
@@ -181,6 +188,11 @@ def yolo_detection():
             confidence = float(request.form.get('confidence', 0.5))
             # 支持两种参数名：user_query 和 object_name
             user_query = request.form.get('user_query', '') or request.form.get('object_name', '')
+            single_pass = parse_bool_param(request.form.get('single_pass'))
+            backend = request.form.get('backend')
+            precision = request.form.get('precision')
+            imgsz = request.form.get('imgsz')
+            tiled = parse_bool_param(request.form.get('tiled'), False)
 
             if not file:
                 return jsonify({'success': False, 'error': '未选择文件'}), 400
@@ -190,8 +202,17 @@ def yolo_detection():
                 return jsonify({'success': False, 'error': '无效的文件类型'}), 400
             image_path = save_uploaded_file(file, current_app.config['UPLOAD_FOLDER'])
 
+        if backend and backend.lower() not in SUPPORTED_BACKENDS:
+            return jsonify({'success': False, 'error': f'不支持的推理后端: {backend}'}), 400
+        if precision and precision.lower() not in SUPPORTED_PRECISIONS:
+            return jsonify({'success': False, 'error': f'不支持的推理精度: {precision}'}), 400
+        if not is_valid_imgsz(imgsz):
+            return jsonify({'success': False, 'error': f'无效的推理尺寸: {imgsz}'}), 400
+
         # 使用YOLO进行检测
-        result = yolo_detection_service.detect_objects(image_path, model_name, confidence, user_query)
+        result = yolo_detection_service.detect_objects(
+            image_path, model_name, confidence, user_query, single_pass, backend, precision, imgsz, tiled
+        )
 
         # 对于内容不匹配的情况，返回200状态码让前端正确处理
         if not result.get('success') and (result.get('message') or result.get('suggestion') or result.get('detected_objects')):
@@ -207,6 +228,125 @@ def yolo_detection():
         }), 500
 
 
+@api_bp.route('/object-detection/yolo/batch', methods=['POST'])
+def yolo_detection_batch():
+    """
+    YOLO 批量目标检测，每张图像的结果完成后立即以一行NDJSON返回
+
+    支持的参数:
+    - images: 多个图像文件和/或zip压缩包
+    - model, confidence, user_query/object_name, backend, precision, imgsz, tiled: 与单张检测相同
+    - batch_size: 每次推理的图像数
+    """
+    try:
+        # 批量接口使用单独的请求体大小限制，需在读取表单之前设置
+        request.max_content_length = current_app.config['BATCH_MAX_CONTENT_LENGTH']
+        files = request.files.getlist('images') + request.files.getlist('image')
+        model_name = request.form.get('model', 'yolo11n')
+        confidence = float(request.form.get('confidence', 0.5))
+        user_query = request.form.get('user_query', '') or request.form.get('object_name', '')
+        backend = request.form.get('backend')
+        precision = request.form.get('precision')
+        imgsz = request.form.get('imgsz')
+        tiled = parse_bool_param(request.form.get('tiled'), False)
+        batch_size = request.form.get('batch_size', current_app.config.get('YOLO_BATCH_JOB_SIZE', 8))
+
+        if not files:
+            return jsonify({'success': False, 'error': '未选择文件'}), 400
+        if backend and backend.lower() not in SUPPORTED_BACKENDS:
+            return jsonify({'success': False, 'error': f'不支持的推理后端: {backend}'}), 400
+        if precision and precision.lower() not in SUPPORTED_PRECISIONS:
+            return jsonify({'success': False, 'error': f'不支持的推理精度: {precision}'}), 400
+        if not is_valid_imgsz(imgsz):
+            return jsonify({'success': False, 'error': f'无效的推理尺寸: {imgsz}'}), 400
+        if not is_positive_int(batch_size):
+            return jsonify({'success': False, 'error': f'无效的批大小: {batch_size}'}), 400
+
+        try:
+            uploads = save_batch_request_uploads(files)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+
+        results = yolo_detection_service.detect_objects_batch(
+            [path for _, path in uploads if path], model_name, confidence, user_query,
+            backend, precision, imgsz, tiled, int(batch_size)
+        )
+        return batch_ndjson_response(uploads, results)
+
+    except Exception as e:
+        current_app.logger.error(f"YOLO批量检测API错误: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': f'YOLO批量检测失败: {str(e)}'
+        }), 500
+
+
+@api_bp.route('/object-detection/yolo/video', methods=['POST'])
+def yolo_video_detection():
+    """
+    YOLO 视频目标检测，逐帧以NDJSON流式返回检测结果，最后一行为汇总
+
+    支持的参数:
+    - video: 上传的视频文件
+    - generated_video: GENERATED_FOLDER中已生成视频（如Veo视频）的文件名，与video二选一
+    - model, confidence, backend, precision, imgsz: 与单张检测相同
+    - frame_stride: 每隔多少帧抽取一帧
+    - motion_threshold: 与上一次推理帧的平均灰度差（0-255）低于该值时复用检测结果，0为关闭
+    - max_frames: 最多处理的抽样帧数
+    """
+    try:
+        params = request.get_json() if request.is_json else request.form
+        model_name = params.get('model', 'yolo11n')
+        confidence = float(params.get('confidence', 0.5))
+        backend = params.get('backend')
+        precision = params.get('precision')
+        imgsz = params.get('imgsz')
+        frame_stride = params.get('frame_stride', current_app.config.get('YOLO_VIDEO_FRAME_STRIDE', 5))
+        motion_threshold = params.get('motion_threshold', current_app.config.get('YOLO_VIDEO_MOTION_THRESHOLD', 2.0))
+        max_frames = params.get('max_frames', current_app.config.get('YOLO_VIDEO_MAX_FRAMES', 0))
+        generated_video = params.get('generated_video')
+
+        if backend and backend.lower() not in SUPPORTED_BACKENDS:
+            return jsonify({'success': False, 'error': f'不支持的推理后端: {backend}'}), 400
+        if precision and precision.lower() not in SUPPORTED_PRECISIONS:
+            return jsonify({'success': False, 'error': f'不支持的推理精度: {precision}'}), 400
+        if not is_valid_imgsz(imgsz):
+            return jsonify({'success': False, 'error': f'无效的推理尺寸: {imgsz}'}), 400
+        if not is_positive_int(frame_stride):
+            return jsonify({'success': False, 'error': f'frame_stride必须为正整数: {frame_stride}'}), 400
+        if not is_non_negative_number(motion_threshold):
+            return jsonify({'success': False, 'error': f'motion_threshold必须为非负数: {motion_threshold}'}), 400
+        if not is_non_negative_int(max_frames):
+            return jsonify({'success': False, 'error': f'max_frames必须为非负整数: {max_frames}'}), 400
+        frame_stride, motion_threshold, max_frames = int(frame_stride), float(motion_threshold), int(max_frames)
+
+        file = request.files.get('video')
+        if generated_video:
+            # 只允许访问生成目录中的文件
+            video_path = os.path.join(current_app.config['GENERATED_FOLDER'], os.path.basename(generated_video))
+            if not os.path.isfile(video_path):
+                return jsonify({'success': False, 'error': f'未找到生成的视频: {generated_video}'}), 404
+        elif file and file.filename:
+            extension = file.filename.rsplit('.', 1)[-1].lower() if '.' in file.filename else ''
+            if extension not in current_app.config['ALLOWED_VIDEO_EXTENSIONS']:
+                return jsonify({'success': False, 'error': '无效的视频文件类型'}), 400
+            video_path = save_uploaded_file(file, current_app.config['UPLOAD_FOLDER'])
+        else:
+            return jsonify({'success': False, 'error': '未选择视频文件'}), 400
+
+        return ndjson_response(yolo_detection_service.detect_video(
+            video_path, model_name, confidence, backend, precision, imgsz,
+            frame_stride, motion_threshold, max_frames or None
+        ))
+
+    except Exception as e:
+        current_app.logger.error(f"YOLO视频检测API错误: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': f'YOLO视频检测失败: {str(e)}'
+        }), 500
+
+
 @api_bp.route('/object-detection/compare', methods=['POST'])
 def compare_detection():
     """对比 Gemini、OpenCV 和 YOLO 的目标检测结果"""
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+运行时诊断API模块
+提供YOLO推理运行状态相关的API
+"""
+
+from flask import jsonify, current_app
+from . import api_bp
+from ..services.result_cache import result_cache
+from ..services.thread_budget import thread_budget
+from ..services.yolo_model_registry import model_registry
+
+
+@api_bp.route('/runtime/batching', methods=['GET'])
+def get_batching_stats():
+    """获取YOLO微批推理的队列深度和批大小统计"""
+    try:
+        return jsonify({
+            'success': True,
+            'enabled': model_registry.batching_enabled,
+            'models': model_registry.get_batching_stats()
+        })
+    except Exception as e:
+        current_app.logger.error(f"获取微批统计错误: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': f'获取微批统计失败: {str(e)}'
+        }), 500
+
+
+@api_bp.route('/runtime/model-cache', methods=['GET'])
+def get_model_cache_stats():
+    """获取YOLO模型缓存的内存预算、命中率和逐出统计"""
+    try:
+        return jsonify({
+            'success': True,
+            'cache': model_registry.get_cache_stats(),
+            'models': model_registry.get_resident_models()
+        })
+    except Exception as e:
+        current_app.logger.error(f"获取模型缓存统计错误: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': f'获取模型缓存统计失败: {str(e)}'
+        }), 500
+
+
+@api_bp.route('/runtime/workers', methods=['GET'])
+def get_worker_status():
+    """获取多进程推理工作池的状态"""
+    try:
+        pool = model_registry.worker_pool
+        return jsonify({
+            'success': True,
+            'enabled': pool is not None,
+            'ready': pool.ready if pool is not None else None,
+            'workers': pool.get_status() if pool is not None else []
+        })
+    except Exception as e:
+        current_app.logger.error(f"获取推理工作池状态错误: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': f'获取推理工作池状态失败: {str(e)}'
+        }), 500
+
+
+@api_bp.route('/runtime/threads', methods=['GET'])
+def get_thread_budget():
+    """获取CPU线程预算和各计算库实际生效的线程数"""
+    try:
+        return jsonify({
+            'success': True,
+            'threads': thread_budget.get_stats()
+        })
+    except Exception as e:
+        current_app.logger.error(f"获取线程预算错误: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': f'获取线程预算失败: {str(e)}'
+        }), 500
+
+
+@api_bp.route('/runtime/result-cache', methods=['GET'])
+def get_result_cache_stats():
+    """获取分析结果缓存的容量、命中率和逐出统计"""
+    try:
+        return jsonify({
+            'success': True,
+            'cache': result_cache.get_stats()
+        })
+    except Exception as e:
+        current_app.logger.error(f"获取结果缓存统计错误: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': f'获取结果缓存统计失败: {str(e)}'
+        }), 500
+
+
+@api_bp.route('/runtime/result-cache', methods=['DELETE'])
+def clear_result_cache():
+    """清空分析结果缓存"""
+    try:
+        result_cache.clear()
+        return jsonify({'success': True, 'cache': result_cache.get_stats()})
+    except Exception as e:
+        current_app.logger.error(f"清空结果缓存错误: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': f'清空结果缓存失败: {str(e)}'
+        }), 500
@@ -49,11 +49,21 @@ class Config:
             # 本地环境
             return os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'storage', 'models')
 
+    @property
+    def RESULT_CACHE_FOLDER(self):
+        if os.path.exists('/storage'):
+            # Docker环境
+            return '/storage/cache/results'
+        else:
+            # 本地环境
+            return os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'storage', 'cache', 'results')
+
     # 文件大小限制 (16MB)
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024
 
     # 允许的文件扩展名
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp'}
+    ALLOWED_VIDEO_EXTENSIONS = {'mp4', 'avi', 'mov', 'mkv', 'webm'}
 
     # Gemini模型配置
     DEFAULT_VISION_MODEL = 'gemini-2.0-flash'
@@ -69,6 +79,60 @@ class Config:
         'gemini-2.0-flash': 'gemini-2.0-flash-exp-image-generation'
     }
 
+    # CPU线程预算
+    REQUEST_CONCURRENCY = int(os.environ.get('REQUEST_CONCURRENCY', 4))  # 同时执行图像计算的请求数上限，超出的请求排队等待，CPU核心按此平分
+    TORCH_NUM_THREADS = int(os.environ.get('TORCH_NUM_THREADS', 0))  # PyTorch计算线程数，0为按预算自动计算
+    OPENCV_NUM_THREADS = int(os.environ.get('OPENCV_NUM_THREADS', 0))  # OpenCV线程数，0为按预算自动计算
+    ONNX_NUM_THREADS = int(os.environ.get('ONNX_NUM_THREADS', 0))  # ONNX Runtime每个会话的线程数，0为按预算自动计算
+
+    # OpenCV分析配置
+    OPENCV_ANALYSIS_SIZE = int(os.environ.get('OPENCV_ANALYSIS_SIZE', 0))  # 检测/分割方法的工作分辨率（长边像素），按图像金字塔选择最接近的层，面积阈值按此分辨率换算，0为使用原图（默认）
+    OPENCV_KMEANS_MODE = os.environ.get('OPENCV_KMEANS_MODE', 'full').lower()  # K-means分割模式: full（分析层全部像素，默认）/ sample（像素抽样）/ histogram（颜色直方图）
+    OPENCV_KMEANS_K = int(os.environ.get('OPENCV_KMEANS_K', 3))  # K-means聚类数量
+    OPENCV_KMEANS_SEED = int(os.environ.get('OPENCV_KMEANS_SEED', 0))  # K-means随机种子，相同图像和配置的聚类结果可复现
+    OPENCV_KMEANS_SAMPLE_SIZE = int(os.environ.get('OPENCV_KMEANS_SAMPLE_SIZE', 20000))  # sample模式拟合聚类中心使用的像素数
+    OPENCV_KMEANS_HISTOGRAM_BINS = int(os.environ.get('OPENCV_KMEANS_HISTOGRAM_BINS', 32))  # histogram模式每个颜色通道的直方图格数
+    OPENCV_GRABCUT_SEED = os.environ.get('OPENCV_GRABCUT_SEED', 'center').lower()  # GrabCut种子框来源: center（中心矩形）/ contour（轮廓检测框）/ yolo（与查询匹配的YOLO检测框）
+    OPENCV_GRABCUT_MAX_ROIS = int(os.environ.get('OPENCV_GRABCUT_MAX_ROIS', 3))  # 最多以多少个检测框为种子分别求解GrabCut
+    OPENCV_GRABCUT_BAND = int(os.environ.get('OPENCV_GRABCUT_BAND', 8))  # 原图分辨率下细化的前景边界窄带半宽（像素）
+
+    # YOLO推理配置
+    YOLO_MODEL_REPLICAS = int(os.environ.get('YOLO_MODEL_REPLICAS', 1))  # 每个模型的最大副本数（并发推理数）
+    YOLO_MODEL_MEMORY_BUDGET_MB = int(os.environ.get('YOLO_MODEL_MEMORY_BUDGET_MB', 0))  # 已加载模型的内存预算（MB），超出时按LRU逐出空闲模型，0为不限制
+    YOLO_BATCHING_ENABLED = os.environ.get('YOLO_BATCHING_ENABLED', 'false').lower() == 'true'  # 启用动态微批推理
+    YOLO_BATCH_WINDOW_MS = float(os.environ.get('YOLO_BATCH_WINDOW_MS', 10))  # 微批收集窗口（毫秒）
+    YOLO_BATCH_MAX_SIZE = int(os.environ.get('YOLO_BATCH_MAX_SIZE', 8))  # 单批最大图像数
+    YOLO_BACKEND = os.environ.get('YOLO_BACKEND', 'torch').lower()  # 默认推理后端: torch / onnx（ONNX Runtime CPU）
+    YOLO_PRECISION = os.environ.get('YOLO_PRECISION', 'fp32').lower()  # 默认推理精度: fp32 / int8（INT8使用ONNX Runtime）
+    YOLO_CALIBRATION_FOLDER = os.environ.get('YOLO_CALIBRATION_FOLDER', '')  # INT8静态量化校准图像目录，为空时使用动态量化
+    YOLO_CALIBRATION_SIZE = int(os.environ.get('YOLO_CALIBRATION_SIZE', 32))  # 静态量化使用的最大校准图像数
+    YOLO_IMGSZ = os.environ.get('YOLO_IMGSZ', '640')  # 默认推理尺寸: 固定数值（默认为模型原生的640）或auto（按图像大小和延迟预算选择）
+    YOLO_LATENCY_BUDGET_MS = float(os.environ.get('YOLO_LATENCY_BUDGET_MS', 250))  # auto推理尺寸使用的单图延迟预算（毫秒）
+    YOLO_TILE_SIZE = int(os.environ.get('YOLO_TILE_SIZE', 640))  # 切片推理的切片边长（像素）
+    YOLO_TILE_OVERLAP = float(os.environ.get('YOLO_TILE_OVERLAP', 0.2))  # 相邻切片重叠比例
+    YOLO_TILE_BATCH_SIZE = int(os.environ.get('YOLO_TILE_BATCH_SIZE', 8))  # 每次批量推理的切片数
+    YOLO_BATCH_JOB_SIZE = int(os.environ.get('YOLO_BATCH_JOB_SIZE', 8))  # 批量接口每次推理的图像数
+    YOLO_BATCH_JOB_MAX_IMAGES = int(os.environ.get('YOLO_BATCH_JOB_MAX_IMAGES', 1000))  # 批量接口单次请求最多处理的图像数
+    BATCH_MAX_CONTENT_LENGTH = int(os.environ.get('BATCH_MAX_CONTENT_LENGTH', 1024 * 1024 * 1024))  # 批量接口请求体大小上限（字节），替代MAX_CONTENT_LENGTH
+    BATCH_MAX_ENTRY_SIZE = int(os.environ.get('BATCH_MAX_ENTRY_SIZE', 64 * 1024 * 1024))  # 压缩包内单个文件解压后的大小上限（字节）
+    BATCH_MAX_UNCOMPRESSED_SIZE = int(os.environ.get('BATCH_MAX_UNCOMPRESSED_SIZE', 4 * 1024 * 1024 * 1024))  # 压缩包解压后的总大小上限（字节）
+    YOLO_VIDEO_FRAME_STRIDE = int(os.environ.get('YOLO_VIDEO_FRAME_STRIDE', 5))  # 视频检测每隔多少帧抽取一帧
+    YOLO_VIDEO_MOTION_THRESHOLD = float(os.environ.get('YOLO_VIDEO_MOTION_THRESHOLD', 2.0))  # 与上一次推理帧的平均灰度差低于该值时复用检测结果，0为关闭
+    YOLO_VIDEO_MAX_FRAMES = int(os.environ.get('YOLO_VIDEO_MAX_FRAMES', 0))  # 单个视频最多推理的抽样帧数，0为不限制
+    YOLO_PRELOAD = [name.strip() for name in os.environ.get('YOLO_PRELOAD', '').split(',') if name.strip()]  # 启动时预加载并预热的模型，如 yolo11n,yolo11n-seg@onnx-int8
+    YOLO_PRELOAD_ASYNC = os.environ.get('YOLO_PRELOAD_ASYNC', 'false').lower() == 'true'  # 在后台线程预加载，启动期间/ready返回503
+    YOLO_PRELOAD_REQUIRED = [name.strip() for name in os.environ.get('YOLO_PRELOAD_REQUIRED', '').split(',') if name.strip()]  # 预加载失败时/ready返回503的必需模型，其余模型失败时仍就绪并在响应中列出
+    YOLO_PRELOAD_RETRY_SECONDS = float(os.environ.get('YOLO_PRELOAD_RETRY_SECONDS', 30))  # 预加载失败的模型在就绪检查时按该间隔（秒）后台重试，0为不重试
+    INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', 0))  # 多进程推理工作进程数，0为在请求线程内推理
+    INFERENCE_WORKER_CPUS = int(os.environ.get('INFERENCE_WORKER_CPUS', 0))  # 每个工作进程绑定的CPU核心数，0为平均分配
+    INFERENCE_WORKER_TIMEOUT = float(os.environ.get('INFERENCE_WORKER_TIMEOUT', 300))  # 等待工作进程结果的超时时间（秒）
+    YOLO_SINGLE_PASS_VALIDATION = os.environ.get('YOLO_SINGLE_PASS_VALIDATION', 'true').lower() == 'true'  # 复用请求模型的推理结果做内容匹配
+
+    # 分析结果缓存
+    RESULT_CACHE_ENABLED = os.environ.get('RESULT_CACHE_ENABLED', 'true').lower() == 'true'  # 按图像内容哈希和参数缓存YOLO/OpenCV分析结果
+    RESULT_CACHE_MEMORY_ITEMS = int(os.environ.get('RESULT_CACHE_MEMORY_ITEMS', 256))  # 内存层最多缓存的结果数，0为关闭内存层
+    RESULT_CACHE_DISK_MB = int(os.environ.get('RESULT_CACHE_DISK_MB', 512))  # 磁盘层容量（MB），超出时按LRU逐出，0为关闭磁盘层
+
     # 应用设置
     JSON_AS_ASCII = False  # 支持中文JSON响应
 
@@ -85,15 +149,18 @@ class Config:
         upload_folder = config_instance.UPLOAD_FOLDER
         generated_folder = config_instance.GENERATED_FOLDER
         models_folder = config_instance.MODELS_FOLDER
+        result_cache_folder = config_instance.RESULT_CACHE_FOLDER
 
         os.makedirs(upload_folder, exist_ok=True)
         os.makedirs(generated_folder, exist_ok=True)
         os.makedirs(models_folder, exist_ok=True)
+        os.makedirs(result_cache_folder, exist_ok=True)
 
         # 更新app.config中的路径
         app.config['UPLOAD_FOLDER'] = upload_folder
         app.config['GENERATED_FOLDER'] = generated_folder
         app.config['MODELS_FOLDER'] = models_folder
+        app.config['RESULT_CACHE_FOLDER'] = result_cache_folder
 
 
 class DevelopmentConfig(Config):
@@ -47,3 +47,25 @@ def health_check():
         'status': 'healthy',
         'message': 'Gemini Image App is running'
     }
+
+
+@main_bp.route('/ready')
+def readiness_check():
+    """就绪检查接口，预加载完成且必需模型全部预热成功后返回200，非必需模型失败时返回degraded并列出"""
+    from ..services.yolo_model_registry import model_registry
+
+    ready = model_registry.is_ready()
+    failed_models = model_registry.failed_preloads()
+    response = {
+        'status': ('degraded' if failed_models else 'ready') if ready else 'not_ready',
+        'preload_state': model_registry.preload_state,
+        'preload_targets': model_registry.preload_targets,
+        'preload_required': model_registry.preload_required,
+        'preload_models': dict(model_registry.preload_models),
+        'failed_models': failed_models,
+        'preload_errors': dict(model_registry.preload_errors),
+        'models': model_registry.get_resident_models()
+    }
+    if model_registry.worker_pool is not None:
+        response['workers'] = model_registry.worker_pool.get_status(detailed=False)
+    return response, 200 if ready else 503
@@ -0,0 +1,252 @@
+"""
+类别同义词索引
+汇总检测、分割和OpenCV服务使用的中英文别名，导入时预编译为从别名到规范类别名的倒排索引；
+每个模型的类别表再预编译为从别名到类别ID的索引，查询解析只需逐词字典查找，
+检测、分割服务的类别过滤和内容匹配共用这一套匹配规则
+"""
+import threading
+from collections import OrderedDict
+
+
+# 规范类别名（COCO类别名，少数为常见非COCO对象）到别名的映射
+CLASS_SYNONYMS = {
+    # 动物类
+    'cat': ['kitten', 'feline', '猫', '小猫', 'kitty', '猫咪', '喵', '猫猫', '宠物猫'],
+    'dog': ['puppy', 'canine', '狗', '小狗', 'doggy', '狗狗', '犬', '汪', '宠物狗'],
+    'bird': ['飞鸟', '鸟类', 'avian', '鸟儿', '小鸟', '鸟'],
+    'horse': ['马', 'equine', 'pony', '马匹', '小马'],
+    'cow': ['cattle', '牛', 'bull', '奶牛', '母牛'],
+    'sheep': ['羊', 'lamb', '绵羊', '小羊'],
+    'elephant': ['大象', '象'],
+    'bear': ['熊', '狗熊', '黑熊', '棕熊'],
+    'zebra': ['斑马'],
+    'giraffe': ['长颈鹿', '鹿'],
+    'lion': ['狮子', '雄狮', '母狮'],
+    'tiger': ['老虎', '虎'],
+    'monkey': ['猴子', '猴'],
+    'rabbit': ['兔子', '小兔', '兔'],
+
+    # 交通工具
+    'car': ['automobile', 'vehicle', '汽车', '车辆', '轿车', '小车', '车'],
+    'truck': ['lorry', '卡车', '货车', '大车', '车'],
+    'bus': ['coach', '公交车', '巴士', '客车', '大车', '车'],
+    'motorcycle': ['motorbike', '摩托车', '机车', '摩托'],
+    'bicycle': ['bike', '自行车', '单车', '脚踏车'],
+    'train': ['火车', 'locomotive', '列车'],
+    'airplane': ['plane', '飞机', 'aircraft', '客机'],
+    'boat': ['ship', '船', '轮船', '小船', '船只'],
+
+    # 人物
+    'person': ['people', 'human', '人', '人类', 'man', 'woman', 'boy', 'girl', 'individual', '人物',
+               '男人', '女人', '小孩', '儿童'],
+    'child': ['kid', '孩子', '儿童', '小孩', 'boy', 'girl'],
+    'baby': ['infant', '婴儿', '宝宝', '小宝宝'],
+
+    # 物品
+    'phone': ['mobile', 'cellphone', '手机', '电话', 'smartphone', '移动电话'],
+    'laptop': ['computer', '笔记本', '电脑', 'notebook', '笔记本电脑'],
+    'book': ['书', '书籍', '图书', '书本'],
+    'bottle': ['瓶子', 'container', '水瓶'],
+    'cup': ['mug', '杯子', '茶杯', '水杯'],
+    'clock': ['时钟', '钟表', 'watch', '手表'],
+    'tv': ['television', '电视', 'monitor', '电视机', '屏幕'],
+    'monitor': ['显示器', '屏幕'],
+    'remote': ['遥控器', 'controller', '遥控'],
+    'scissors': ['剪刀', '剪子'],
+    'teddy bear': ['泰迪熊', '玩具熊', '熊娃娃'],
+    'hair drier': ['吹风机', '电吹风'],
+    'toothbrush': ['牙刷', '电动牙刷'],
+    'umbrella': ['雨伞', '伞'],
+    'handbag': ['手提包', '包'],
+    'backpack': ['背包', '包'],
+    'suitcase': ['行李箱', '箱子'],
+
+    # 食物
+    'apple': ['苹果'],
+    'banana': ['香蕉'],
+    'orange': ['橙子', '橘子', '桔子'],
+    'pizza': ['比萨', '披萨'],
+    'cake': ['蛋糕'],
+    'sandwich': ['三明治'],
+    'donut': ['甜甜圈', '油炸圈饼'],
+    'bread': ['面包'],
+    'hot dog': ['热狗'],
+    'carrot': ['胡萝卜', '萝卜'],
+
+    # 家具
+    'chair': ['椅子', '座椅'],
+    'couch': ['sofa', '沙发'],
+    'bed': ['床', '床铺'],
+    'dining table': ['table', 'desk', '桌子', '餐桌', '饭桌'],
+    'toilet': ['厕所', '马桶', '卫生间'],
+
+    # 运动用品
+    'sports ball': ['ball', '球', '运动球', '足球', '篮球', '网球'],
+    'tennis racket': ['tennis', '网球拍', '球拍', '网球'],
+    'baseball bat': ['棒球棒', '球棒'],
+    'baseball glove': ['棒球手套', '手套'],
+    'skateboard': ['滑板'],
+    'surfboard': ['冲浪板'],
+    'skis': ['ski', '滑雪板'],
+    'kite': ['风筝'],
+
+    # 厨房用品
+    'knife': ['刀', '小刀', '菜刀'],
+    'spoon': ['勺子', '汤匙', '勺'],
+    'fork': ['叉子', '餐叉'],
+    'bowl': ['碗', '饭碗'],
+    'wine glass': ['酒杯', '红酒杯', '玻璃杯'],
+    'refrigerator': ['冰箱', 'fridge'],
+    'microwave': ['微波炉'],
+    'oven': ['烤箱'],
+    'toaster': ['烤面包机'],
+
+    # 电子设备
+    'keyboard': ['键盘'],
+    'mouse': ['鼠标', '老鼠', '鼠'],
+    'cell phone': ['phone', '手机', 'mobile', '移动电话'],
+
+    # 植物和自然
+    'flower': ['花', '花朵', '鲜花'],
+    'tree': ['树', '树木', '大树'],
+    'grass': ['草', '草地', '草坪'],
+
+    # 建筑和结构
+    'building': ['建筑', '房子', '楼房', '大楼'],
+    'house': ['房子', '住宅', '房屋'],
+    'bridge': ['桥', '大桥', '桥梁'],
+}
+
+# 语义组及其成员类别
+SEMANTIC_GROUPS = {
+    'animals': ['dog', 'cat', 'bird', 'horse', 'cow', 'sheep', 'elephant', 'zebra', 'giraffe', 'lion', 'tiger', 'bear', 'monkey', 'rabbit', 'mouse'],
+    'vehicles': ['car', 'truck', 'bus', 'motorcycle', 'bicycle', 'airplane', 'boat', 'train'],
+    'furniture': ['chair', 'dining table', 'couch', 'bed'],
+    'electronics': ['laptop', 'phone', 'cell phone', 'tv', 'keyboard', 'mouse', 'monitor'],
+    'food': ['apple', 'banana', 'orange', 'cake', 'bread', 'sandwich', 'hot dog', 'pizza', 'donut', 'carrot'],
+    'sports': ['sports ball', 'tennis racket', 'baseball bat', 'skateboard', 'skis', 'kite']
+}
+
+# 指代整个语义组的查询词，匹配组内所有类别
+GROUP_ALIASES = {
+    'animals': ['animal', '动物'],
+    'vehicles': ['交通工具']
+}
+
+
+def _build_indexes():
+    """构建别名到规范类别名、类别名到语义组的索引"""
+    alias_index = {}
+    for class_name, aliases in CLASS_SYNONYMS.items():
+        for term in [class_name] + aliases:
+            alias_index.setdefault(term, set()).add(class_name)
+    for group_name, aliases in GROUP_ALIASES.items():
+        for term in aliases:
+            alias_index.setdefault(term, set()).update(SEMANTIC_GROUPS[group_name])
+
+    group_index = {}
+    for group_name, class_names in SEMANTIC_GROUPS.items():
+        for class_name in class_names:
+            group_index.setdefault(class_name, group_name)
+
+    return {term: frozenset(classes) for term, classes in alias_index.items()}, group_index
+
+
+_ALIAS_INDEX, _GROUP_INDEX = _build_indexes()
+
+
+# 缓存的模型类别索引数量上限，与同时加载的模型变体数相当即可
+MAX_CLASS_INDEXES = 32
+_class_indexes = OrderedDict()
+_class_indexes_lock = threading.Lock()
+
+
+def canonical_classes(term):
+    """返回别名对应的全部规范类别名，未知词汇返回空集合"""
+    return _ALIAS_INDEX.get(term.lower().strip(), frozenset())
+
+
+def _expand_term(term):
+    """将单个查询词扩展为其本身、对应规范类别名及其全部别名"""
+    expanded = {term}
+    for class_name in canonical_classes(term):
+        expanded.add(class_name)
+        expanded.update(CLASS_SYNONYMS.get(class_name, ()))
+    return expanded
+
+
+def semantic_group(term):
+    """返回词汇所属的语义组，无法确定时返回None"""
+    for class_name in sorted(canonical_classes(term)):
+        group_name = _GROUP_INDEX.get(class_name)
+        if group_name:
+            return group_name
+    return None
+
+
+def _partial_match(word, class_name):
+    """较长单词与类别名互为主要部分时视为匹配，如复数形式"""
+    return len(word) > 3 and ((word in class_name and len(word) / len(class_name) > 0.6) or
+                              (class_name in word and len(class_name) / len(word) > 0.6))
+
+
+def _matches_class(query_words, class_name):
+    """判断扩展后的查询词是否指向该类别，包括较长单词的部分匹配"""
+    if class_name in query_words or not canonical_classes(class_name).isdisjoint(query_words):
+        return True
+    return any(_partial_match(word, class_name) for word in query_words)
+
+
+class ClassIndex:
+    """单个模型类别表的别名到类别ID索引"""
+
+    def __init__(self, names):
+        items = names.items() if isinstance(names, dict) else enumerate(names)
+        self.class_names = [(int(class_id), class_name.lower().strip()) for class_id, class_name in items]
+        # 同义词表中的全部词汇和模型类别名都预先解析，不对应任何类别的词汇记为空集合
+        terms = set(_ALIAS_INDEX) | {class_name for _, class_name in self.class_names}
+        self.terms = {term: self._match(_expand_term(term)) for term in terms}
+
+    def _match(self, query_words):
+        return frozenset(class_id for class_id, class_name in self.class_names
+                         if _matches_class(query_words, class_name))
+
+    def resolve(self, query):
+        """返回查询及其各个单词对应的类别ID集合，索引未收录的词汇才逐类别做部分匹配"""
+        query = query.lower().strip()
+        class_ids = set()
+        for word in dict.fromkeys([query] + query.split()):
+            matched = self.terms.get(word)
+            if matched is None:
+                # 未收录的词汇不是任何别名或类别名，只可能部分匹配
+                matched = [class_id for class_id, class_name in self.class_names if _partial_match(word, class_name)]
+            class_ids.update(matched)
+        return frozenset(class_ids)
+
+
+def class_index(names):
+    """获取模型类别表的索引，按类别表对象缓存，同一模型只构建一次"""
+    key = id(names)
+    with _class_indexes_lock:
+        cached = _class_indexes.get(key)
+        # 缓存中保留类别表的引用，对象id不会被复用；仍核对是否为同一对象
+        if cached is not None and cached[0] is names:
+            _class_indexes.move_to_end(key)
+            return cached[1]
+
+    index = ClassIndex(names)
+    with _class_indexes_lock:
+        _class_indexes[key] = (names, index)
+        while len(_class_indexes) > MAX_CLASS_INDEXES:
+            _class_indexes.popitem(last=False)
+    return index
+
+
+def resolve_class_ids(query, names):
+    """将查询解析为模型类别ID列表，用于推理时的类别过滤和内容匹配；无法对应到任何类别时返回空列表"""
+    return sorted(class_index(names).resolve(query))
+
+
+def query_class_names(query, names):
+    """将查询解析为模型类别名称集合，用于按类别名判断检测结果是否为查询目标"""
+    return {names[class_id] for class_id in class_index(names).resolve(query)}
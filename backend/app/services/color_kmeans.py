@@ -0,0 +1,101 @@
+"""
+颜色K-means聚类
+快速模式只在随机抽样的像素或三维颜色直方图上拟合聚类中心，再通过最近中心查找表为全部像素分配聚类，
+无需将整张图像转换为float32矩阵做多次完整聚类；拟合使用固定随机种子，结果可复现
+"""
+import cv2
+import numpy as np
+
+
+KMEANS_MODES = ('full', 'sample', 'histogram')
+
+# 最近中心查找表每个通道的量化位数
+LUT_BITS = 5
+
+# 每次分配聚类处理的行数，限制临时数组的内存占用
+ASSIGN_STRIP_ROWS = 256
+
+
+def fit_centers_full(image, k, seed, attempts=10, max_iter=20):
+    """在全部像素上运行cv2.kmeans，返回 (每个像素的聚类标签, 聚类中心)"""
+    data = np.float32(image.reshape((-1, 3)))
+    k = min(k, len(data))
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, max_iter, 1.0)
+    cv2.setRNGSeed(seed)
+    _, labels, centers = cv2.kmeans(data, k, None, criteria, attempts, cv2.KMEANS_RANDOM_CENTERS)
+    return labels.reshape(image.shape[:2]).astype(np.uint8), centers
+
+
+def fit_centers_sample(image, k, seed, sample_size, attempts=3, max_iter=20):
+    """在随机抽样的像素上拟合聚类中心"""
+    pixels = image.reshape((-1, 3))
+    rng = np.random.default_rng(seed)
+    if len(pixels) > sample_size:
+        pixels = pixels[rng.choice(len(pixels), sample_size, replace=False)]
+    data = np.float32(pixels)
+    k = min(k, len(data))
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, max_iter, 1.0)
+    cv2.setRNGSeed(seed)
+    _, _, centers = cv2.kmeans(data, k, None, criteria, attempts, cv2.KMEANS_PP_CENTERS)
+    return centers
+
+
+def fit_centers_histogram(image, k, seed, bins, max_iter=20, eps=1.0):
+    """在三维颜色直方图的非空格子上按像素数加权拟合聚类中心"""
+    histogram = cv2.calcHist([image], [0, 1, 2], None, [bins] * 3, [0, 256] * 3)
+    occupied = np.argwhere(histogram > 0)
+    weights = histogram[tuple(occupied.T)].astype(np.float64)
+    points = (occupied + 0.5) * (256.0 / bins)
+    return _weighted_kmeans(points, weights, k, np.random.default_rng(seed), max_iter, eps)
+
+
+def _weighted_kmeans(points, weights, k, rng, max_iter, eps):
+    """加权K-means：k-means++初始化后迭代更新中心，中心移动量小于eps时停止"""
+    centers = [points[rng.choice(len(points), p=weights / weights.sum())]]
+    distances = ((points - centers[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        probabilities = weights * distances
+        # 不同颜色少于k种时提前结束
+        if probabilities.sum() <= 0:
+            break
+        center = points[rng.choice(len(points), p=probabilities / probabilities.sum())]
+        centers.append(center)
+        distances = np.minimum(distances, ((points - center) ** 2).sum(axis=1))
+    centers = np.array(centers)
+
+    for _ in range(max_iter):
+        labels = ((points[:, None, :] - centers[None]) ** 2).sum(axis=2).argmin(axis=1)
+        totals = np.bincount(labels, weights=weights, minlength=len(centers))
+        updated = centers.copy()
+        for channel in range(3):
+            sums = np.bincount(labels, weights=weights * points[:, channel], minlength=len(centers))
+            # 空聚类保持原中心
+            updated[:, channel] = np.where(totals > 0, sums / np.maximum(totals, 1e-12), centers[:, channel])
+        shift = np.abs(updated - centers).max()
+        centers = updated
+        if shift < eps:
+            break
+    return centers.astype(np.float32)
+
+
+def nearest_center_lut(centers, bits=LUT_BITS):
+    """为量化后的每种BGR颜色预先计算最近的聚类中心"""
+    levels = 1 << bits
+    step = 256 // levels
+    grid = np.arange(levels) * step + step / 2
+    colors = np.stack(np.meshgrid(grid, grid, grid, indexing='ij'), axis=-1).reshape(-1, 3)
+    distances = ((colors[:, None, :] - np.asarray(centers, dtype=np.float64)[None]) ** 2).sum(axis=2)
+    return distances.argmin(axis=1).astype(np.uint8)
+
+
+def assign_centers(image, centers, bits=LUT_BITS):
+    """通过最近中心查找表为每个像素分配聚类，返回uint8标签图"""
+    lut = nearest_center_lut(centers, bits)
+    shift = 8 - bits
+    height = image.shape[0]
+    labels = np.empty(image.shape[:2], dtype=np.uint8)
+    for y in range(0, height, ASSIGN_STRIP_ROWS):
+        strip = (image[y:y + ASSIGN_STRIP_ROWS] >> shift).astype(np.uint16)
+        index = (strip[..., 0] << (2 * bits)) | (strip[..., 1] << bits) | strip[..., 2]
+        labels[y:y + ASSIGN_STRIP_ROWS] = lut[index]
+    return labels
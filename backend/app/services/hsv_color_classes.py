@@ -0,0 +1,78 @@
+"""
+HSV颜色分类
+每个颜色类别由若干HSV范围组成，预先为H、S、V三个通道各建一张位掩码查找表，
+一次查表即可得到每个像素所属的全部颜色类别，各颜色的掩码、面积和轮廓都从这张标签图得到，
+无需对每种颜色分别执行inRange
+"""
+import cv2
+import numpy as np
+
+
+class HSVColorClasses:
+    """一组颜色类别的分类器，类别的HSV范围与cv2.inRange相同（上下界均包含）"""
+
+    # 标签图为uint8，每个HSV范围占一位
+    MAX_RANGES = 8
+
+    def __init__(self, classes):
+        """classes为 [(颜色名, [(下界, 上界), ...]), ...]，颜色名可以重复"""
+        self.names = [name for name, _ in classes]
+        self.class_bits = []
+        lut = np.zeros((256, 3), dtype=np.uint8)
+        bit_index = 0
+        for _, ranges in classes:
+            bits = 0
+            for lower, upper in ranges:
+                if bit_index >= self.MAX_RANGES:
+                    raise ValueError(f'HSV范围数量不能超过 {self.MAX_RANGES} 个')
+                bit = 1 << bit_index
+                for channel in range(3):
+                    lut[lower[channel]:upper[channel] + 1, channel] |= bit
+                bits |= bit
+                bit_index += 1
+            self.class_bits.append(bits)
+        self._luts = [np.ascontiguousarray(lut[:, channel]) for channel in range(3)]
+
+        # 标签值到各类别是否命中的对照表，用于由标签值直方图汇总各颜色面积
+        values = np.arange(256)
+        self._value_members = [(values & bits) != 0 for bits in self.class_bits]
+        # 标签值到各类别掩码值（0/255）的查找表
+        self._mask_luts = [members.astype(np.uint8) * 255 for members in self._value_members]
+
+    def classify(self, hsv):
+        """一次查表得到标签图，每个像素的值为其命中的HSV范围位掩码"""
+        h, s, v = cv2.split(hsv)
+        labels = cv2.LUT(h, self._luts[0])
+        cv2.bitwise_and(labels, cv2.LUT(s, self._luts[1]), dst=labels)
+        cv2.bitwise_and(labels, cv2.LUT(v, self._luts[2]), dst=labels)
+        return labels
+
+    def areas(self, labels):
+        """按类别顺序返回各颜色的像素数"""
+        histogram = cv2.calcHist([labels], [0], None, [256], [0, 256]).ravel()
+        return [int(histogram[members].sum()) for members in self._value_members]
+
+    def mask(self, labels, index):
+        """返回第index个颜色类别的二值掩码（0/255）"""
+        # 查表而不与整数做bitwise_and：整数会被转换为Scalar，标签图不超过4x1时两者会被互换
+        return cv2.LUT(labels, self._mask_luts[index])
+
+
+# 内容验证使用的颜色特征（查询中包含颜色词时检查）
+FEATURE_COLORS = HSVColorClasses([
+    ('红', [((0, 0, 100), (10, 255, 255)), ((170, 255, 255), (180, 255, 255))]),
+    ('绿', [((40, 40, 40), (80, 255, 255))]),
+    ('蓝', [((100, 40, 40), (130, 255, 255))]),
+    ('黄', [((20, 40, 40), (40, 255, 255))]),
+    ('白', [((0, 0, 200), (180, 30, 255))]),
+    ('黑', [((0, 0, 0), (180, 255, 50))])
+])
+
+# 颜色分割检测使用的颜色范围，红色跨越色相两端，分为两个类别
+DETECTION_COLORS = HSVColorClasses([
+    ('红色', [((0, 50, 50), (10, 255, 255))]),
+    ('红色', [((170, 50, 50), (180, 255, 255))]),
+    ('绿色', [((40, 50, 50), (80, 255, 255))]),
+    ('蓝色', [((100, 50, 50), (130, 255, 255))]),
+    ('黄色', [((20, 50, 50), (40, 255, 255))])
+])
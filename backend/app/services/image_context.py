@@ -0,0 +1,187 @@
+"""
+图像上下文
+每个请求只解码一次图像，灰度、HSV、RGB以及模糊、边缘、阈值等派生平面在首次使用时计算并缓存，
+内容验证、检测/分割计算和结果绘制各阶段共享同一个上下文，无需各自重新读取文件；
+按需构建的图像金字塔供检测/分割方法在较低的工作分辨率上计算
+"""
+import math
+import cv2
+import numpy as np
+from PIL import Image
+
+
+def decode_image(path):
+    """依次尝试cv2.imread、PIL和numpy解码图像文件，返回BGR数组，均失败时返回None"""
+    # 方法1: 直接使用cv2.imread
+    try:
+        image = cv2.imread(path)
+        if image is not None and image.size > 0:
+            print("使用cv2.imread成功读取图像")
+            return image
+    except Exception as e:
+        print(f"cv2.imread 失败: {e}")
+
+    # 方法2: 如果直接读取失败，使用PIL转换
+    try:
+        pil_image = Image.open(path)
+
+        # 检查图像是否有效
+        if pil_image.size[0] == 0 or pil_image.size[1] == 0:
+            raise ValueError("图像尺寸无效")
+
+        # 转换为RGB（如RGBA、调色板或灰度图像）
+        if pil_image.mode != 'RGB':
+            pil_image = pil_image.convert('RGB')
+
+        # PIL使用RGB，OpenCV使用BGR，需要转换
+        image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
+        print("使用PIL成功读取图像")
+        return image
+    except Exception as e:
+        print(f"PIL读取失败: {e}")
+
+    # 方法3: 如果还是失败，尝试使用numpy直接读取
+    try:
+        with open(path, 'rb') as f:
+            file_bytes = f.read()
+
+        if len(file_bytes) == 0:
+            raise ValueError("文件内容为空")
+
+        image = cv2.imdecode(np.frombuffer(file_bytes, np.uint8), cv2.IMREAD_COLOR)
+        if image is not None and image.size > 0:
+            print("使用numpy成功读取图像")
+            return image
+    except Exception as e:
+        print(f"numpy读取失败: {e}")
+
+    return None
+
+
+# 派生平面的计算方法，平面之间的依赖通过context.plane()取得，每个平面每张图像只计算一次
+_PLANE_BUILDERS = {
+    'gray': lambda context: cv2.cvtColor(context.bgr, cv2.COLOR_BGR2GRAY),
+    'hsv': lambda context: cv2.cvtColor(context.bgr, cv2.COLOR_BGR2HSV),
+    'rgb': lambda context: cv2.cvtColor(context.bgr, cv2.COLOR_BGR2RGB),
+    # 以下为检测/分割方法共享的中间结果
+    'blurred': lambda context: cv2.GaussianBlur(context.plane('gray'), (5, 5), 0),
+    'edges': lambda context: cv2.bitwise_or(cv2.Canny(context.plane('gray'), 50, 150),
+                                            cv2.Canny(context.plane('gray'), 100, 200)),
+    'otsu': lambda context: cv2.threshold(context.plane('blurred'), 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1],
+    'adaptive': lambda context: cv2.adaptiveThreshold(context.plane('blurred'), 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                                      cv2.THRESH_BINARY, 11, 2)
+}
+
+
+class ImageContext:
+    """一次请求内共享的图像：解码后的BGR数组及按需计算的派生平面，各阶段不得原地修改其中的数组"""
+
+    def __init__(self, path, bgr):
+        self.path = path
+        self.bgr = bgr
+        self._planes = {}
+        # 按查询词缓存的内容验证结果，同一请求内多次验证同一对象时复用
+        self.validations = {}
+        # 金字塔的下一层（缩小一半），首次需要时构建
+        self._down = None
+        self._results = {}
+
+    @classmethod
+    def load(cls, path):
+        """解码图像文件创建上下文，无法读取时返回None"""
+        image = decode_image(path)
+        if image is None:
+            return None
+        return cls(path, image)
+
+    @property
+    def shape(self):
+        return self.bgr.shape
+
+    @property
+    def height(self):
+        return self.bgr.shape[0]
+
+    @property
+    def width(self):
+        return self.bgr.shape[1]
+
+    def plane(self, name):
+        """获取派生平面，首次访问时计算并缓存"""
+        if name not in self._planes:
+            self._planes[name] = _PLANE_BUILDERS[name](self)
+        return self._planes[name]
+
+    @property
+    def gray(self):
+        return self.plane('gray')
+
+    @property
+    def hsv(self):
+        return self.plane('hsv')
+
+    @property
+    def rgb(self):
+        return self.plane('rgb')
+
+    @property
+    def blurred(self):
+        """5x5高斯模糊后的灰度图"""
+        return self.plane('blurred')
+
+    @property
+    def edges(self):
+        """两组阈值的Canny边缘合并结果"""
+        return self.plane('edges')
+
+    @property
+    def otsu(self):
+        """模糊灰度图的Otsu二值化结果"""
+        return self.plane('otsu')
+
+    @property
+    def adaptive(self):
+        """模糊灰度图的自适应阈值二值化结果"""
+        return self.plane('adaptive')
+
+    def cached(self, key, compute):
+        """缓存与本图像相关的计算结果（如检测结果），同一请求内的多个阶段复用"""
+        if key not in self._results:
+            self._results[key] = compute()
+        return self._results[key]
+
+    def canvas(self):
+        """返回可供绘制的BGR副本"""
+        return self.bgr.copy()
+
+    def pyramid_level(self, max_side):
+        """返回用于分析的金字塔层：逐级缩小一半，直到再缩小会使长边小于max_side的1/√2；
+        各层同样是图像上下文并缓存自己的派生平面，max_side为0时返回原图"""
+        level = self
+        if not max_side:
+            return level
+        while max(level.height, level.width) / 2 >= max_side / math.sqrt(2):
+            if level._down is None:
+                level._down = ImageContext(self.path, cv2.pyrDown(level.bgr))
+            level = level._down
+        return level
+
+    def area_scale(self, reference_side):
+        """将长边为reference_side的图像上的像素面积换算到本图像的比例，用于缩放面积阈值；reference_side为0时为1"""
+        if not reference_side:
+            return 1.0
+        return (max(self.height, self.width) / reference_side) ** 2
+
+
+def upscale_mask(mask, offset, level, original):
+    """将金字塔层上位于offset (x, y) 处的掩码映射回原图，返回 (原图上的掩码, 原图上的offset)"""
+    if level is original:
+        return mask, offset
+    scale_x = original.width / level.width
+    scale_y = original.height / level.height
+    x, y = offset
+    h, w = mask.shape[:2]
+    x0, y0 = int(round(x * scale_x)), int(round(y * scale_y))
+    x1 = max(x0 + 1, min(original.width, int(round((x + w) * scale_x))))
+    y1 = max(y0 + 1, min(original.height, int(round((y + h) * scale_y))))
+    return cv2.resize(mask, (x1 - x0, y1 - y0), interpolation=cv2.INTER_NEAREST), (x0, y0)
@@ -9,6 +9,7 @@ import tempfile
 import base64
 from flask import current_app
 from ..utils.helpers import save_uploaded_file, allowed_file
+from .thread_budget import limit_concurrency
 from google import genai
 from google.genai import types
 
@@ -102,6 +103,7 @@ class ImageEditingService:
         except Exception as e:
             return {'success': False, 'error': f'Gemini 编辑失败: {str(e)}'}, 500
 
+    @limit_concurrency
     def _apply_filter(self, filepath, edit_params):
         """应用图像滤镜"""
         filter_type = edit_params.get('filter_type', 'blur')
@@ -161,6 +163,7 @@ class ImageEditingService:
             'parameters': edit_params
         }, 200
 
+    @limit_concurrency
     def _enhance_image(self, filepath, edit_params):
         """图像增强"""
         enhance_type = edit_params.get('enhance_type', 'brightness')
@@ -211,6 +214,7 @@ class ImageEditingService:
             'parameters': edit_params
         }, 200
 
+    @limit_concurrency
     def _transform_image(self, filepath, edit_params):
         """图像变换"""
         transform_type = edit_params.get('transform_type', 'resize')
@@ -270,6 +274,7 @@ class ImageEditingService:
             'parameters': edit_params
         }, 200
 
+    @limit_concurrency
     def _repair_image(self, filepath, edit_params):
         """图像修复"""
         repair_type = edit_params.get('repair_type', 'denoise')
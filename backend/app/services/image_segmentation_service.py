@@ -5,9 +5,12 @@ import os
 import json
 import tempfile
 import base64
+import numpy as np
+from PIL import Image
 from flask import jsonify
 from flask import current_app
 from ..utils.helpers import save_uploaded_file, image_to_bytes, allowed_file, create_segment_image
+from .segmentation_output import SegmentationEncoder
 from google import genai
 from google.genai import types
 
@@ -16,7 +19,7 @@ class ImageSegmentationService:
     def __init__(self, client):
         self.client = client
 
-    def segment_image(self, file=None, object_name='主要对象', image_data=None):
+    def segment_image(self, file=None, object_name='主要对象', image_data=None, output_format='png'):
         """分割图像中的对象"""
         try:
             # 处理文件输入
@@ -132,13 +135,29 @@ class ImageSegmentationService:
             if not segments and isinstance(segment_data, list):
                 segments = segment_data
 
+            # Gemini只返回边界框，几何格式下以边界框矩形作为掩码
+            with Image.open(filepath) as original:
+                width, height = original.size
+            encoder = SegmentationEncoder(output_format, (height, width), current_app.config['GENERATED_FOLDER'], 'gemini')
+
             for i, segment_info in enumerate(segments):
                 label = segment_info.get('label', f'{object_name}_{i+1}')
                 description = segment_info.get('description', '')
                 bbox = segment_info.get('bbox', [])
                 confidence = segment_info.get('confidence', 0.9)
 
-                if len(bbox) == 4:
+                if len(bbox) == 4 and encoder.output_format != 'png':
+                    ymin, xmin, ymax, xmax = bbox
+                    x1, y1 = max(0, int(xmin * width)), max(0, int(ymin * height))
+                    x2, y2 = min(width, int(xmax * width)), min(height, int(ymax * height))
+                    segmented_objects.append(encoder.add({
+                        'label': label,
+                        'description': description,
+                        'confidence': confidence,
+                        'bbox': bbox
+                    }, np.ones((max(0, y2 - y1), max(0, x2 - x1)), dtype=np.uint8), (x1, y1)))
+
+                elif len(bbox) == 4:
                     # 创建分割图像（使用边界框裁剪）
                     import time
                     timestamp = int(time.time() * 1000)  # 使用毫秒级时间戳避免重复
@@ -161,12 +180,18 @@ class ImageSegmentationService:
                     })
                     segment_images.append(seg_filepath)
 
+            label_map_path = encoder.save_label_map()
+            if label_map_path:
+                segment_images.append(label_map_path)
+
             if segmented_objects:
                 return {
                     'success': True,
                     'original_image': filepath,
                     'segmented_objects': segmented_objects,
                     'segment_images': segment_images,
+                    'output_format': encoder.output_format,
+                    'label_map': label_map_path,
                     'response_text': response_text
                 }, 200
             else:
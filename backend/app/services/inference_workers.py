@@ -0,0 +1,420 @@
+"""
+多进程推理工作池
+每个工作进程绑定一组CPU核心并持有自己的常驻模型，请求线程通过共享内存传递已解码的图像，
+结果以紧凑的NumPy数组返回，使YOLO推理和OpenCV计算不再与Flask请求线程争用GIL
+"""
+import itertools
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+
+
+# 允许在工作进程中执行的OpenCVService计算方法
+OPENCV_KERNELS = (
+    '_detect_faces_haar',
+    '_detect_contours',
+    '_detect_by_color',
+    '_detect_by_edges',
+    '_contour_mask_segmentation',
+    '_grabcut_segmentation',
+    '_watershed_segmentation',
+    '_kmeans_segmentation',
+    '_detect_methods',
+    '_segment_methods'
+)
+
+# 工作进程需要限制的线程数环境变量，必须在导入数值库之前设置
+_THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS')
+
+# 工作进程中设置的环境变量，值为工作进程编号
+WORKER_ID_ENV = 'INFERENCE_WORKER_ID'
+
+# 等待结果期间检查工作进程是否存活的间隔（秒）
+_LIVENESS_INTERVAL = 0.5
+
+
+def split_cpus(num_workers, cpus_per_worker=0):
+    """将当前进程可用的CPU核心划分给各工作进程"""
+    if hasattr(os, 'sched_getaffinity'):
+        cpus = sorted(os.sched_getaffinity(0))
+    else:
+        cpus = list(range(os.cpu_count() or 1))
+    if not cpus_per_worker:
+        cpus_per_worker = max(1, len(cpus) // num_workers)
+    subsets = []
+    for i in range(num_workers):
+        start = (i * cpus_per_worker) % len(cpus)
+        subsets.append([cpus[(start + j) % len(cpus)] for j in range(min(cpus_per_worker, len(cpus)))])
+    return subsets
+
+
+class SharedImage:
+    """放入共享内存的图像，工作进程按名称映射为ndarray，无需序列化像素数据"""
+
+    def __init__(self, image):
+        image = np.ascontiguousarray(image)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(1, image.nbytes))
+        np.ndarray(image.shape, dtype=image.dtype, buffer=self._shm.buf)[...] = image
+        self.ref = (self._shm.name, image.shape, image.dtype.str)
+
+    def release(self):
+        """释放共享内存"""
+        self._shm.close()
+        self._shm.unlink()
+
+
+def _attach_untracked(name):
+    """映射父进程创建的共享内存，不注册到resource_tracker；共享内存由父进程释放，
+    工作进程注册后会在退出时重复释放或报告泄漏（Python 3.13起可直接使用track=False）"""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    register = resource_tracker.register
+
+    def register_except_shared_memory(resource_name, rtype):
+        if rtype != 'shared_memory':
+            register(resource_name, rtype)
+
+    # 任务在工作进程中串行执行，临时替换不会影响其他映射
+    resource_tracker.register = register_except_shared_memory
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+@contextmanager
+def attach_shared_image(ref):
+    """在工作进程中以只读方式映射共享内存中的图像"""
+    name, shape, dtype = ref
+    shm = _attach_untracked(name)
+    try:
+        image = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        image.flags.writeable = False
+        yield image
+        del image
+    finally:
+        shm.close()
+
+
+def pack_prediction(prediction):
+    """将YOLOPrediction压缩为可跨进程传输的数组字典，掩码概率量化为uint8"""
+    masks = prediction.masks
+    if masks is not None:
+        masks = (np.clip(masks, 0, 1) * 255).astype(np.uint8)
+    return {
+        'boxes': prediction.boxes,
+        'scores': prediction.scores,
+        'class_ids': prediction.class_ids,
+        'orig_shape': prediction.orig_shape,
+        'masks': masks,
+        'mask_extents': prediction.mask_extents
+    }
+
+
+def unpack_prediction(data):
+    """从数组字典还原YOLOPrediction"""
+    from .yolo_prediction import YOLOPrediction
+
+    masks = data['masks']
+    if masks is not None:
+        masks = masks.astype(np.float32) / 255.0
+    return YOLOPrediction(data['boxes'], data['scores'], data['class_ids'], data['orig_shape'],
+                          masks, data['mask_extents'])
+
+
+def _worker_main(worker_id, cpus, config_name, task_queue, result_queue):
+    """工作进程入口：绑定CPU、创建应用并循环执行任务"""
+    if cpus and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpus)
+
+    # 工作进程内不再创建子工作池，且任务串行执行，绑定的核心全部分配给单个任务
+    os.environ['INFERENCE_WORKERS'] = '0'
+    os.environ['REQUEST_CONCURRENCY'] = '1'
+    # 日志文件只由主进程写入和轮转
+    os.environ[WORKER_ID_ENV] = str(worker_id)
+    from app import create_app
+    from .thread_budget import thread_budget
+    from .yolo_model_registry import model_registry
+
+    app = create_app(config_name)
+    app.app_context().push()
+    opencv_service = None
+
+    result_queue.put(('ready', worker_id, {
+        'pid': os.getpid(),
+        'cpus': cpus,
+        'preload_errors': model_registry.preload_errors
+    }))
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        task_id, kind, payload, image_refs = task
+        thread_budget.apply()
+        try:
+            if kind == 'yolo':
+                model_name, backend, precision, kwargs = payload
+                handle = model_registry.get_handle(model_name, backend, precision)
+                with _attached_images(image_refs) as images:
+                    source = images if isinstance(image_refs, list) else images[0]
+                    result = [pack_prediction(p) for p in handle.predict(source, **kwargs)]
+            elif kind == 'names':
+                model_name, backend, precision = payload
+                result = dict(model_registry.get_handle(model_name, backend, precision).names)
+            elif kind == 'opencv':
+                method_name, args = payload
+                if method_name not in OPENCV_KERNELS:
+                    raise ValueError(f'不允许在工作进程中执行的方法: {method_name}')
+                if opencv_service is None:
+                    from .image_context import ImageContext
+                    from .opencv_service import OpenCVService
+                    opencv_service = OpenCVService()
+                with _attached_images(image_refs) as images:
+                    # 共享内存在任务结束后释放，图像上下文使用副本
+                    context = ImageContext(None, images[0].copy())
+                    result = getattr(opencv_service, method_name)(context, *args)
+            elif kind == 'status':
+                result = {
+                    'resident_models': model_registry.get_resident_models(),
+                    'cache': model_registry.get_cache_stats()
+                }
+            else:
+                raise ValueError(f'未知的任务类型: {kind}')
+            result_queue.put(('result', task_id, (True, result)))
+        except Exception as e:
+            result_queue.put(('result', task_id, (False, f'{type(e).__name__}: {e}')))
+
+
+@contextmanager
+def _attached_images(image_refs):
+    """映射任务中的全部共享内存图像"""
+    refs = image_refs if isinstance(image_refs, list) else [image_refs]
+    contexts = [attach_shared_image(ref) for ref in refs if ref is not None]
+    images = [context.__enter__() for context in contexts]
+    try:
+        yield images
+    finally:
+        for context in contexts:
+            context.__exit__(None, None, None)
+
+
+class _Worker:
+    """父进程中对单个工作进程的记录"""
+
+    def __init__(self, worker_id, cpus, process, task_queue):
+        self.worker_id = worker_id
+        self.cpus = cpus
+        self.process = process
+        self.task_queue = task_queue
+        self.pending = 0
+        self.completed = 0
+        self.info = {}
+
+
+class InferenceWorkerPool:
+    """多进程推理工作池"""
+
+    def __init__(self, num_workers, cpus_per_worker=0, config_name='default', timeout=300):
+        self.num_workers = num_workers
+        self.cpus_per_worker = cpus_per_worker
+        self.config_name = config_name
+        self.timeout = timeout
+        self._context = multiprocessing.get_context('spawn')
+        self._result_queue = self._context.Queue()
+        self._workers = []
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._task_ids = itertools.count()
+        self._names_cache = {}
+        self.ready = False
+
+    def start(self, wait=True):
+        """启动工作进程，wait为True时等待所有进程完成初始化"""
+        for worker_id, cpus in enumerate(split_cpus(self.num_workers, self.cpus_per_worker)):
+            task_queue = self._context.Queue()
+            process = self._context.Process(
+                target=_worker_main,
+                args=(worker_id, cpus, self.config_name, task_queue, self._result_queue),
+                name=f'inference-worker-{worker_id}',
+                daemon=True
+            )
+            with _thread_env(len(cpus)):
+                process.start()
+            self._workers.append(_Worker(worker_id, cpus, process, task_queue))
+            print(f"推理工作进程 {worker_id} 已启动，绑定CPU: {cpus}")
+
+        self._ready_event = threading.Event()
+        self._ready_count = 0
+        threading.Thread(target=self._collect_results, name='inference-results', daemon=True).start()
+        if wait:
+            self._ready_event.wait(self.timeout)
+
+    def _collect_results(self):
+        """接收工作进程返回的结果并唤醒等待的请求线程"""
+        while True:
+            kind, key, payload = self._result_queue.get()
+            if kind == 'ready':
+                self._workers[key].info = payload
+                self._ready_count += 1
+                if self._ready_count == len(self._workers):
+                    self.ready = True
+                    self._ready_event.set()
+                continue
+            with self._lock:
+                future = self._futures.pop(key, None)
+            if future is not None:
+                future['result'] = payload
+                future['event'].set()
+
+    def _submit(self, kind, payload, images=None, worker=None):
+        """提交任务到负载最小的工作进程并等待结果"""
+        shared = []
+        try:
+            if isinstance(images, list):
+                shared = [SharedImage(image) for image in images]
+                refs = [item.ref for item in shared]
+            elif images is not None:
+                shared = [SharedImage(images)]
+                refs = shared[0].ref
+            else:
+                refs = None
+
+            task_id = next(self._task_ids)
+            future = {'event': threading.Event(), 'result': None}
+            with self._lock:
+                if worker is None:
+                    alive = [w for w in self._workers if w.process.is_alive()]
+                    if not alive:
+                        self.ready = False
+                        raise BrokenProcessPool('所有推理工作进程均已退出')
+                    worker = min(alive, key=lambda w: w.pending)
+                worker.pending += 1
+                self._futures[task_id] = future
+            try:
+                worker.task_queue.put((task_id, kind, payload, refs))
+                self._wait_result(worker, task_id, future)
+            finally:
+                with self._lock:
+                    worker.pending -= 1
+                    worker.completed += 1
+        finally:
+            for item in shared:
+                item.release()
+
+        ok, result = future['result']
+        if not ok:
+            raise RuntimeError(result)
+        return result
+
+    def _wait_result(self, worker, task_id, future):
+        """等待任务结果，工作进程退出时立即失败，不必等到超时"""
+        deadline = time.monotonic() + self.timeout
+        while not future['event'].wait(min(_LIVENESS_INTERVAL, max(0.0, deadline - time.monotonic()))):
+            if not worker.process.is_alive():
+                with self._lock:
+                    self._futures.pop(task_id, None)
+                # 进程退出后其常驻模型丢失，工作池不再视为就绪
+                self.ready = False
+                raise BrokenProcessPool(f'推理工作进程 {worker.worker_id} 已退出'
+                                        f'（退出码 {worker.process.exitcode}）')
+            if time.monotonic() >= deadline:
+                with self._lock:
+                    self._futures.pop(task_id, None)
+                raise TimeoutError(f'推理工作进程 {worker.worker_id} 超时未返回结果')
+
+    def predict(self, model_name, backend, precision, image, **kwargs):
+        """在工作进程中执行YOLO推理"""
+        results = self._submit('yolo', (model_name, backend, precision, kwargs), image)
+        return [unpack_prediction(data) for data in results]
+
+    def get_names(self, model_name, backend, precision):
+        """获取模型类别名称，首次调用时由工作进程加载模型"""
+        key = (model_name, backend, precision)
+        if key not in self._names_cache:
+            self._names_cache[key] = self._submit('names', key)
+        return self._names_cache[key]
+
+    def run_opencv(self, method_name, image, *args):
+        """在工作进程中执行OpenCVService计算方法"""
+        return self._submit('opencv', (method_name, args), image)
+
+    def get_status(self, detailed=True):
+        """获取各工作进程的状态，detailed为True时查询各进程的常驻模型"""
+        status = []
+        for worker in self._workers:
+            item = {
+                'worker_id': worker.worker_id,
+                'pid': worker.process.pid,
+                'alive': worker.process.is_alive(),
+                'cpus': worker.cpus,
+                'pending': worker.pending,
+                'completed': worker.completed,
+                'preload_errors': worker.info.get('preload_errors', {})
+            }
+            if detailed and item['alive'] and self.ready:
+                try:
+                    item.update(self._submit('status', None, worker=worker))
+                except Exception as e:
+                    item['error'] = str(e)
+            status.append(item)
+        return status
+
+    def shutdown(self):
+        """停止所有工作进程"""
+        for worker in self._workers:
+            worker.task_queue.put(None)
+        for worker in self._workers:
+            worker.process.join(timeout=5)
+
+
+@contextmanager
+def _thread_env(num_threads):
+    """临时设置线程数环境变量，由spawn启动的子进程继承"""
+    previous = {name: os.environ.get(name) for name in _THREAD_ENV_VARS}
+    for name in _THREAD_ENV_VARS:
+        os.environ[name] = str(num_threads)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+class RemoteModelHandle:
+    """与ModelHandle接口一致的句柄，推理在工作进程中执行"""
+
+    def __init__(self, pool, name, model_name, backend, precision):
+        self._pool = pool
+        self.name = name
+        self.model_name = model_name
+        self.backend = backend
+        self.precision = precision
+        # 切片推理按工作进程数并行分发
+        self.max_replicas = pool.num_workers
+
+    @property
+    def names(self):
+        """模型类别名称映射"""
+        return self._pool.get_names(self.model_name, self.backend, self.precision)
+
+    def predict(self, image, **kwargs):
+        """通过共享内存把图像交给工作进程推理"""
+        return self._pool.predict(self.model_name, self.backend, self.precision, image, **kwargs)
+
+    __call__ = predict
+
+    def warm_up(self, imgsz=640):
+        """工作进程在各自启动时完成预热"""
+        started_at = time.perf_counter()
+        self.predict(np.zeros((imgsz, imgsz, 3), dtype=np.uint8), conf=0.25)
+        return round((time.perf_counter() - started_at) * 1000, 1)
@@ -0,0 +1,127 @@
+"""
+多尺度GrabCut
+每个种子框（检测结果或中心矩形）只在框及其周围区域内求解：先在分析用的金字塔层上完成全部迭代，
+再以原图分辨率只细化放大后前景边界附近的窄带：仅对窄带经过的分块求解，窄带以外的像素沿用低分辨率结果；
+多个种子框并行求解
+"""
+from concurrent.futures import ThreadPoolExecutor
+import math
+import cv2
+import numpy as np
+
+
+# 低分辨率求解和原图细化的迭代次数
+COARSE_ITERATIONS = 5
+REFINE_ITERATIONS = 2
+
+# 求解区域在种子框四周扩展的比例，为GrabCut提供背景样本
+ROI_MARGIN = 0.2
+
+# 种子框在金字塔层上的短边小于该值时直接在原图求解
+MIN_COARSE_SIDE = 16
+
+# 原图细化的分块边长，及每个分块四周参与求解的上下文宽度
+REFINE_BLOCK = 128
+REFINE_CONTEXT = 32
+
+
+def _foreground(mask):
+    """GrabCut掩码中确定和可能的前景（0/1）"""
+    return ((mask == cv2.GC_FGD) | (mask == cv2.GC_PR_FGD)).astype(np.uint8)
+
+
+def _grabcut(image, mask, rect, iterations, mode):
+    bgd_model = np.zeros((1, 65), np.float64)
+    fgd_model = np.zeros((1, 65), np.float64)
+    cv2.grabCut(image, mask, rect, bgd_model, fgd_model, iterations, mode)
+    return mask
+
+
+def _refine_band(image, mask, band):
+    """只在窄带经过的分块内以掩码初始化求解GrabCut，每块连同上下文求解、只写回块内结果，返回前景掩码"""
+    foreground = _foreground(mask)
+    height, width = band.shape
+    rows, cols = math.ceil(height / REFINE_BLOCK), math.ceil(width / REFINE_BLOCK)
+    padded = np.zeros((rows * REFINE_BLOCK, cols * REFINE_BLOCK), dtype=bool)
+    padded[:height, :width] = band
+    occupied = padded.reshape(rows, REFINE_BLOCK, cols, REFINE_BLOCK).any(axis=(1, 3))
+
+    for row, col in zip(*np.nonzero(occupied)):
+        y1, x1 = row * REFINE_BLOCK, col * REFINE_BLOCK
+        y2, x2 = min(height, y1 + REFINE_BLOCK), min(width, x1 + REFINE_BLOCK)
+        cy1, cx1 = max(0, y1 - REFINE_CONTEXT), max(0, x1 - REFINE_CONTEXT)
+        cy2, cx2 = min(height, y2 + REFINE_CONTEXT), min(width, x2 + REFINE_CONTEXT)
+        block = mask[cy1:cy2, cx1:cx2].copy()
+        block_foreground = _foreground(block)
+        # 前景或背景样本缺失时无法建立颜色模型，保留低分辨率结果
+        if block_foreground.all() or not block_foreground.any():
+            continue
+        block = _grabcut(image[cy1:cy2, cx1:cx2], block, None, REFINE_ITERATIONS, cv2.GC_INIT_WITH_MASK)
+        foreground[y1:y2, x1:x2] = _foreground(block[y1 - cy1:y2 - cy1, x1 - cx1:x2 - cx1])
+    return foreground
+
+
+def _solve_rect(image, rect):
+    """以矩形初始化求解GrabCut，返回前景掩码"""
+    mask = np.zeros(image.shape[:2], np.uint8)
+    return _foreground(_grabcut(image, mask, rect, COARSE_ITERATIONS, cv2.GC_INIT_WITH_RECT))
+
+
+def segment_box(image, level, box, band_width=8):
+    """对原图像素坐标的种子框 (x1, y1, x2, y2) 求解GrabCut，level为同一图像的缩小版本；
+    返回 (求解区域内的前景掩码0/1, 求解区域在原图的左上角)，无法求解时掩码为None"""
+    height, width = image.shape[:2]
+    x1, y1, x2, y2 = box
+    margin_x, margin_y = int((x2 - x1) * ROI_MARGIN), int((y2 - y1) * ROI_MARGIN)
+    rx1, ry1 = max(0, x1 - margin_x), max(0, y1 - margin_y)
+    rx2, ry2 = min(width, x2 + margin_x), min(height, y2 + margin_y)
+    roi = image[ry1:ry2, rx1:rx2]
+    rect = (x1 - rx1, y1 - ry1, x2 - x1, y2 - y1)
+
+    scale_x, scale_y = level.shape[1] / width, level.shape[0] / height
+    try:
+        if scale_x >= 1 or min((x2 - x1) * scale_x, (y2 - y1) * scale_y) < MIN_COARSE_SIDE:
+            return _solve_rect(roi, rect), (rx1, ry1)
+
+        # 在金字塔层上求解
+        lx1, ly1 = int(rx1 * scale_x), int(ry1 * scale_y)
+        lx2, ly2 = min(level.shape[1], math.ceil(rx2 * scale_x)), min(level.shape[0], math.ceil(ry2 * scale_y))
+        cx1, cy1 = int(round(x1 * scale_x)) - lx1, int(round(y1 * scale_y)) - ly1
+        coarse_rect = (cx1, cy1,
+                       max(1, min(lx2 - lx1 - cx1, int(round((x2 - x1) * scale_x)))),
+                       max(1, min(ly2 - ly1 - cy1, int(round((y2 - y1) * scale_y)))))
+        coarse = _solve_rect(level[ly1:ly2, lx1:lx2], coarse_rect)
+        foreground = cv2.resize(coarse, (rx2 - rx1, ry2 - ry1), interpolation=cv2.INTER_NEAREST)
+    except cv2.error as e:
+        print(f"GrabCut 求解失败: {e}")
+        return None, (rx1, ry1)
+
+    if not foreground.any() or foreground.all():
+        return foreground, (rx1, ry1)
+
+    # 只有前景边界附近的窄带标记为待定，窄带宽度至少覆盖两个低分辨率像素
+    radius = max(band_width, math.ceil(2 / min(scale_x, scale_y)))
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (2 * radius + 1, 2 * radius + 1))
+    band = cv2.morphologyEx(foreground, cv2.MORPH_GRADIENT, kernel) > 0
+    mask = np.where(foreground > 0, cv2.GC_FGD, cv2.GC_BGD).astype(np.uint8)
+    mask[band] = np.where(foreground[band] > 0, cv2.GC_PR_FGD, cv2.GC_PR_BGD)
+
+    # 种子框以外始终为背景
+    outside = np.ones(mask.shape, dtype=bool)
+    outside[rect[1]:rect[1] + rect[3], rect[0]:rect[0] + rect[2]] = False
+    mask[outside] = cv2.GC_BGD
+
+    try:
+        return _refine_band(roi, mask, mask >= cv2.GC_PR_BGD), (rx1, ry1)
+    except cv2.error as e:
+        print(f"GrabCut 细化失败，使用低分辨率结果: {e}")
+        return foreground, (rx1, ry1)
+
+
+def segment_boxes(image, level, boxes, band_width=8, workers=1):
+    """对每个种子框求解GrabCut，多个种子框时并行计算，结果顺序与boxes相同"""
+    workers = min(len(boxes), max(1, int(workers)))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='grabcut') as executor:
+            return list(executor.map(lambda box: segment_box(image, level, box, band_width), boxes))
+    return [segment_box(image, level, box, band_width) for box in boxes]
@@ -9,6 +9,30 @@ import tempfile
 import base64
 from flask import current_app
 from ..utils.helpers import save_uploaded_file, allowed_file
+from .class_synonyms import canonical_classes, semantic_group
+from .color_kmeans import KMEANS_MODES, assign_centers, fit_centers_full, fit_centers_histogram, fit_centers_sample
+from .hsv_color_classes import DETECTION_COLORS, FEATURE_COLORS
+from .image_context import ImageContext, upscale_mask
+from .multiscale_grabcut import segment_boxes
+from .result_cache import result_cache
+from .segmentation_output import SegmentationEncoder, normalize_output_format
+from .thread_budget import limit_concurrency, thread_budget
+
+
+# 影响OpenCV检测/分割结果的配置项
+ANALYSIS_SETTINGS = ('OPENCV_ANALYSIS_SIZE', 'OPENCV_KMEANS_MODE', 'OPENCV_KMEANS_K', 'OPENCV_KMEANS_SEED',
+                     'OPENCV_KMEANS_SAMPLE_SIZE', 'OPENCV_KMEANS_HISTOGRAM_BINS', 'OPENCV_GRABCUT_SEED',
+                     'OPENCV_GRABCUT_MAX_ROIS', 'OPENCV_GRABCUT_BAND')
+
+# GrabCut种子框来源
+GRABCUT_SEEDS = ('center', 'contour', 'yolo')
+
+# 内容验证和GrabCut种子框使用的YOLO检测模型
+YOLO_VALIDATION_MODEL = 'yolo11n'
+
+# 可用的检测和分割方法，method为all或方法列表时在同一图像上下文中依次执行，共享灰度、模糊、边缘和阈值等中间平面
+DETECTION_METHODS = ('haar', 'contour', 'color', 'edge')
+SEGMENTATION_METHODS = ('contour_mask', 'grabcut', 'watershed', 'kmeans')
 
 
 class OpenCVService:
@@ -32,9 +56,83 @@ class OpenCVService:
         except Exception as e:
             print(f"YOLO 模型加载失败: {e}")
 
+    def _run_kernel(self, method_name, context, *args):
+        """执行检测/分割计算，启用多进程推理时将解码后的图像交给工作进程处理"""
+        from .yolo_model_registry import model_registry
+
+        if model_registry.worker_pool is not None:
+            return model_registry.worker_pool.run_opencv(method_name, context.bgr, *args)
+        return getattr(self, method_name)(context, *args)
+
+    def _analysis_settings(self):
+        """影响检测/分割结果的配置项，作为结果缓存键的一部分；YOLO内容验证和GrabCut种子框
+        还取决于YOLO推理的有效配置"""
+        from .yolo_model_registry import model_registry
+
+        settings = {key: current_app.config.get(key) for key in ANALYSIS_SETTINGS}
+        settings.update(model_registry.result_settings())
+        return settings
+
+    def _analysis_level(self, context):
+        """返回用于检测/分割计算的金字塔层，及面积阈值（以工作分辨率下的像素计）换算到该层的比例"""
+        analysis_size = current_app.config.get('OPENCV_ANALYSIS_SIZE', 0)
+        level = context.pyramid_level(analysis_size)
+        return level, level.area_scale(analysis_size)
+
+    def _parse_methods(self, method, available, all_methods=None):
+        """解析method参数：all、逗号分隔的方法名或方法列表返回方法列表，单个方法名返回None；
+        all展开为all_methods（默认为全部可用方法），包含不支持的方法时抛出ValueError"""
+        if isinstance(method, (list, tuple)):
+            names = [str(name).strip() for name in method]
+        elif isinstance(method, str) and (method.strip() == 'all' or ',' in method):
+            names = [name.strip() for name in method.split(',')]
+        else:
+            return None
+
+        methods = []
+        for name in names:
+            for expanded in (all_methods or available) if name == 'all' else [name]:
+                if expanded and expanded not in methods:
+                    methods.append(expanded)
+        if not methods:
+            raise ValueError(f'未指定OpenCV方法，可选: all, {", ".join(available)}')
+        unknown = [name for name in methods if name not in available]
+        if unknown:
+            raise ValueError(f'不支持的OpenCV方法: {", ".join(unknown)}，可选: all, {", ".join(available)}')
+        return methods
+
+    @staticmethod
+    def _haar_applicable(object_name):
+        """Haar Cascade仅支持人脸检测，查询为空或与人脸相关时可用"""
+        return not (object_name and object_name.strip() and '人脸' not in object_name and '脸' not in object_name
+                    and 'face' not in object_name.lower())
+
     def detect_objects_opencv(self, file=None, image_data=None, method='contour', object_name='对象'):
-        """使用 OpenCV 进行目标检测"""
+        """使用 OpenCV 进行目标检测，相同图像和参数的成功结果直接从缓存返回，无需保存和解码图像"""
+        cache_key = result_cache.make_key('opencv_detection', file=file, image_data=image_data,
+                                          method=method, object_name=object_name, settings=self._analysis_settings())
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            return cached, 200
+
+        result, status_code = self._detect_objects_opencv(file, image_data, method, object_name)
+        if status_code == 200 and result.get('success'):
+            result_cache.set(cache_key, result)
+        return result, status_code
+
+    @limit_concurrency
+    def _detect_objects_opencv(self, file, image_data, method, object_name):
+        """执行 OpenCV 目标检测，返回 (结果, 状态码)"""
         try:
+
+            # method为all或方法列表时一次返回多个方法的结果，all只在查询与人脸相关时包含Haar Cascade
+            try:
+                methods = self._parse_methods(method, DETECTION_METHODS, [
+                    name for name in DETECTION_METHODS if name != 'haar' or self._haar_applicable(object_name)
+                ])
+            except ValueError as e:
+                return {'success': False, 'error': str(e)}, 400
+
             # 处理文件输入
             if image_data:
                 image_data_clean = image_data.split(',')[1] if ',' in image_data else image_data
@@ -72,78 +170,22 @@ class OpenCVService:
                 print(error_msg)
                 return {'success': False, 'error': error_msg}, 400
 
-            # 读取图像 - 使用多种方法确保能够读取
-            image = None
-
-            # 方法1: 直接使用cv2.imread
-            try:
-                image = cv2.imread(filepath)
-                if image is not None and image.size > 0:
-                    print("使用cv2.imread成功读取图像")
-                else:
-                    image = None
-            except Exception as e:
-                print(f"cv2.imread 失败: {e}")
-
-            # 方法2: 如果直接读取失败，使用PIL转换
-            if image is None:
-                try:
-                    from PIL import Image as PILImage
-                    pil_image = PILImage.open(filepath)
-
-                    # 检查图像是否有效
-                    if pil_image.size[0] == 0 or pil_image.size[1] == 0:
-                        raise ValueError("图像尺寸无效")
-
-                    # 转换为RGB（如果是RGBA）
-                    if pil_image.mode == 'RGBA':
-                        pil_image = pil_image.convert('RGB')
-                    elif pil_image.mode == 'P':
-                        pil_image = pil_image.convert('RGB')
-
-                    # 转换为numpy数组
-                    image_array = np.array(pil_image)
-                    # PIL使用RGB，OpenCV使用BGR，需要转换
-                    image = cv2.cvtColor(image_array, cv2.COLOR_RGB2BGR)
-                    print("使用PIL成功读取图像")
-                except Exception as e:
-                    print(f"PIL读取失败: {e}")
-
-            # 方法3: 如果还是失败，尝试使用numpy直接读取
-            if image is None:
-                try:
-                    # 读取文件字节
-                    with open(filepath, 'rb') as f:
-                        file_bytes = f.read()
-
-                    if len(file_bytes) == 0:
-                        raise ValueError("文件内容为空")
-
-                    # 使用numpy和cv2解码
-                    nparr = np.frombuffer(file_bytes, np.uint8)
-                    image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-
-                    if image is not None and image.size > 0:
-                        print("使用numpy成功读取图像")
-                    else:
-                        image = None
-                except Exception as e:
-                    print(f"numpy读取失败: {e}")
-
-            if image is None:
+            # 解码图像一次，后续验证、检测和绘制共享同一个图像上下文
+            context = ImageContext.load(filepath)
+            if context is None:
                 error_msg = f'无法读取图像文件: {filepath}。文件可能已损坏或格式不支持。文件大小: {file_size} 字节'
                 print(error_msg)
                 return {'success': False, 'error': error_msg}, 400
 
             # 验证图像尺寸
-            if image.shape[0] == 0 or image.shape[1] == 0:
-                error_msg = f'图像尺寸无效: {filepath}。图像尺寸: {image.shape}'
+            if context.height == 0 or context.width == 0:
+                error_msg = f'图像尺寸无效: {filepath}。图像尺寸: {context.shape}'
                 print(error_msg)
                 return {'success': False, 'error': error_msg}, 400
 
             # 如果用户指定了特定对象名称，进行内容验证
             if object_name and object_name.strip() and object_name.strip() != '对象':
-                validation_result = self._validate_image_content(filepath, object_name.strip())
+                validation_result = self._validate_image_content(context, object_name.strip())
                 if not validation_result['is_match']:
                     return {
                         'success': False,
@@ -154,24 +196,27 @@ class OpenCVService:
                         'alternative_queries': validation_result.get('alternative_queries', [])
                     }, 200  # 改为200状态码，让前端正确处理内容不匹配
 
+            if methods is not None:
+                return self._detect_with_methods(context, filepath, methods, object_name)
+
             detected_objects = []
 
             if method == 'haar':
                 # 使用 Haar Cascade 检测（仅限人脸）
                 # 验证是否与用户查询匹配
-                if object_name and object_name.strip() and '人脸' not in object_name and '脸' not in object_name and 'face' not in object_name.lower():
+                if not self._haar_applicable(object_name):
                     return {
                         'success': False,
                         'error': f'未检测到目标：{object_name}',
                         'message': f'Haar Cascade方法仅支持人脸检测，但您查询的是"{object_name}"',
                         'suggestion': '请使用其他检测方法或修改查询为"人脸"'
                     }, 200  # 改为200状态码
-                detected_objects = self._detect_faces_haar(image)
+                detected_objects = self._run_kernel('_detect_faces_haar', context)
             elif method == 'contour':
                 # 使用轮廓检测（通用对象检测）
                 # 首先验证图像内容是否包含用户查询的对象
                 if object_name and object_name.strip():
-                    content_match = self._validate_image_content(filepath, object_name)
+                    content_match = self._validate_image_content(context, object_name)
                     if not content_match['is_match']:
                         return {
                             'success': False,
@@ -181,12 +226,12 @@ class OpenCVService:
                             'detected_objects': content_match.get('detected_objects', []),
                             'alternative_queries': content_match.get('alternative_queries', [])
                         }, 200  # 改为200状态码
-                detected_objects = self._detect_contours(image, object_name)
+                detected_objects = self._run_kernel('_detect_contours', context, object_name)
             elif method == 'color':
                 # 使用颜色分割检测
                 # 验证图像内容
                 if object_name and object_name.strip():
-                    content_match = self._validate_image_content(filepath, object_name)
+                    content_match = self._validate_image_content(context, object_name)
                     if not content_match['is_match']:
                         return {
                             'success': False,
@@ -196,12 +241,12 @@ class OpenCVService:
                             'detected_objects': content_match.get('detected_objects', []),
                             'alternative_queries': content_match.get('alternative_queries', [])
                         }, 200  # 改为200状态码
-                detected_objects = self._detect_by_color(image, object_name)
+                detected_objects = self._run_kernel('_detect_by_color', context, object_name)
             elif method == 'edge':
                 # 使用边缘检测
                 # 验证图像内容
                 if object_name and object_name.strip():
-                    content_match = self._validate_image_content(filepath, object_name)
+                    content_match = self._validate_image_content(context, object_name)
                     if not content_match['is_match']:
                         return {
                             'success': False,
@@ -211,21 +256,11 @@ class OpenCVService:
                             'detected_objects': content_match.get('detected_objects', []),
                             'alternative_queries': content_match.get('alternative_queries', [])
                         }, 200  # 改为200状态码
-                detected_objects = self._detect_by_edges(image, object_name)
-
-            # 生成带边界框的图像
-            bbox_images = []
-            for i, obj in enumerate(detected_objects):
-                bbox_filename = f"opencv_bbox_{obj['label']}_{i}_{os.path.basename(filepath)}"
-                bbox_filepath = os.path.join(current_app.config['GENERATED_FOLDER'], bbox_filename)
-                self._draw_opencv_bbox(filepath, obj['bbox'], bbox_filepath, obj['label'], obj['method'], i)
-                bbox_images.append(bbox_filepath)
+                detected_objects = self._run_kernel('_detect_by_edges', context, object_name)
 
             if detected_objects:
-                # 创建汇总图片
-                summary_filename = f"opencv_summary_{os.path.basename(filepath)}"
-                summary_filepath = os.path.join(current_app.config['GENERATED_FOLDER'], summary_filename)
-                self._draw_all_opencv_bboxes(filepath, detected_objects, summary_filepath)
+                # 生成带边界框的图像和汇总图片
+                bbox_images, summary_filepath = self._draw_detection_images(context, detected_objects, filepath)
 
                 return {
                     'success': True,
@@ -247,7 +282,83 @@ class OpenCVService:
             print(f"OpenCV 检测错误: {e}")
             return {'success': False, 'error': error_msg}, 500
 
-    def _validate_image_content(self, image_path, object_name):
+    def _detect_with_methods(self, context, filepath, methods, object_name):
+        """在同一图像上下文中执行多个检测方法，合并结果并按方法分别汇总，返回 (结果, 状态码)"""
+        errors = {}
+        if 'haar' in methods and not self._haar_applicable(object_name):
+            errors['haar'] = f'Haar Cascade方法仅支持人脸检测，但您查询的是"{object_name}"'
+        kernel_methods = [name for name in methods if name not in errors]
+
+        # 内容验证只需一次（Haar Cascade除外，与单个方法时相同）
+        if object_name and object_name.strip() and any(name != 'haar' for name in kernel_methods):
+            content_match = self._validate_image_content(context, object_name)
+            if not content_match['is_match']:
+                return {
+                    'success': False,
+                    'error': f'未检测到目标：{object_name}',
+                    'message': content_match["message"],
+                    'suggestion': content_match.get('suggestion', '请检查图像内容或修改查询词汇。'),
+                    'detected_objects': content_match.get('detected_objects', []),
+                    'alternative_queries': content_match.get('alternative_queries', [])
+                }, 200
+
+        results = {}
+        if kernel_methods:
+            results, kernel_errors = self._run_kernel('_detect_methods', context, kernel_methods, object_name)
+            errors.update(kernel_errors)
+
+        detected_objects = []
+        method_results = {}
+        for name in methods:
+            if name in errors:
+                method_results[name] = {'success': False, 'error': errors[name]}
+                continue
+            method_results[name] = {'success': bool(results[name]), 'count': len(results[name]),
+                                    'detected_objects': results[name]}
+            detected_objects.extend(results[name])
+
+        method_label = f'OpenCV {", ".join(methods)}'
+        if not detected_objects:
+            return {
+                'success': False,
+                'error': f'使用 OpenCV {", ".join(methods)} 方法未检测到对象',
+                'method': method_label,
+                'methods': method_results
+            }, 200
+
+        bbox_images, summary_filepath = self._draw_detection_images(context, detected_objects, filepath)
+        return {
+            'success': True,
+            'detected_objects': detected_objects,
+            'original_image': filepath,
+            'bbox_images': bbox_images,
+            'summary_image': summary_filepath,
+            'method': method_label,
+            'methods': method_results
+        }, 200
+
+    def _draw_detection_images(self, context, detected_objects, filepath):
+        """为每个检测结果绘制边界框图像，并绘制汇总图片，返回 (边界框图像路径列表, 汇总图片路径)"""
+        bbox_images = []
+        for i, obj in enumerate(detected_objects):
+            bbox_filename = f"opencv_bbox_{obj['label']}_{i}_{os.path.basename(filepath)}"
+            bbox_filepath = os.path.join(current_app.config['GENERATED_FOLDER'], bbox_filename)
+            self._draw_opencv_bbox(context, obj['bbox'], bbox_filepath, obj['label'], obj['method'], i)
+            bbox_images.append(bbox_filepath)
+
+        summary_filename = f"opencv_summary_{os.path.basename(filepath)}"
+        summary_filepath = os.path.join(current_app.config['GENERATED_FOLDER'], summary_filename)
+        self._draw_all_opencv_bboxes(context, detected_objects, summary_filepath)
+        return bbox_images, summary_filepath
+
+    def _validate_image_content(self, context, object_name):
+        """验证图像上下文是否包含指定对象，同一请求内相同查询的验证结果直接复用"""
+        key = object_name.strip().lower()
+        if key not in context.validations:
+            context.validations[key] = self._validate_content(context, object_name)
+        return context.validations[key]
+
+    def _validate_content(self, context, object_name):
         """改进的图像内容验证方法 - 更严格的验证策略"""
         try:
             print(f"OpenCV内容验证：开始验证图像是否包含 '{object_name}'")
@@ -265,7 +376,7 @@ class OpenCVService:
                 }
 
             # 方法1: 首先尝试使用YOLO进行快速验证（如果可用）
-            yolo_validation = self._validate_with_yolo(image_path, object_name)
+            yolo_validation = self._validate_with_yolo(context, object_name)
             if yolo_validation['is_available']:
                 if yolo_validation['is_match']:
                     print(f"YOLO验证成功：检测到 '{object_name}'")
@@ -289,7 +400,7 @@ class OpenCVService:
                     }
 
             # 方法2: 如果YOLO不可用，使用Gemini进行详细验证
-            gemini_validation = self._validate_with_gemini(image_path, object_name)
+            gemini_validation = self._validate_with_gemini(context.path, object_name)
             if gemini_validation.get('is_available', True):
                 if gemini_validation['is_match']:
                     print(f"Gemini验证成功：检测到 '{object_name}'")
@@ -313,7 +424,7 @@ class OpenCVService:
                     }
 
             # 方法3: 如果前两种方法都不可用，使用OpenCV基础特征验证（更严格）
-            opencv_validation = self._validate_with_opencv_features(image_path, object_name)
+            opencv_validation = self._validate_with_opencv_features(context, object_name)
             if opencv_validation['is_match']:
                 print(f"OpenCV特征验证成功：检测到相关特征")
                 return {
@@ -360,46 +471,29 @@ class OpenCVService:
                 'detected_objects': []
             }
 
-    def _validate_with_yolo(self, image_path, object_name):
+    def _validate_with_yolo(self, context, object_name):
         """使用YOLO进行内容验证"""
         try:
             # 尝试导入YOLO相关模块
-            from ultralytics import YOLO
-            import cv2
+            import ultralytics
+            from .yolo_model_registry import model_registry
 
             # 检查是否有可用的YOLO模型
-            yolo_model_path = 'yolo11n.pt'  # 使用检测模型而不是分割模型
-            if not os.path.exists(yolo_model_path):
+            if not model_registry.has_weights(YOLO_VALIDATION_MODEL):
                 return {
                     'is_available': False,
                     'is_match': False,
                     'message': 'YOLO模型不可用'
                 }
 
-            # 加载YOLO模型
-            model = YOLO(yolo_model_path)
-
-            # 读取图像
-            image = cv2.imread(image_path)
-            if image is None:
-                return {
-                    'is_available': True,
-                    'is_match': False,
-                    'message': '无法读取图像'
-                }
-
-            # 进行检测
-            results = model(image, conf=0.3)  # 使用较低的置信度
+            # 进行检测，结果缓存在图像上下文中供GrabCut种子框复用
+            model, results = self._yolo_predictions(context)
 
             detected_objects = []
             for result in results:
-                if result.boxes is not None:
-                    classes = result.boxes.cls.cpu().numpy()
-                    confidences = result.boxes.conf.cpu().numpy()
-
-                    for cls, conf in zip(classes, confidences):
-                        class_name = model.names[int(cls)]
-                        detected_objects.append(class_name)
+                for cls in result.class_ids:
+                    class_name = model.names[int(cls)]
+                    detected_objects.append(class_name)
 
             # 检查是否匹配用户查询
             is_match = self._check_object_match(object_name, detected_objects)
@@ -424,6 +518,17 @@ class OpenCVService:
                 'message': f'YOLO验证出错: {str(e)}'
             }
 
+    def _yolo_predictions(self, context):
+        """以较低置信度运行YOLO检测，返回 (模型句柄, 推理结果)，同一图像上下文只推理一次"""
+        from .yolo_model_registry import model_registry
+
+        def predict():
+            # 从共享注册表获取YOLO模型句柄，避免每次验证重复加载权重
+            model = model_registry.get_handle(YOLO_VALIDATION_MODEL)
+            return model, model.predict(context.bgr, conf=0.3)  # 使用较低的置信度
+
+        return context.cached('yolo_predictions', predict)
+
     def _validate_with_gemini(self, image_path, object_name):
         """使用Gemini进行智能内容验证 - 充分利用AI的语义理解能力"""
         try:
@@ -618,22 +723,14 @@ class OpenCVService:
             }
         }
 
-    def _validate_with_opencv_features(self, image_path, object_name):
+    def _validate_with_opencv_features(self, context, object_name):
         """使用OpenCV特征进行基础验证 - 更严格的验证"""
         try:
-            image = cv2.imread(image_path)
-            if image is None:
-                return {
-                    'is_match': False,
-                    'detected_objects': [],
-                    'message': '无法读取图像'
-                }
-
             detected_features = []
 
             # 1. 人脸检测（如果查询与人相关）
             if any(keyword in object_name.lower() for keyword in ['人', '脸', '头', 'person', 'face', 'head', '男', '女', '小孩', '儿童']):
-                face_features = self._detect_face_features(image)
+                face_features = self._detect_face_features(context)
                 if face_features:
                     detected_features.extend(face_features)
                     # 如果检测到人脸，直接返回匹配
@@ -644,17 +741,17 @@ class OpenCVService:
                     }
 
             # 2. 颜色特征检测（仅当查询明确包含颜色词时）
-            color_features = self._detect_color_features(image, object_name)
+            color_features = self._detect_color_features(context, object_name)
             if color_features:
                 detected_features.extend(color_features)
 
             # 3. 形状特征检测（仅当查询明确包含形状词时）
-            shape_features = self._detect_shape_features(image, object_name)
+            shape_features = self._detect_shape_features(context, object_name)
             if shape_features:
                 detected_features.extend(shape_features)
 
             # 4. 纹理特征检测（仅作为辅助信息）
-            texture_features = self._detect_texture_features(image, object_name)
+            texture_features = self._detect_texture_features(context, object_name)
             if texture_features:
                 detected_features.extend(texture_features)
 
@@ -700,222 +797,14 @@ class OpenCVService:
             if (len(query_lower) >= 2 and query_lower in detected) or (len(detected) >= 2 and detected in query_lower):
                 return True
 
-        # 3. 扩展的同义词匹配（大幅扩展映射表）
-        synonym_map = {
-            # 人类相关
-            '人': ['person', 'people', 'human', 'man', 'woman', 'boy', 'girl', 'child'],
-            '人物': ['person', 'people', 'human', 'man', 'woman'],
-            '男人': ['man', 'person'],
-            '女人': ['woman', 'person'],
-            '小孩': ['child', 'boy', 'girl', 'person'],
-            '儿童': ['child', 'boy', 'girl', 'person'],
-
-            # 动物相关（大幅扩展）
-            '狗': ['dog', 'puppy'],
-            '小狗': ['dog', 'puppy'],
-            '犬': ['dog'],
-            '猫': ['cat', 'kitten'],
-            '小猫': ['cat', 'kitten'],
-            '猫咪': ['cat', 'kitten'],
-            '鸟': ['bird'],
-            '小鸟': ['bird'],
-            '马': ['horse'],
-            '牛': ['cow'],
-            '羊': ['sheep'],
-            '大象': ['elephant'],
-            '象': ['elephant'],
-            '斑马': ['zebra'],
-            '长颈鹿': ['giraffe'],
-            '鹿': ['giraffe'],
-            '狮子': ['lion'],
-            '老虎': ['tiger'],
-            '虎': ['tiger'],
-            '熊': ['bear'],
-            '猴子': ['monkey'],
-            '猴': ['monkey'],
-            '兔子': ['rabbit'],
-            '兔': ['rabbit'],
-            '老鼠': ['mouse'],
-            '鼠': ['mouse'],
-            '动物': ['animal', 'dog', 'cat', 'bird', 'horse', 'cow', 'sheep', 'elephant', 'bear', 'zebra', 'giraffe', 'lion', 'tiger', 'monkey', 'rabbit', 'mouse'],
-
-            # 交通工具相关
-            '汽车': ['car', 'vehicle', 'automobile'],
-            '车': ['car', 'vehicle', 'automobile', 'truck', 'bus'],
-            '轿车': ['car', 'automobile'],
-            '小车': ['car'],
-            '卡车': ['truck'],
-            '货车': ['truck'],
-            '大车': ['truck', 'bus'],
-            '公交车': ['bus'],
-            '巴士': ['bus'],
-            '自行车': ['bicycle', 'bike'],
-            '单车': ['bicycle', 'bike'],
-            '脚踏车': ['bicycle'],
-            '摩托车': ['motorcycle'],
-            '机车': ['motorcycle'],
-            '飞机': ['airplane', 'aircraft'],
-            '客机': ['airplane'],
-            '船': ['boat', 'ship'],
-            '小船': ['boat'],
-            '火车': ['train'],
-            '交通工具': ['car', 'truck', 'bus', 'motorcycle', 'bicycle', 'airplane', 'boat', 'train'],
-
-            # 物品相关（大幅扩展）
-            '瓶子': ['bottle'],
-            '水瓶': ['bottle'],
-            '椅子': ['chair'],
-            '座椅': ['chair'],
-            '桌子': ['table', 'desk'],
-            '餐桌': ['table'],
-            '书': ['book'],
-            '书本': ['book'],
-            '电脑': ['laptop', 'computer'],
-            '笔记本电脑': ['laptop'],
-            '手机': ['phone', 'cell phone'],
-            '电话': ['phone'],
-            '时钟': ['clock'],
-            '钟表': ['clock'],
-            '键盘': ['keyboard'],
-            '鼠标': ['mouse'],
-            '显示器': ['monitor'],
-            '屏幕': ['monitor', 'tv'],
-            '电视': ['tv'],
-            '剪刀': ['scissors'],
-            '剪子': ['scissors'],
-            '泰迪熊': ['teddy bear'],
-            '玩具熊': ['teddy bear'],
-            '熊娃娃': ['teddy bear'],
-            '吹风机': ['hair drier'],
-            '电吹风': ['hair drier'],
-            '牙刷': ['toothbrush'],
-            '电动牙刷': ['toothbrush'],
-            '雨伞': ['umbrella'],
-            '伞': ['umbrella'],
-            '手提包': ['handbag'],
-            '包': ['handbag', 'backpack'],
-            '背包': ['backpack'],
-            '行李箱': ['suitcase'],
-            '箱子': ['suitcase'],
-
-            # 自然物体相关
-            '花': ['flower'],
-            '花朵': ['flower'],
-            '树': ['tree'],
-            '树木': ['tree'],
-            '房子': ['house', 'building'],
-            '建筑': ['building', 'house'],
-            '楼房': ['building'],
-
-            # 食物相关（新增）
-            '苹果': ['apple'],
-            '香蕉': ['banana'],
-            '橙子': ['orange'],
-            '橘子': ['orange'],
-            '蛋糕': ['cake'],
-            '面包': ['bread'],
-            '三明治': ['sandwich'],
-            '热狗': ['hot dog'],
-            '披萨': ['pizza'],
-            '甜甜圈': ['donut'],
-            '胡萝卜': ['carrot'],
-            '萝卜': ['carrot'],
-
-            # 运动相关
-            '球': ['ball', 'sports ball'],
-            '足球': ['sports ball'],
-            '篮球': ['sports ball'],
-            '网球': ['sports ball', 'tennis racket'],
-            '网球拍': ['tennis racket'],
-            '棒球棒': ['baseball bat'],
-            '滑板': ['skateboard'],
-            '滑雪板': ['skis'],
-            '风筝': ['kite'],
-
-            # 英文到中文的反向映射（大幅扩展）
-            'person': ['人', '人物', '人类'],
-            'dog': ['狗', '小狗', '犬'],
-            'cat': ['猫', '小猫', '猫咪'],
-            'car': ['汽车', '车', '轿车', '小车'],
-            'truck': ['卡车', '货车', '大车'],
-            'bus': ['公交车', '巴士', '大车'],
-            'bird': ['鸟', '小鸟'],
-            'horse': ['马'],
-            'cow': ['牛'],
-            'sheep': ['羊'],
-            'elephant': ['大象', '象'],
-            'zebra': ['斑马'],
-            'giraffe': ['长颈鹿', '鹿'],
-            'lion': ['狮子'],
-            'tiger': ['老虎', '虎'],
-            'bear': ['熊'],
-            'monkey': ['猴子', '猴'],
-            'rabbit': ['兔子', '兔'],
-            'mouse': ['老鼠', '鼠'],
-            'bicycle': ['自行车', '单车', '脚踏车'],
-            'motorcycle': ['摩托车', '机车'],
-            'airplane': ['飞机', '客机'],
-            'boat': ['船', '小船'],
-            'train': ['火车'],
-            'bottle': ['瓶子', '水瓶'],
-            'chair': ['椅子', '座椅'],
-            'table': ['桌子', '餐桌'],
-            'book': ['书', '书本'],
-            'laptop': ['电脑', '笔记本电脑'],
-            'phone': ['手机', '电话'],
-            'clock': ['时钟', '钟表'],
-            'keyboard': ['键盘'],
-            'mouse': ['鼠标'],
-            'monitor': ['显示器', '屏幕'],
-            'tv': ['电视', '屏幕'],
-            'scissors': ['剪刀', '剪子'],
-            'teddy bear': ['泰迪熊', '玩具熊', '熊娃娃'],
-            'hair drier': ['吹风机', '电吹风'],
-            'toothbrush': ['牙刷', '电动牙刷'],
-            'umbrella': ['雨伞', '伞'],
-            'handbag': ['手提包', '包'],
-            'backpack': ['背包', '包'],
-            'suitcase': ['行李箱', '箱子'],
-            'flower': ['花', '花朵'],
-            'tree': ['树', '树木'],
-            'house': ['房子'],
-            'building': ['建筑', '楼房'],
-            'apple': ['苹果'],
-            'banana': ['香蕉'],
-            'orange': ['橙子', '橘子'],
-            'cake': ['蛋糕'],
-            'bread': ['面包'],
-            'sandwich': ['三明治'],
-            'hot dog': ['热狗'],
-            'pizza': ['披萨'],
-            'donut': ['甜甜圈'],
-            'carrot': ['胡萝卜', '萝卜'],
-            'ball': ['球'],
-            'sports ball': ['足球', '篮球', '球'],
-            'tennis racket': ['网球拍'],
-            'baseball bat': ['棒球棒'],
-            'skateboard': ['滑板'],
-            'skis': ['滑雪板'],
-            'kite': ['风筝']
-        }
-
-        # 4. 检查同义词匹配
-        for key, synonyms in synonym_map.items():
-            if key == query_lower:
-                # 查询词在同义词映射的键中
-                for synonym in synonyms:
-                    if synonym in detected_lower:
-                        return True
-            elif query_lower in synonyms:
-                # 查询词在同义词列表中
-                if key in detected_lower:
+        # 3. 同义词匹配：查询词与检测对象指向同一规范类别
+        query_classes = canonical_classes(query_lower)
+        if query_classes:
+            for detected in detected_lower:
+                if detected in query_classes or not query_classes.isdisjoint(canonical_classes(detected)):
                     return True
-                # 检查其他同义词
-                for synonym in synonyms:
-                    if synonym in detected_lower:
-                        return True
 
-        # 5. 模糊匹配（仅对长度大于3的词进行）
+        # 4. 模糊匹配（仅对长度大于3的词进行）
         if len(query_lower) > 3:
             for detected in detected_lower:
                 if len(detected) > 3:
@@ -925,36 +814,9 @@ class OpenCVService:
                     if similarity > 0.6:  # 60%以上的字符重叠
                         return True
 
-        # 6. 语义组匹配（新增）
-        semantic_groups = {
-            'animals': ['dog', 'cat', 'bird', 'horse', 'cow', 'sheep', 'elephant', 'zebra', 'giraffe', 'lion', 'tiger', 'bear', 'monkey', 'rabbit', 'mouse'],
-            'vehicles': ['car', 'truck', 'bus', 'motorcycle', 'bicycle', 'airplane', 'boat', 'train'],
-            'furniture': ['chair', 'table', 'sofa', 'bed'],
-            'electronics': ['laptop', 'phone', 'tv', 'keyboard', 'mouse', 'monitor'],
-            'food': ['apple', 'banana', 'orange', 'cake', 'bread', 'sandwich', 'hot dog', 'pizza', 'donut', 'carrot'],
-            'sports': ['ball', 'sports ball', 'tennis racket', 'baseball bat', 'skateboard', 'skis', 'kite']
-        }
-
-        # 检查是否属于同一语义组
-        query_group = None
-        detected_groups = set()
-
-        # 找到查询词所属的语义组
-        for group_name, items in semantic_groups.items():
-            if any(synonym in query_lower for synonym in items):
-                query_group = group_name
-                break
-            # 检查中文同义词
-            for item in items:
-                if item in synonym_map and query_lower in synonym_map[item]:
-                    query_group = group_name
-                    break
-
-        # 找到检测对象所属的语义组
-        for detected in detected_lower:
-            for group_name, items in semantic_groups.items():
-                if detected in items:
-                    detected_groups.add(group_name)
+        # 5. 语义组匹配
+        query_group = semantic_group(query_lower)
+        detected_groups = {semantic_group(detected) for detected in detected_lower}
 
         # 如果属于同一语义组，则认为可能匹配（降低匹配严格度）
         if query_group and query_group in detected_groups:
@@ -964,48 +826,30 @@ class OpenCVService:
 
         return False
 
-    def _detect_color_features(self, image, object_name):
+    def _detect_color_features(self, context, object_name):
         """检测颜色特征"""
         features = []
 
-        # 颜色关键词映射
-        color_keywords = {
-            '红': [(0, 0, 100), (10, 255, 255), (170, 255, 255), (180, 255, 255)],
-            '绿': [(40, 40, 40), (80, 255, 255)],
-            '蓝': [(100, 40, 40), (130, 255, 255)],
-            '黄': [(20, 40, 40), (40, 255, 255)],
-            '白': [(0, 0, 200), (180, 30, 255)],
-            '黑': [(0, 0, 0), (180, 255, 50)]
-        }
-
         # 检查查询中是否包含颜色词
-        for color_name, hsv_ranges in color_keywords.items():
-            if color_name in object_name:
-                hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-
-                # 创建颜色掩码
-                mask = np.zeros(hsv.shape[:2], dtype=np.uint8)
-                for i in range(0, len(hsv_ranges), 2):
-                    lower = np.array(hsv_ranges[i])
-                    upper = np.array(hsv_ranges[i+1])
-                    color_mask = cv2.inRange(hsv, lower, upper)
-                    mask = cv2.bitwise_or(mask, color_mask)
+        if not any(color_name in object_name for color_name in FEATURE_COLORS.names):
+            return features
 
-                # 检查颜色区域大小
-                color_area = cv2.countNonZero(mask)
-                total_area = image.shape[0] * image.shape[1]
+        # 一次查表得到所有颜色的像素数
+        areas = FEATURE_COLORS.areas(FEATURE_COLORS.classify(context.hsv))
+        total_area = context.height * context.width
 
-                if color_area > total_area * 0.05:  # 颜色区域占5%以上
-                    features.append(f'{color_name}色区域')
+        for color_name, color_area in zip(FEATURE_COLORS.names, areas):
+            if color_name in object_name and color_area > total_area * 0.05:  # 颜色区域占5%以上
+                features.append(f'{color_name}色区域')
 
         return features
 
-    def _detect_shape_features(self, image, object_name):
+    def _detect_shape_features(self, context, object_name):
         """检测形状特征"""
         features = []
 
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+        gray = context.gray
+        blurred = context.blurred
 
         # 检测圆形
         if any(keyword in object_name for keyword in ['圆', '球', 'circle', 'ball']):
@@ -1023,12 +867,12 @@ class OpenCVService:
 
         return features
 
-    def _detect_texture_features(self, image, object_name):
+    def _detect_texture_features(self, context, object_name):
         """检测纹理特征"""
         features = []
 
         # 简单的纹理检测
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        gray = context.gray
 
         # 计算图像的标准差（纹理复杂度指标）
         std_dev = np.std(gray)
@@ -1040,11 +884,11 @@ class OpenCVService:
 
         return features
 
-    def _detect_face_features(self, image):
+    def _detect_face_features(self, context):
         """检测人脸特征"""
         features = []
 
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        gray = context.gray
 
         # 使用Haar级联检测人脸
         faces = self.face_cascade.detectMultiScale(gray, 1.1, 4)
@@ -1122,11 +966,11 @@ class OpenCVService:
         # 这样可以避免误判，让YOLO或Gemini来处理复杂对象识别
         return False
 
-    def _detect_faces_haar(self, image):
+    def _detect_faces_haar(self, context):
         """使用 Haar Cascade 检测人脸"""
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        gray = context.gray
         detected_objects = []
-        height, width = image.shape[:2]
+        height, width = context.height, context.width
 
         # 检测人脸
         faces = self.face_cascade.detectMultiScale(gray, 1.1, 4)
@@ -1145,15 +989,12 @@ class OpenCVService:
 
         return detected_objects
 
-    def _detect_contours(self, image, object_name='对象'):
+    def _detect_contours(self, context, object_name='对象'):
         """使用轮廓检测对象"""
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-
-        # 多种预处理方法
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+        level, area_scale = self._analysis_level(context)
 
-        # 自适应阈值
-        thresh = cv2.adaptiveThreshold(blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+        # 模糊灰度图的自适应阈值（与其他方法共享）
+        thresh = level.adaptive
 
         # 形态学操作
         kernel = np.ones((3, 3), np.uint8)
@@ -1164,14 +1005,14 @@ class OpenCVService:
         contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
         detected_objects = []
-        height, width = image.shape[:2]
+        height, width = level.height, level.width
 
         # 按面积排序，取最大的几个
         contours = sorted(contours, key=cv2.contourArea, reverse=True)
 
         for i, contour in enumerate(contours[:5]):  # 最多取5个最大的轮廓
             area = cv2.contourArea(contour)
-            if area > 1000:  # 过滤太小的轮廓
+            if area > 1000 * area_scale:  # 过滤太小的轮廓
                 x, y, w, h = cv2.boundingRect(contour)
 
                 # 计算轮廓的紧密度（用于评估对象质量）
@@ -1197,34 +1038,26 @@ class OpenCVService:
 
         return detected_objects
 
-    def _detect_by_color(self, image, object_name='对象'):
+    def _detect_by_color(self, context, object_name='对象'):
         """使用颜色分割检测对象"""
-        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-        height, width = image.shape[:2]
+        level, area_scale = self._analysis_level(context)
+        height, width = level.height, level.width
         detected_objects = []
 
-        # 定义多个颜色范围
-        color_ranges = [
-            # 红色
-            ([0, 50, 50], [10, 255, 255]),
-            ([170, 50, 50], [180, 255, 255]),
-            # 绿色
-            ([40, 50, 50], [80, 255, 255]),
-            # 蓝色
-            ([100, 50, 50], [130, 255, 255]),
-            # 黄色
-            ([20, 50, 50], [40, 255, 255]),
-        ]
-
-        for i, (lower, upper) in enumerate(color_ranges):
-            lower = np.array(lower)
-            upper = np.array(upper)
+        # 一次查表为所有像素标注颜色类别，各颜色的掩码都从标签图取得
+        labels = DETECTION_COLORS.classify(level.hsv)
+        areas = DETECTION_COLORS.areas(labels)
+        kernel = np.ones((5, 5), np.uint8)
 
-            # 创建掩码
-            mask = cv2.inRange(hsv, lower, upper)
+        for i, color_name in enumerate(DETECTION_COLORS.names):
+            # 最多返回3个对象，已足够时无需处理后续颜色
+            if len(detected_objects) >= 3:
+                break
+            if not areas[i]:
+                continue
 
             # 形态学操作
-            kernel = np.ones((5, 5), np.uint8)
+            mask = DETECTION_COLORS.mask(labels, i)
             mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
             mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
 
@@ -1233,7 +1066,7 @@ class OpenCVService:
 
             for j, contour in enumerate(contours):
                 area = cv2.contourArea(contour)
-                if area > 500:
+                if area > 500 * area_scale:
                     x, y, w, h = cv2.boundingRect(contour)
 
                     ymin = y / height
@@ -1241,10 +1074,8 @@ class OpenCVService:
                     ymax = (y + h) / height
                     xmax = (x + w) / width
 
-                    color_names = ['红色', '红色', '绿色', '蓝色', '黄色']
-
                     detected_objects.append({
-                        'label': f'{color_names[i]}{object_name}_{j+1}',
+                        'label': f'{color_name}{object_name}_{j+1}',
                         'confidence': 0.7,
                         'bbox': [ymin, xmin, ymax, xmax],
                         'method': 'Color Segmentation'
@@ -1252,16 +1083,12 @@ class OpenCVService:
 
         return detected_objects[:3]  # 最多返回3个对象
 
-    def _detect_by_edges(self, image, object_name='对象'):
+    def _detect_by_edges(self, context, object_name='对象'):
         """使用边缘检测对象"""
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-
-        # 多尺度边缘检测
-        edges1 = cv2.Canny(gray, 50, 150)
-        edges2 = cv2.Canny(gray, 100, 200)
+        level, area_scale = self._analysis_level(context)
 
-        # 合并边缘
-        edges = cv2.bitwise_or(edges1, edges2)
+        # 多尺度边缘检测，两组阈值的边缘合并（与其他方法共享）
+        edges = level.edges
 
         # 膨胀操作连接断开的边缘
         kernel = np.ones((3, 3), np.uint8)
@@ -1271,14 +1098,14 @@ class OpenCVService:
         contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
         detected_objects = []
-        height, width = image.shape[:2]
+        height, width = level.height, level.width
 
         # 按面积排序
         contours = sorted(contours, key=cv2.contourArea, reverse=True)
 
         for i, contour in enumerate(contours[:3]):  # 最多取3个
             area = cv2.contourArea(contour)
-            if area > 800:
+            if area > 800 * area_scale:
                 x, y, w, h = cv2.boundingRect(contour)
 
                 ymin = y / height
@@ -1295,9 +1122,28 @@ class OpenCVService:
 
         return detected_objects
 
-    def _draw_opencv_bbox(self, image_path, bbox_coords, output_path, label, method, color_index=0):
+    def _detect_methods(self, context, methods, object_name='对象'):
+        """在同一图像上下文中依次执行多个检测方法，中间平面只计算一次；
+        返回 ({方法: 检测结果}, {方法: 错误信息})，单个方法失败不影响其他方法"""
+        results, errors = {}, {}
+        for method in methods:
+            try:
+                if method == 'haar':
+                    results[method] = self._detect_faces_haar(context)
+                elif method == 'contour':
+                    results[method] = self._detect_contours(context, object_name)
+                elif method == 'color':
+                    results[method] = self._detect_by_color(context, object_name)
+                elif method == 'edge':
+                    results[method] = self._detect_by_edges(context, object_name)
+            except Exception as e:
+                print(f"OpenCV {method} 检测错误: {e}")
+                errors[method] = f'OpenCV {method} 检测失败: {str(e)}'
+        return results, errors
+
+    def _draw_opencv_bbox(self, context, bbox_coords, output_path, label, method, color_index=0):
         """绘制 OpenCV 检测的边界框 - 支持不同颜色"""
-        image = cv2.imread(image_path)
+        image = context.canvas()
         height, width = image.shape[:2]
 
         ymin, xmin, ymax, xmax = bbox_coords
@@ -1339,9 +1185,9 @@ class OpenCVService:
         cv2.imwrite(output_path, image)
         return output_path
 
-    def _draw_all_opencv_bboxes(self, image_path, detected_objects, output_path):
+    def _draw_all_opencv_bboxes(self, context, detected_objects, output_path):
         """绘制所有 OpenCV 检测的边界框 - 使用不同颜色区分对象"""
-        image = cv2.imread(image_path)
+        image = context.canvas()
         height, width = image.shape[:2]
 
         # 扩展颜色调色板，使用更鲜明的颜色
@@ -1401,9 +1247,31 @@ class OpenCVService:
         cv2.imwrite(output_path, image)
         return output_path
 
-    def segment_image_opencv(self, file=None, image_data=None, method='contour_mask', object_name = ""):
-        """使用 OpenCV 进行图像分割"""
+    def segment_image_opencv(self, file=None, image_data=None, method='contour_mask', object_name = "", output_format='png'):
+        """使用 OpenCV 进行图像分割，相同图像和参数的成功结果直接从缓存返回，无需保存和解码图像"""
+        cache_key = result_cache.make_key('opencv_segmentation', file=file, image_data=image_data, method=method,
+                                          object_name=object_name, output_format=output_format,
+                                          settings=self._analysis_settings())
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            return cached, 200
+
+        result, status_code = self._segment_image_opencv(file, image_data, method, object_name, output_format)
+        if status_code == 200 and result.get('success'):
+            result_cache.set(cache_key, result)
+        return result, status_code
+
+    @limit_concurrency
+    def _segment_image_opencv(self, file, image_data, method, object_name, output_format):
+        """执行 OpenCV 图像分割，返回 (结果, 状态码)"""
         try:
+
+            # method为all或方法列表时一次返回多个方法的结果
+            try:
+                methods = self._parse_methods(method, SEGMENTATION_METHODS)
+            except ValueError as e:
+                return {'success': False, 'error': str(e)}, 400
+
             # 处理文件输入
             if image_data:
                 image_data_clean = image_data.split(',')[1] if ',' in image_data else image_data
@@ -1424,46 +1292,9 @@ class OpenCVService:
                     # 标准的Flask文件上传对象
                     filepath = save_uploaded_file(file, current_app.config['UPLOAD_FOLDER'])
 
-            # 读取图像 - 使用多种方法确保能够读取
-            image = None
-
-            # 方法1: 直接使用cv2.imread
-            try:
-                image = cv2.imread(filepath)
-            except Exception as e:
-                print(f"cv2.imread 失败: {e}")
-
-            # 方法2: 如果直接读取失败，使用PIL转换
-            if image is None:
-                try:
-                    from PIL import Image as PILImage
-                    pil_image = PILImage.open(filepath)
-                    # 转换为RGB（如果是RGBA）
-                    if pil_image.mode == 'RGBA':
-                        pil_image = pil_image.convert('RGB')
-                    # 转换为numpy数组
-                    image_array = np.array(pil_image)
-                    # PIL使用RGB，OpenCV使用BGR，需要转换
-                    image = cv2.cvtColor(image_array, cv2.COLOR_RGB2BGR)
-                    print("使用PIL成功读取图像")
-                except Exception as e:
-                    print(f"PIL读取失败: {e}")
-
-            # 方法3: 如果还是失败，尝试使用numpy直接读取
-            if image is None:
-                try:
-                    # 读取文件字节
-                    with open(filepath, 'rb') as f:
-                        file_bytes = f.read()
-
-                    # 使用numpy和cv2解码
-                    nparr = np.frombuffer(file_bytes, np.uint8)
-                    image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                    print("使用numpy成功读取图像")
-                except Exception as e:
-                    print(f"numpy读取失败: {e}")
-
-            if image is None:
+            # 解码图像一次，后续验证和分割共享同一个图像上下文
+            context = ImageContext.load(filepath)
+            if context is None:
                 error_msg = f'无法读取图像文件: {filepath}。请检查文件格式是否正确。'
                 print(error_msg)
                 return {'success': False, 'error': error_msg}, 400
@@ -1474,7 +1305,7 @@ class OpenCVService:
 
             # 进行内容验证，确保图像中包含指定对象
             print(f"OpenCV分割：开始验证图像内容是否包含 '{object_name.strip()}'")
-            validation_result = self._validate_image_content(filepath, object_name.strip())
+            validation_result = self._validate_image_content(context, object_name.strip())
             if not validation_result['is_match']:
                 print(f"OpenCV分割：内容验证失败，未检测到 '{object_name.strip()}'")
                 return {
@@ -1492,36 +1323,33 @@ class OpenCVService:
             else:
                 print(f"OpenCV分割：内容验证成功，使用方法：{validation_result.get('validation_method', '未知')}")
 
+            if methods is not None:
+                return self._segment_with_methods(context, filepath, methods, object_name, output_format)
+
             segmented_objects = []
-            segment_images = []
 
             if method == 'contour_mask':
                 # 使用轮廓掩码分割（推荐）
-                segments = self._contour_mask_segmentation(image, filepath, object_name)
+                segments = self._run_kernel('_contour_mask_segmentation', context, filepath, object_name, output_format)
                 segmented_objects.extend(segments)
 
             elif method == 'grabcut':
-                # 使用 GrabCut 算法
-                segments = self._grabcut_segmentation(image, filepath)
+                # 使用 GrabCut 算法，可按配置以检测框为种子
+                seed_boxes, seed_source = self._grabcut_seed_boxes(context, object_name)
+                segments = self._run_kernel('_grabcut_segmentation', context, filepath, output_format, seed_boxes, seed_source)
                 segmented_objects.extend(segments)
 
             elif method == 'watershed':
                 # 使用 Watershed 算法
-                segments = self._watershed_segmentation(image, filepath)
+                segments = self._run_kernel('_watershed_segmentation', context, filepath, output_format)
                 segmented_objects.extend(segments)
 
             elif method == 'kmeans':
                 # 使用 K-means 聚类
-                segments = self._kmeans_segmentation(image, filepath)
+                segments = self._run_kernel('_kmeans_segmentation', context, filepath, output_format)
                 segmented_objects.extend(segments)
 
-            # 收集分割图像路径
-            for i, segment in enumerate(segmented_objects):
-                if 'segment_image' in segment and os.path.exists(segment['segment_image']):
-                    segment_images.append(segment['segment_image'])
-                    print(f"分割图像已保存: {segment['segment_image']}")
-                else:
-                    print(f"分割图像不存在: {segment.get('segment_image', 'N/A')}")
+            segment_images, label_map_path = self._collect_segment_images(segmented_objects)
 
             if segmented_objects:
                 return {
@@ -1529,7 +1357,9 @@ class OpenCVService:
                     'original_image': filepath,
                     'segmented_objects': segmented_objects,
                     'segment_images': segment_images,
-                    'method': f'OpenCV {method}'
+                    'method': f'OpenCV {method}',
+                    'output_format': normalize_output_format(output_format),
+                    'label_map': label_map_path
                 }, 200
             else:
                 return {
@@ -1543,24 +1373,21 @@ class OpenCVService:
             print(f"OpenCV 分割错误: {e}")
             return {'success': False, 'error': error_msg}, 500
 
-    def _contour_mask_segmentation(self, image, filepath, object_name='主要对象'):
+    def _contour_mask_segmentation(self, context, filepath, object_name='主要对象', output_format='png'):
         """基于轮廓的掩码分割 - 精确分割对象轮廓"""
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        height, width = image.shape[:2]
+        image = context.bgr
+        # 在分析层上提取和筛选轮廓，掩码再映射回原图
+        level, area_scale = self._analysis_level(context)
+        gray = level.gray
+        height, width = level.height, level.width
+        # 原图像素的边距换算到分析层
+        scale = context.width / width
+        encoder = SegmentationEncoder(output_format, image.shape, current_app.config['GENERATED_FOLDER'], 'opencv_contour')
 
         # 多种预处理方法组合
-        # 1. 高斯模糊去噪
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-
-        # 2. 多种阈值方法
-        # 自适应阈值
-        thresh1 = cv2.adaptiveThreshold(blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
-
-        # Otsu阈值
-        _, thresh2 = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-
-        # 组合阈值结果
-        thresh = cv2.bitwise_or(thresh1, thresh2)
+        # 1. 高斯模糊去噪后的自适应阈值和Otsu阈值（与其他方法共享）
+        # 2. 组合阈值结果
+        thresh = cv2.bitwise_or(level.adaptive, level.otsu)
 
         # 3. 形态学操作优化轮廓
         # 闭运算：连接断开的轮廓
@@ -1581,7 +1408,7 @@ class OpenCVService:
             perimeter = cv2.arcLength(contour, True)
 
             # 面积筛选
-            if area < 1000:  # 过滤太小的轮廓
+            if area < 1000 * area_scale:  # 过滤太小的轮廓
                 continue
 
             # 计算轮廓质量指标
@@ -1634,22 +1461,6 @@ class OpenCVService:
             smooth_mask = np.zeros(gray.shape, np.uint8)
             cv2.fillPoly(smooth_mask, [smoothed_contour], 255)
 
-            # 应用掩码到原图像
-            result = image.copy()
-
-            # 创建渐变边缘效果
-            # 对掩码进行轻微的高斯模糊，创建柔和边缘
-            blurred_mask = cv2.GaussianBlur(smooth_mask, (3, 3), 0)
-            blurred_mask_3ch = cv2.cvtColor(blurred_mask, cv2.COLOR_GRAY2BGR) / 255.0
-
-            # 应用掩码
-            result = result * blurred_mask_3ch
-
-            # 将背景设为白色
-            background = np.ones_like(result) * 255
-            result = result + background * (1 - blurred_mask_3ch)
-            result = result.astype(np.uint8)
-
             # 获取精确的边界框
             x, y, w, h = cv2.boundingRect(smoothed_contour)
 
@@ -1661,8 +1472,8 @@ class OpenCVService:
                 x_min, x_max = np.min(mask_coords[1]), np.max(mask_coords[1])
 
                 # 添加适当的边距
-                padding_x = max(10, int((x_max - x_min) * 0.05))
-                padding_y = max(10, int((y_max - y_min) * 0.05))
+                padding_x = max(int(round(10 / scale)), int((x_max - x_min) * 0.05))
+                padding_y = max(int(round(10 / scale)), int((y_max - y_min) * 0.05))
 
                 x1 = max(0, x_min - padding_x)
                 y1 = max(0, y_min - padding_y)
@@ -1670,37 +1481,30 @@ class OpenCVService:
                 y2 = min(height, y_max + padding_y)
             else:
                 # 回退到边界框
-                padding = 10
+                padding = int(round(10 / scale))
                 x1 = max(0, x - padding)
                 y1 = max(0, y - padding)
                 x2 = min(width, x + w + padding)
                 y2 = min(height, y + h + padding)
 
-            cropped_result = result[y1:y2, x1:x2]
-
-            # 保存分割结果
-            import time
-            timestamp = int(time.time() * 1000)  # 使用毫秒级时间戳避免重复
-            safe_object_name = object_name.replace('/', '_').replace('\\', '_').replace(' ', '_')
-            seg_filename = f"opencv_contour_{safe_object_name}_{i}_{timestamp}.png"
-            seg_filepath = os.path.join(current_app.config['GENERATED_FOLDER'], seg_filename)
-            cv2.imwrite(seg_filepath, cropped_result)
-
             # 计算置信度
             confidence = min(0.95, max(0.4, contour_info['quality']))
 
+            # 裁剪区域内的掩码映射回原图坐标
+            crop_mask, (x1, y1) = upscale_mask(smooth_mask[y1:y2, x1:x2], (x1, y1), level, context)
+            y2, x2 = y1 + crop_mask.shape[0], x1 + crop_mask.shape[1]
+
             # 转换为归一化坐标
-            ymin = y1 / height
-            xmin = x1 / width
-            ymax = y2 / height
-            xmax = x2 / width
+            ymin = y1 / context.height
+            xmin = x1 / context.width
+            ymax = y2 / context.height
+            xmax = x2 / context.width
 
-            segmented_objects.append({
+            segment = {
                 'label': f'{object_name}_精确轮廓_{i+1}',
                 'description': f'基于精确轮廓分割的{object_name}对象（质量评分: {contour_info["quality"]:.2f}）',
                 'confidence': confidence,
                 'bbox': [ymin, xmin, ymax, xmax],
-                'segment_image': seg_filepath,
                 'method': 'Precise Contour Mask',
                 'quality_metrics': {
                     'circularity': contour_info['circularity'],
@@ -1708,48 +1512,226 @@ class OpenCVService:
                     'aspect_ratio': contour_info['aspect_ratio'],
                     'area_ratio': contour_info['area'] / (width * height)
                 }
-            })
+            }
 
-        return segmented_objects
+            if encoder.output_format != 'png':
+                # 几何格式直接编码掩码，跳过合成和保存图像
+                segmented_objects.append(encoder.add(segment, crop_mask, (x1, y1)))
+                continue
 
-    def _grabcut_segmentation(self, image, filepath):
-        """GrabCut 分割算法"""
-        height, width = image.shape[:2]
+            # 创建渐变边缘效果
+            # 对掩码进行轻微的高斯模糊，创建柔和边缘
+            blurred_mask = cv2.GaussianBlur(crop_mask, (3, 3), 0)
+            blurred_mask_3ch = cv2.cvtColor(blurred_mask, cv2.COLOR_GRAY2BGR) / 255.0
 
-        # 创建一个矩形作为前景区域（图像中心区域）
-        rect = (width//4, height//4, width//2, height//2)
+            # 应用掩码，将背景设为白色
+            cropped_result = image[y1:y2, x1:x2] * blurred_mask_3ch + 255 * (1 - blurred_mask_3ch)
+            cropped_result = cropped_result.astype(np.uint8)
 
-        # 初始化掩码
-        mask = np.zeros((height, width), np.uint8)
-        bgd_model = np.zeros((1, 65), np.float64)
-        fgd_model = np.zeros((1, 65), np.float64)
+            # 保存分割结果
+            import time
+            timestamp = int(time.time() * 1000)  # 使用毫秒级时间戳避免重复
+            safe_object_name = object_name.replace('/', '_').replace('\\', '_').replace(' ', '_')
+            seg_filename = f"opencv_contour_{safe_object_name}_{i}_{timestamp}.png"
+            seg_filepath = os.path.join(current_app.config['GENERATED_FOLDER'], seg_filename)
+            cv2.imwrite(seg_filepath, cropped_result)
 
-        # 应用 GrabCut
-        cv2.grabCut(image, mask, rect, bgd_model, fgd_model, 5, cv2.GC_INIT_WITH_RECT)
+            segment['segment_image'] = seg_filepath
+            segmented_objects.append(segment)
 
-        # 创建最终掩码
-        mask2 = np.where((mask == 2) | (mask == 0), 0, 1).astype('uint8')
-        result = image * mask2[:, :, np.newaxis]
+        self._attach_label_map(segmented_objects, encoder)
+        return segmented_objects
 
-        # 保存分割结果
-        import time
-        timestamp = int(time.time() * 1000)
-        seg_filename = f"opencv_grabcut_{timestamp}.png"
-        seg_filepath = os.path.join(current_app.config['GENERATED_FOLDER'], seg_filename)
-        cv2.imwrite(seg_filepath, result)
+    def _segment_with_methods(self, context, filepath, methods, object_name, output_format):
+        """在同一图像上下文中执行多个分割方法，合并结果并按方法分别汇总，返回 (结果, 状态码)"""
+        seed_boxes, seed_source = [], 'center'
+        if 'grabcut' in methods:
+            seed_boxes, seed_source = self._grabcut_seed_boxes(context, object_name)
+        results, errors = self._run_kernel('_segment_methods', context, filepath, methods, object_name,
+                                           output_format, seed_boxes, seed_source)
 
-        return [{
-            'label': 'GrabCut 前景',
-            'description': '使用 GrabCut 算法分割的前景对象',
-            'confidence': 0.8,
-            'bbox': [0.25, 0.25, 0.75, 0.75],  # 近似边界框
-            'segment_image': seg_filepath,
-            'method': 'GrabCut'
-        }]
+        segmented_objects = []
+        segment_images = []
+        method_results = {}
+        for name in methods:
+            if name in errors:
+                method_results[name] = {'success': False, 'error': errors[name]}
+                continue
+            images, label_map_path = self._collect_segment_images(results[name])
+            method_results[name] = {'success': bool(results[name]), 'count': len(results[name]),
+                                    'segment_images': images, 'label_map': label_map_path}
+            segmented_objects.extend(results[name])
+            segment_images.extend(images)
+
+        method_label = f'OpenCV {", ".join(methods)}'
+        if not segmented_objects:
+            return {
+                'success': False,
+                'error': f'使用 OpenCV {", ".join(methods)} 方法未能分割出对象',
+                'method': method_label,
+                'methods': method_results
+            }, 200
 
-    def _watershed_segmentation(self, image, filepath):
+        return {
+            'success': True,
+            'original_image': filepath,
+            'segmented_objects': segmented_objects,
+            'segment_images': segment_images,
+            'method': method_label,
+            'methods': method_results,
+            'output_format': normalize_output_format(output_format),
+            # 每个方法各自生成标签图，见methods中的label_map
+            'label_map': None
+        }, 200
+
+    def _segment_methods(self, context, filepath, methods, object_name, output_format='png', seed_boxes=None,
+                         seed_source='center'):
+        """在同一图像上下文中依次执行多个分割方法，中间平面只计算一次；
+        返回 ({方法: 分割结果}, {方法: 错误信息})，单个方法失败不影响其他方法"""
+        results, errors = {}, {}
+        for method in methods:
+            try:
+                if method == 'contour_mask':
+                    results[method] = self._contour_mask_segmentation(context, filepath, object_name, output_format)
+                elif method == 'grabcut':
+                    results[method] = self._grabcut_segmentation(context, filepath, output_format, seed_boxes, seed_source)
+                elif method == 'watershed':
+                    results[method] = self._watershed_segmentation(context, filepath, output_format)
+                elif method == 'kmeans':
+                    results[method] = self._kmeans_segmentation(context, filepath, output_format)
+            except Exception as e:
+                print(f"OpenCV {method} 分割错误: {e}")
+                errors[method] = f'OpenCV {method} 分割失败: {str(e)}'
+        return results, errors
+
+    def _collect_segment_images(self, segmented_objects):
+        """从分割结果中取出标签图并收集已保存的分割图像，返回 (图像路径列表, 标签图路径)"""
+        segment_images = []
+
+        # 标签图由分割方法统一生成，从结果中取出
+        label_map_path = None
+        for segment in segmented_objects:
+            label_map_path = segment.pop('label_map', None) or label_map_path
+        if label_map_path:
+            segment_images.append(label_map_path)
+
+        # 收集分割图像路径
+        for segment in segmented_objects:
+            if 'segment_image' not in segment:
+                continue
+            if os.path.exists(segment['segment_image']):
+                segment_images.append(segment['segment_image'])
+                print(f"分割图像已保存: {segment['segment_image']}")
+            else:
+                print(f"分割图像不存在: {segment.get('segment_image', 'N/A')}")
+        return segment_images, label_map_path
+
+    def _attach_label_map(self, segmented_objects, encoder):
+        """label_map格式下保存标签图，并通过第一个分割结果传回"""
+        label_map_path = encoder.save_label_map()
+        if label_map_path and segmented_objects:
+            segmented_objects[0]['label_map'] = label_map_path
+
+    def _grabcut_segmentation(self, context, filepath, output_format='png', seed_boxes=None, seed_source='center'):
+        """多尺度 GrabCut 分割：每个种子框先在分析层求解，再以原图分辨率细化边界窄带；
+        seed_boxes为归一化坐标的种子框，为空时使用图像中心矩形"""
+        height, width = context.height, context.width
+        if seed_boxes:
+            boxes = [(int(xmin * width), int(ymin * height), int(np.ceil(xmax * width)), int(np.ceil(ymax * height)))
+                     for ymin, xmin, ymax, xmax in seed_boxes]
+        else:
+            # 创建一个矩形作为前景区域（图像中心区域）
+            boxes = [(width // 4, height // 4, width // 4 + width // 2, height // 4 + height // 2)]
+            seed_source = 'center'
+
+        level, _ = self._analysis_level(context)
+        results = segment_boxes(context.bgr, level.bgr, boxes, current_app.config.get('OPENCV_GRABCUT_BAND', 8),
+                                thread_budget.opencv_threads)
+
+        encoder = SegmentationEncoder(output_format, context.shape, current_app.config['GENERATED_FOLDER'], 'opencv_grabcut')
+        segments = []
+        for i, (mask, (ox, oy)) in enumerate(results):
+            if mask is None:
+                continue
+            x, y, w, h = cv2.boundingRect(mask)
+            if w == 0 or h == 0:
+                continue
+            mask = mask[y:y + h, x:x + w]
+            x, y = x + ox, y + oy
+
+            segment = {
+                'label': 'GrabCut 前景' if len(boxes) == 1 else f'GrabCut 前景_{i + 1}',
+                'description': '使用 GrabCut 算法分割的前景对象' if seed_source == 'center' else f'使用 GrabCut 算法分割的前景对象（{seed_source}检测框初始化）',
+                'confidence': 0.8,
+                'bbox': [y / height, x / width, (y + h) / height, (x + w) / width],
+                'method': 'GrabCut',
+                'seed': seed_source
+            }
+            if encoder.output_format != 'png':
+                segments.append(encoder.add(segment, mask, (x, y)))
+                continue
+
+            result = np.zeros_like(context.bgr)
+            result[y:y + h, x:x + w] = context.bgr[y:y + h, x:x + w] * mask[:, :, np.newaxis]
+
+            # 保存分割结果
+            import time
+            timestamp = int(time.time() * 1000)
+            seg_filename = f"opencv_grabcut_{timestamp}_{i}.png"
+            seg_filepath = os.path.join(current_app.config['GENERATED_FOLDER'], seg_filename)
+            cv2.imwrite(seg_filepath, result)
+
+            segment['segment_image'] = seg_filepath
+            segments.append(segment)
+
+        self._attach_label_map(segments, encoder)
+        return segments
+
+    def _grabcut_seed_boxes(self, context, object_name):
+        """按OPENCV_GRABCUT_SEED从YOLO或轮廓检测结果中选取GrabCut种子框，返回 (归一化种子框列表, 来源)，
+        没有可用的检测框时返回空列表，由GrabCut使用中心矩形"""
+        source = current_app.config.get('OPENCV_GRABCUT_SEED', 'center')
+        if source not in GRABCUT_SEEDS:
+            raise ValueError(f'不支持的GrabCut种子来源: {source}，可选: {", ".join(GRABCUT_SEEDS)}')
+
+        if source == 'yolo':
+            boxes = self._yolo_seed_boxes(context, object_name)
+        elif source == 'contour':
+            boxes = [obj['bbox'] for obj in self._run_kernel('_detect_contours', context, object_name)]
+        else:
+            boxes = []
+
+        # 覆盖几乎整张图像的框无法提供背景样本
+        boxes = [box for box in boxes if (box[2] - box[0]) * (box[3] - box[1]) < 0.9]
+        if not boxes:
+            return [], 'center'
+        return boxes[:max(1, int(current_app.config.get('OPENCV_GRABCUT_MAX_ROIS', 3)))], source
+
+    def _yolo_seed_boxes(self, context, object_name):
+        """与查询匹配的YOLO检测框（归一化坐标），按置信度从高到低排列"""
+        from .yolo_model_registry import model_registry
+
+        if not model_registry.has_weights(YOLO_VALIDATION_MODEL):
+            return []
+        try:
+            model, results = self._yolo_predictions(context)
+        except Exception as e:
+            print(f"YOLO种子框检测失败，使用中心矩形: {str(e)}")
+            return []
+        candidates = []
+        for result in results:
+            for box, score, cls in zip(result.boxes, result.scores, result.class_ids):
+                if self._check_object_match(object_name, [model.names[int(cls)]]):
+                    x1, y1, x2, y2 = (float(v) for v in box)
+                    candidates.append((float(score), [y1 / context.height, x1 / context.width,
+                                                      y2 / context.height, x2 / context.width]))
+        candidates.sort(key=lambda item: item[0], reverse=True)
+        return [box for _, box in candidates]
+
+    def _watershed_segmentation(self, context, filepath, output_format='png'):
         """Watershed 分割算法"""
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        level, _ = self._analysis_level(context)
+        gray = level.gray
 
         # 应用阈值
         _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
@@ -1775,15 +1757,40 @@ class OpenCVService:
         markers[unknown == 255] = 0
 
         # 应用 watershed
-        markers = cv2.watershed(image, markers)
-        image[markers == -1] = [255, 0, 0]
+        markers = cv2.watershed(level.bgr, markers)
+
+        encoder = SegmentationEncoder(output_format, context.shape, current_app.config['GENERATED_FOLDER'], 'opencv_watershed')
+        if encoder.output_format != 'png':
+            # 几何格式下每个前景区域作为一个分割结果（标记1为背景），掩码映射回原图坐标
+            height, width = level.height, level.width
+            segments = []
+            for label in range(2, int(markers.max()) + 1):
+                region = (markers == label).astype(np.uint8)
+                x, y, w, h = cv2.boundingRect(region)
+                if w == 0 or h == 0:
+                    continue
+                mask, offset = upscale_mask(region[y:y + h, x:x + w], (x, y), level, context)
+                segments.append(encoder.add({
+                    'label': f'Watershed 区域_{len(segments) + 1}',
+                    'description': '使用 Watershed 算法分割的区域',
+                    'confidence': 0.7,
+                    'bbox': [y / height, x / width, (y + h) / height, (x + w) / width],
+                    'method': 'Watershed'
+                }, mask, offset))
+            self._attach_label_map(segments, encoder)
+            return segments
+
+        # 在原图副本上标记分水岭边界，输入图像由同一请求的其他阶段共享
+        boundary, _ = upscale_mask((markers == -1).astype(np.uint8), (0, 0), level, context)
+        outlined = context.canvas()
+        outlined[boundary > 0] = [255, 0, 0]
 
         # 保存结果
         import time
         timestamp = int(time.time() * 1000)
         seg_filename = f"opencv_watershed_{timestamp}.png"
         seg_filepath = os.path.join(current_app.config['GENERATED_FOLDER'], seg_filename)
-        cv2.imwrite(seg_filepath, image)
+        cv2.imwrite(seg_filepath, outlined)
 
         return [{
             'label': 'Watershed 分割',
@@ -1794,21 +1801,54 @@ class OpenCVService:
             'method': 'Watershed'
         }]
 
-    def _kmeans_segmentation(self, image, filepath):
+    def _kmeans_segmentation(self, context, filepath, output_format='png'):
         """K-means 聚类分割"""
-        # 重塑图像数据
-        data = image.reshape((-1, 3))
-        data = np.float32(data)
-
-        # 定义标准并应用 K-means
-        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 20, 1.0)
-        k = 3  # 聚类数量
-        _, labels, centers = cv2.kmeans(data, k, None, criteria, 10, cv2.KMEANS_RANDOM_CENTERS)
-
-        # 转换回 uint8 并重塑为原始图像形状
+        config = current_app.config
+        mode = config.get('OPENCV_KMEANS_MODE', 'full')
+        k = max(2, min(255, int(config.get('OPENCV_KMEANS_K', 3))))  # 聚类数量
+        seed = int(config.get('OPENCV_KMEANS_SEED', 0))
+        if mode not in KMEANS_MODES:
+            raise ValueError(f'不支持的K-means模式: {mode}，可选: {", ".join(KMEANS_MODES)}')
+
+        if mode == 'full':
+            # 在分析层的全部像素上聚类
+            level, _ = self._analysis_level(context)
+            label_image, centers = fit_centers_full(level.bgr, k, seed)
+        else:
+            # 在抽样像素或颜色直方图上拟合中心，再通过查找表为原图全部像素分配聚类
+            level = context
+            if mode == 'sample':
+                centers = fit_centers_sample(context.bgr, k, seed, int(config.get('OPENCV_KMEANS_SAMPLE_SIZE', 20000)))
+            else:
+                centers = fit_centers_histogram(context.bgr, k, seed, int(config.get('OPENCV_KMEANS_HISTOGRAM_BINS', 32)))
+            label_image = assign_centers(context.bgr, centers)
+        k = len(centers)
+
+        encoder = SegmentationEncoder(output_format, context.shape, current_app.config['GENERATED_FOLDER'], 'opencv_kmeans')
+        if encoder.output_format != 'png':
+            # 几何格式下每个聚类作为一个分割结果，掩码映射回原图坐标，归一化边界框与掩码范围一致
+            height, width = level.height, level.width
+            segments = []
+            for cluster in range(k):
+                region = (label_image == cluster).astype(np.uint8)
+                if not region.any():
+                    continue
+                x, y, w, h = cv2.boundingRect(region)
+                mask, offset = upscale_mask(region[y:y + h, x:x + w], (x, y), level, context)
+                segments.append(encoder.add({
+                    'label': f'K-means 聚类_{cluster + 1}',
+                    'description': f'K-means 聚类区域（中心颜色 BGR: {[int(v) for v in centers[cluster]]}）',
+                    'confidence': 0.6,
+                    'bbox': [y / height, x / width, (y + h) / height, (x + w) / width],
+                    'method': 'K-means'
+                }, mask, offset))
+            self._attach_label_map(segments, encoder)
+            return segments
+
+        # 聚类标签映射回原图尺寸，转换回 uint8 并按标签填充中心颜色
+        label_image, _ = upscale_mask(label_image, (0, 0), level, context)
         centers = np.uint8(centers)
-        segmented_data = centers[labels.flatten()]
-        segmented_image = segmented_data.reshape(image.shape)
+        segmented_image = centers[label_image]
 
         # 保存结果
         import time
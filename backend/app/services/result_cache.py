@@ -0,0 +1,325 @@
+"""
+分析结果缓存
+以图像内容哈希和分析参数为键缓存YOLO和OpenCV的分析结果，内存LRU层之外另有磁盘层，
+相同图像重复分析时直接返回结果，无需解码图像和推理
+"""
+import base64
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+# 计算内容哈希时每次读取的字节数
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _hash_stream(stream):
+    """分块计算字节流的SHA-256哈希"""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(_HASH_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_file(path):
+    """计算文件内容的SHA-256哈希，只读取字节不解码图像"""
+    with open(path, 'rb') as f:
+        return _hash_stream(f)
+
+
+def hash_upload(file=None, image_data=None):
+    """计算上传文件或base64图像数据的内容哈希，无有效输入时返回None"""
+    if image_data:
+        image_data_clean = image_data.split(',')[1] if ',' in image_data else image_data
+        return hashlib.sha256(base64.b64decode(image_data_clean)).hexdigest()
+    if file is None or not getattr(file, 'filename', None):
+        return None
+    if hasattr(file, 'filepath') and os.path.exists(file.filepath):
+        return hash_file(file.filepath)
+    stream = getattr(file, 'stream', None)
+    if stream is None or not hasattr(stream, 'seek'):
+        return None
+    # 从头计算哈希后恢复流位置，不影响随后保存上传文件
+    position = stream.tell()
+    stream.seek(0)
+    content_hash = _hash_stream(stream)
+    stream.seek(position)
+    return content_hash
+
+
+class ResultCache:
+    """进程级分析结果缓存，在create_app中配置"""
+
+    def __init__(self):
+        self.enabled = False
+        self.memory_items = 256
+        self.disk_budget_bytes = 0
+        self.cache_folder = None
+        # 结果中的 /storage/<子目录>/ URL 与本地目录的对应关系，用于检查生成的文件是否仍然存在
+        self.storage_folders = {}
+
+        # 按最近使用顺序排列，最久未使用的在前
+        self._memory = OrderedDict()
+        self._disk = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.stale = 0
+        self.memory_evictions = 0
+        self.disk_evictions = 0
+
+    def init_app(self, app):
+        """从应用配置初始化缓存大小和磁盘目录"""
+        self.enabled = app.config.get('RESULT_CACHE_ENABLED', True)
+        self.memory_items = max(0, int(app.config.get('RESULT_CACHE_MEMORY_ITEMS', 256)))
+        self.disk_budget_bytes = max(0, int(app.config.get('RESULT_CACHE_DISK_MB', 512))) * 1024 * 1024
+        self.cache_folder = app.config.get('RESULT_CACHE_FOLDER')
+        self.storage_folders = {
+            'uploads': app.config.get('UPLOAD_FOLDER'),
+            'generated': app.config.get('GENERATED_FOLDER')
+        }
+        with self._lock:
+            self._memory.clear()
+            self._scan_disk()
+
+    def _scan_disk(self):
+        """按修改时间重建磁盘层索引"""
+        self._disk.clear()
+        self._disk_bytes = 0
+        if not self.disk_budget_bytes or not self.cache_folder or not os.path.isdir(self.cache_folder):
+            return
+        entries = []
+        for name in os.listdir(self.cache_folder):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_folder, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, name[:-len('.json')], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+
+    def make_key(self, namespace, image_path=None, file=None, image_data=None, **params):
+        """由图像内容哈希、分析类型和参数生成缓存键；图像可以是文件路径、上传文件或base64数据，
+        缓存未启用或没有有效图像时返回None"""
+        if not self.enabled:
+            return None
+        if image_path:
+            content_hash = hash_file(image_path) if os.path.isfile(image_path) else None
+        else:
+            content_hash = hash_upload(file, image_data)
+        if content_hash is None:
+            return None
+        payload = json.dumps({'image': content_hash, 'namespace': namespace, 'params': params},
+                             sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """查找缓存结果，依次查找内存层和磁盘层，未命中或结果引用的文件已被删除时返回None"""
+        if key is None:
+            return None
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                tier = 'memory'
+        if data is None:
+            data = self._read_disk(key)
+            tier = 'disk'
+
+        if data is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        entry = json.loads(data)
+        if not all(self._file_signature(path) == signature for path, signature in entry['files']):
+            self._discard(key)
+            with self._lock:
+                self.stale += 1
+                self.misses += 1
+            return None
+
+        with self._lock:
+            if tier == 'memory':
+                self.memory_hits += 1
+            else:
+                self.disk_hits += 1
+                self._put_memory(key, data)
+        return entry['result']
+
+    def set(self, key, result):
+        """缓存分析结果，同时写入内存层和磁盘层"""
+        if key is None:
+            return
+        data = json.dumps({'result': result, 'files': self._referenced_files(result)},
+                          ensure_ascii=False, default=str)
+        with self._lock:
+            self.stores += 1
+            self._put_memory(key, data)
+        self._write_disk(key, data)
+
+    def clear(self):
+        """清空内存层和磁盘层"""
+        with self._lock:
+            self._memory.clear()
+            keys = list(self._disk)
+            self._disk.clear()
+            self._disk_bytes = 0
+        for key in keys:
+            self._remove_file(key)
+
+    def _put_memory(self, key, data):
+        """写入内存层，超出条目数时逐出最久未使用的结果（需持有锁）"""
+        if not self.memory_items:
+            return
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+            self.memory_evictions += 1
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_folder, f'{key}.json')
+
+    def _read_disk(self, key):
+        """从磁盘层读取结果并刷新其使用顺序"""
+        if not self.disk_budget_bytes or not self.cache_folder:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        with self._lock:
+            # 其他进程写入的结果也加入本进程的索引
+            if key not in self._disk:
+                self._disk[key] = len(data.encode('utf-8'))
+                self._disk_bytes += self._disk[key]
+            self._disk.move_to_end(key)
+        return data
+
+    def _write_disk(self, key, data):
+        """写入磁盘层，超出容量时逐出最久未使用的结果"""
+        if not self.disk_budget_bytes or not self.cache_folder:
+            return
+        encoded = data.encode('utf-8')
+        if len(encoded) > self.disk_budget_bytes:
+            return
+        os.makedirs(self.cache_folder, exist_ok=True)
+        path = self._disk_path(key)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(encoded)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"写入结果缓存失败: {str(e)}")
+            return
+
+        evicted = []
+        with self._lock:
+            self._disk_bytes += len(encoded) - self._disk.pop(key, 0)
+            self._disk[key] = len(encoded)
+            while self._disk_bytes > self.disk_budget_bytes and len(self._disk) > 1:
+                old_key, size = self._disk.popitem(last=False)
+                self._disk_bytes -= size
+                self.disk_evictions += 1
+                evicted.append(old_key)
+        for old_key in evicted:
+            self._remove_file(old_key)
+
+    def _discard(self, key):
+        """删除失效的结果"""
+        with self._lock:
+            self._memory.pop(key, None)
+            size = self._disk.pop(key, None)
+            if size is not None:
+                self._disk_bytes -= size
+        if self.cache_folder:
+            self._remove_file(key)
+
+    def _remove_file(self, key):
+        try:
+            os.remove(self._disk_path(key))
+        except OSError:
+            pass
+
+    def _local_path(self, value):
+        """将结果中的文件路径或 /storage/ URL 解析为本地路径"""
+        if value.startswith('/storage/'):
+            subfolder, _, filename = value[len('/storage/'):].partition('/')
+            folder = self.storage_folders.get(subfolder)
+            if folder and filename:
+                return os.path.join(folder, filename)
+        if os.path.isabs(value):
+            return value
+        return None
+
+    @staticmethod
+    def _file_signature(path):
+        """文件的大小和修改时间，文件不存在时为None"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def _referenced_files(self, value):
+        """收集结果中引用的本地文件及其签名，命中时据此判断文件是否已被删除或覆盖"""
+        files = []
+        if isinstance(value, dict):
+            for item in value.values():
+                files.extend(self._referenced_files(item))
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                files.extend(self._referenced_files(item))
+        elif isinstance(value, str):
+            path = self._local_path(value)
+            if path and os.path.isfile(path):
+                files.append([path, self._file_signature(path)])
+        return files
+
+    def get_stats(self):
+        """获取各层容量和命中率统计"""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'memory': {
+                    'items': len(self._memory),
+                    'max_items': self.memory_items,
+                    'hits': self.memory_hits,
+                    'evictions': self.memory_evictions
+                },
+                'disk': {
+                    'folder': self.cache_folder,
+                    'items': len(self._disk),
+                    'bytes': self._disk_bytes,
+                    'budget_bytes': self.disk_budget_bytes,
+                    'hits': self.disk_hits,
+                    'evictions': self.disk_evictions
+                },
+                'hits': hits,
+                'misses': self.misses,
+                'stores': self.stores,
+                # 引用的文件已被删除或覆盖而失效的结果数
+                'stale': self.stale,
+                'hit_rate': round(hits / lookups, 4) if lookups else 0.0
+            }
+
+
+# 进程级共享的分析结果缓存
+result_cache = ResultCache()
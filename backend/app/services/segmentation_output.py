@@ -0,0 +1,133 @@
+"""
+分割结果输出格式
+除逐对象PNG外，支持内联返回COCO格式RLE、简化多边形，或将所有实例写入一张标签图，
+只需要几何信息的客户端无需逐个编码、保存和下载PNG
+"""
+import os
+import time
+import cv2
+import numpy as np
+
+
+SEGMENTATION_OUTPUT_FORMATS = ('png', 'rle', 'polygon', 'label_map')
+
+# 多边形简化容差与轮廓周长之比
+POLYGON_EPSILON_RATIO = 0.005
+
+
+def is_valid_output_format(value):
+    """检查output_format参数是否受支持"""
+    return value is None or str(value).strip().lower() in SEGMENTATION_OUTPUT_FORMATS
+
+
+def normalize_output_format(value):
+    """解析output_format参数，缺省为png"""
+    return str(value).strip().lower() if value else 'png'
+
+
+def _rle_counts_to_string(counts):
+    """按COCO (pycocotools) 的规则将游程长度压缩为字符串"""
+    chars = []
+    for i, x in enumerate(counts):
+        x = int(x)
+        if i > 2:
+            x -= int(counts[i - 2])
+        more = True
+        while more:
+            c = x & 0x1f
+            x >>= 5
+            more = x != -1 if c & 0x10 else x != 0
+            if more:
+                c |= 0x20
+            chars.append(chr(c + 48))
+    return ''.join(chars)
+
+
+def encode_rle(mask, offset=(0, 0), image_shape=None):
+    """将二值掩码编码为COCO压缩RLE（列优先），mask可以是位于原图offset (x, y) 处的裁剪区域"""
+    mask = np.asarray(mask) > 0
+    h, w = mask.shape
+    height, width = image_shape[:2] if image_shape is not None else (h, w)
+    x0, y0 = offset
+
+    # 上下各补一行背景，保证每段前景都在同一列内开始和结束
+    padded = np.zeros((h + 2, w), dtype=np.int8)
+    padded[1:-1] = mask
+    flat = padded.ravel(order='F')
+    changes = np.diff(flat)
+    column_stride = h + 2
+
+    def to_image_index(positions):
+        positions = positions + 1
+        return (x0 + positions // column_stride) * height + y0 + positions % column_stride - 1
+
+    starts = to_image_index(np.flatnonzero(changes == 1))
+    ends = to_image_index(np.flatnonzero(changes == -1))
+
+    if starts.size == 0:
+        counts = [height * width]
+    else:
+        # 裁剪区域覆盖整列时，相邻列首尾相接的前景段需要合并
+        joined = ends[:-1] == starts[1:]
+        starts = starts[np.concatenate([[True], ~joined])]
+        ends = ends[np.concatenate([~joined, [True]])]
+        zeros = starts - np.concatenate([[0], ends[:-1]])
+        ones = ends - starts
+        counts = np.stack([zeros, ones], axis=1).ravel().tolist()
+        if ends[-1] < height * width:
+            counts.append(height * width - int(ends[-1]))
+
+    return {'size': [int(height), int(width)], 'counts': _rle_counts_to_string(counts)}
+
+
+def encode_polygons(mask, offset=(0, 0), epsilon_ratio=POLYGON_EPSILON_RATIO):
+    """提取掩码外轮廓并简化为多边形，返回COCO格式的 [x1, y1, x2, y2, ...] 列表"""
+    mask = (np.asarray(mask) > 0).astype(np.uint8)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    polygons = []
+    for contour in contours:
+        epsilon = epsilon_ratio * cv2.arcLength(contour, True)
+        approx = cv2.approxPolyDP(contour, epsilon, True).reshape(-1, 2)
+        if len(approx) < 3:
+            continue
+        polygons.append((approx + np.asarray(offset)).ravel().astype(int).tolist())
+    return polygons
+
+
+class SegmentationEncoder:
+    """按输出格式为各分割实例附加掩码编码，label_map格式下汇总为一张标签图"""
+
+    def __init__(self, output_format, image_shape, output_folder=None, prefix='segment'):
+        self.output_format = normalize_output_format(output_format)
+        self.image_shape = tuple(image_shape[:2])
+        self.output_folder = output_folder
+        self.prefix = prefix
+        self.label_map = None
+        self.label_count = 0
+
+    def add(self, segment, mask, offset=(0, 0)):
+        """为segment附加mask的编码，mask可以是位于原图offset (x, y) 处的裁剪区域"""
+        if self.output_format == 'rle':
+            segment['rle'] = encode_rle(mask, offset, self.image_shape)
+        elif self.output_format == 'polygon':
+            segment['polygons'] = encode_polygons(mask, offset)
+        elif self.output_format == 'label_map':
+            self.label_count += 1
+            if self.label_map is None:
+                self.label_map = np.zeros(self.image_shape, dtype=np.uint8)
+            if self.label_count > 255 and self.label_map.dtype == np.uint8:
+                self.label_map = self.label_map.astype(np.uint16)
+            x0, y0 = offset
+            h, w = mask.shape[:2]
+            self.label_map[y0:y0 + h, x0:x0 + w][np.asarray(mask) > 0] = self.label_count
+            segment['label_id'] = self.label_count
+        return segment
+
+    def save_label_map(self):
+        """保存标签图PNG（像素值为实例的label_id，0为背景），返回文件路径"""
+        if self.output_format != 'label_map' or self.label_map is None:
+            return None
+        filename = f"{self.prefix}_label_map_{int(time.time() * 1000)}.png"
+        filepath = os.path.join(self.output_folder, filename)
+        cv2.imwrite(filepath, self.label_map)
+        return filepath
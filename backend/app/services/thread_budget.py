@@ -0,0 +1,198 @@
+"""
+CPU 线程预算
+根据可用CPU核心数和请求并发数统一设置PyTorch、OpenCV和ONNX Runtime的线程数，
+避免多个请求线程各自启动满核线程池造成的过度订阅；同时执行图像计算的请求数限制为该并发数，
+超出的请求排队等待，使线程预算的前提成立
+"""
+import functools
+import inspect
+import os
+import sys
+import threading
+from contextlib import contextmanager
+
+
+# 数值库读取的线程数环境变量，只在用户未显式设置时写入
+_THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS')
+
+
+def available_cpus():
+    """当前进程可使用的CPU核心数（考虑CPU亲和性）"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+class ThreadBudget:
+    """进程级线程预算，在create_app中配置，由各图像服务在执行计算前应用"""
+
+    def __init__(self):
+        self.cpu_count = available_cpus()
+        self.request_concurrency = 1
+        self.torch_threads = self.cpu_count
+        self.torch_interop_threads = 1
+        self.opencv_threads = self.cpu_count
+        self.onnx_threads = self.cpu_count
+        self.configured = False
+        self._interop_applied = False
+        self._generation = 0
+        self._applied_threads = set()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # 计算名额，数量与request_concurrency一致
+        self._slots = threading.BoundedSemaphore(1)
+        self.active_requests = 0
+        self.waiting_requests = 0
+
+    def init_app(self, app):
+        """根据配置计算各线程池大小并应用到当前进程"""
+        self.configure(
+            request_concurrency=app.config.get('REQUEST_CONCURRENCY', 4),
+            torch_threads=app.config.get('TORCH_NUM_THREADS', 0),
+            opencv_threads=app.config.get('OPENCV_NUM_THREADS', 0),
+            onnx_threads=app.config.get('ONNX_NUM_THREADS', 0)
+        )
+
+    def configure(self, request_concurrency=1, torch_threads=0, opencv_threads=0, onnx_threads=0):
+        """按并发请求数平分CPU核心，显式指定的线程数优先"""
+        with self._lock:
+            self.cpu_count = available_cpus()
+            self.request_concurrency = max(1, int(request_concurrency))
+            per_request = max(1, self.cpu_count // self.request_concurrency)
+            self.torch_threads = int(torch_threads) or per_request
+            self.opencv_threads = int(opencv_threads) or per_request
+            self.onnx_threads = int(onnx_threads) or per_request
+            self.configured = True
+            self._generation += 1
+            self._applied_threads = set()
+            # 已占用名额的请求继续释放旧的信号量
+            self._slots = threading.BoundedSemaphore(self.request_concurrency)
+
+        for name in _THREAD_ENV_VARS:
+            os.environ.setdefault(name, str(self.torch_threads))
+        self._apply_process()
+        self.apply()
+        print(f"线程预算: {self.cpu_count} 核 / {self.request_concurrency} 并发请求，"
+              f"torch={self.torch_threads} opencv={self.opencv_threads} onnx={self.onnx_threads}")
+
+    def _apply_process(self):
+        """设置进程级线程参数"""
+        from .yolo_model_registry import model_registry
+        model_registry.intra_op_threads = self.onnx_threads
+
+    def _set_interop_threads(self, torch):
+        """互操作线程数只能在首次并行计算前设置一次"""
+        if self._interop_applied:
+            return
+        self._interop_applied = True
+        try:
+            torch.set_num_interop_threads(self.torch_interop_threads)
+        except RuntimeError:
+            pass
+
+    def apply(self):
+        """在当前线程应用线程预算，每个线程每次配置只执行一次；torch在之后才被导入时再补充设置"""
+        # 仅在torch已被导入时设置，避免为纯OpenCV请求导入torch
+        torch = sys.modules.get('torch')
+        state = (self._generation, torch is not None)
+        if getattr(self._local, 'state', None) == state:
+            return
+        import cv2
+        cv2.setNumThreads(self.opencv_threads)
+        if torch is not None:
+            self._set_interop_threads(torch)
+            torch.set_num_threads(self.torch_threads)
+        self._local.state = state
+        with self._lock:
+            self._applied_threads.add(threading.current_thread().name)
+
+    @contextmanager
+    def compute_slot(self):
+        """占用一个计算名额并应用线程预算，名额用尽时排队等待；同一线程内嵌套调用只占用一个名额"""
+        depth = getattr(self._local, 'slot_depth', 0)
+        if depth:
+            self._local.slot_depth = depth + 1
+            try:
+                self.apply()
+                yield
+            finally:
+                self._local.slot_depth = depth
+            return
+
+        slots = self._slots
+        with self._lock:
+            self.waiting_requests += 1
+        try:
+            slots.acquire()
+        finally:
+            with self._lock:
+                self.waiting_requests -= 1
+        with self._lock:
+            self.active_requests += 1
+        self._local.slot_depth = 1
+        try:
+            self.apply()
+            yield
+        finally:
+            self._local.slot_depth = 0
+            with self._lock:
+                self.active_requests -= 1
+            slots.release()
+
+    def get_stats(self):
+        """线程预算配置和当前生效的线程数"""
+        import cv2
+        torch = sys.modules.get('torch')
+        return {
+            'cpu_count': self.cpu_count,
+            'request_concurrency': self.request_concurrency,
+            'configured': self.configured,
+            'budget': {
+                'torch_threads': self.torch_threads,
+                'torch_interop_threads': self.torch_interop_threads,
+                'opencv_threads': self.opencv_threads,
+                'onnx_threads': self.onnx_threads
+            },
+            'effective': {
+                'torch_threads': torch.get_num_threads() if torch is not None else None,
+                'torch_interop_threads': torch.get_num_interop_threads() if torch is not None else None,
+                'opencv_threads': cv2.getNumThreads()
+            },
+            # 全部请求同时计算时的线程数与核心数之比，大于1表示过度订阅
+            'oversubscription': round(self.request_concurrency * max(self.torch_threads, self.opencv_threads)
+                                      / self.cpu_count, 2),
+            'env': {name: os.environ.get(name) for name in _THREAD_ENV_VARS},
+            'applied_threads': len(self._applied_threads),
+            'active_requests': self.active_requests,
+            'waiting_requests': self.waiting_requests
+        }
+
+
+# 进程级共享的线程预算
+thread_budget = ThreadBudget()
+
+
+def limit_concurrency(func):
+    """装饰器：在占用计算名额期间执行图像计算方法；生成器方法只在计算每一项时占用名额，
+    产出结果后即释放，流式响应等待客户端读取期间不占用名额"""
+    if inspect.isgeneratorfunction(func):
+        @functools.wraps(func)
+        def generator_wrapper(*args, **kwargs):
+            generator = func(*args, **kwargs)
+            try:
+                while True:
+                    with thread_budget.compute_slot():
+                        try:
+                            item = next(generator)
+                        except StopIteration:
+                            return
+                    yield item
+            finally:
+                generator.close()
+        return generator_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with thread_budget.compute_slot():
+            return func(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,208 @@
+"""
+YOLO 推理后端
+PyTorch（ultralytics）后端和ONNX Runtime CPU后端，统一返回YOLOPrediction列表
+"""
+import ast
+import math
+import os
+import shutil
+import cv2
+import numpy as np
+from .yolo_prediction import YOLOPrediction, batched_nms
+
+
+SUPPORTED_BACKENDS = ('torch', 'onnx')
+SUPPORTED_PRECISIONS = ('fp32', 'int8')
+
+
+class TorchYOLOBackend:
+    """基于ultralytics PyTorch模型的推理后端"""
+
+    backend = 'torch'
+
+    def __init__(self, model):
+        self.model = model
+        self.names = model.names
+
+    def __call__(self, source, **kwargs):
+        kwargs.setdefault('verbose', False)
+        results = self.model(source, **kwargs)
+        return [YOLOPrediction.from_ultralytics(result) for result in results]
+
+    def memory_bytes(self):
+        """模型参数和缓冲区占用的内存字节数"""
+        module = getattr(self.model, 'model', None)
+        if module is None or not hasattr(module, 'parameters'):
+            return None
+        tensors = list(module.parameters()) + list(module.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+
+
+class ONNXYOLOBackend:
+    """基于ONNX Runtime的CPU推理后端，预处理和后处理使用NumPy完成"""
+
+    backend = 'onnx'
+
+    def __init__(self, onnx_path, intra_op_threads=0):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = int(intra_op_threads)
+        self.session = ort.InferenceSession(onnx_path, sess_options=options, providers=['CPUExecutionProvider'])
+        self.onnx_path = onnx_path
+
+        # 读取ultralytics导出时写入的元数据
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.names = {int(k): v for k, v in ast.literal_eval(metadata['names']).items()}
+        self.stride = int(metadata.get('stride', 32))
+        imgsz = ast.literal_eval(metadata.get('imgsz', '[640, 640]'))
+        self.imgsz = (imgsz, imgsz) if isinstance(imgsz, int) else tuple(imgsz)
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # 动态尺寸导出的模型支持任意输入尺寸，可按图像比例最小化填充
+        self.dynamic = any(not isinstance(dim, int) for dim in model_input.shape[2:])
+        # 静态导出的模型批大小固定，需要按批大小分块推理
+        self.max_batch = model_input.shape[0] if isinstance(model_input.shape[0], int) else None
+
+    def __call__(self, source, conf=0.25, iou=0.7, imgsz=None, max_det=300, classes=None, **kwargs):
+        images = source if isinstance(source, (list, tuple)) else [source]
+        target_size = self._normalize_size(imgsz)
+        chunk_size = self.max_batch or len(images)
+
+        results = []
+        for start in range(0, len(images), chunk_size):
+            batch, metas = self._preprocess(images[start:start + chunk_size], target_size)
+            outputs = self.session.run(None, {self.input_name: batch})
+
+            predictions = outputs[0]
+            protos = outputs[1] if len(outputs) > 1 else None
+            for i, meta in enumerate(metas):
+                proto = protos[i] if protos is not None else None
+                results.append(self._postprocess(predictions[i], proto, meta, conf, iou, max_det, classes))
+        return results
+
+    def memory_bytes(self):
+        """模型权重占用的内存字节数（以模型文件大小近似）"""
+        return os.path.getsize(self.onnx_path)
+
+    def _normalize_size(self, imgsz):
+        """将推理尺寸统一为(h, w)"""
+        if not imgsz or not self.dynamic:
+            return self.imgsz
+        if isinstance(imgsz, int):
+            return (imgsz, imgsz)
+        return tuple(imgsz)
+
+    def _preprocess(self, images, target_size):
+        """letterbox缩放并组成NCHW批次"""
+        resized = []
+        for image in images:
+            h0, w0 = image.shape[:2]
+            ratio = min(target_size[0] / h0, target_size[1] / w0)
+            new_w, new_h = int(round(w0 * ratio)), int(round(h0 * ratio))
+            if (new_w, new_h) != (w0, h0):
+                image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+            resized.append((image, h0, w0, ratio))
+
+        if self.dynamic:
+            # 动态模型：批内统一填充到步长整数倍的最小矩形
+            batch_h = max(math.ceil(item[0].shape[0] / self.stride) * self.stride for item in resized)
+            batch_w = max(math.ceil(item[0].shape[1] / self.stride) * self.stride for item in resized)
+        else:
+            batch_h, batch_w = target_size
+
+        batch = np.empty((len(images), 3, batch_h, batch_w), dtype=np.float32)
+        metas = []
+        for index, (image, h0, w0, ratio) in enumerate(resized):
+            dh, dw = (batch_h - image.shape[0]) / 2, (batch_w - image.shape[1]) / 2
+            top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+            left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+            padded = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+            # BGR -> RGB, HWC -> CHW, 归一化到0-1
+            batch[index] = padded[:, :, ::-1].transpose(2, 0, 1) * (1.0 / 255.0)
+            metas.append({
+                'orig_shape': (h0, w0),
+                'ratio': ratio,
+                'pad': (left, top),
+                'unpadded': (image.shape[0], image.shape[1]),
+                'input_shape': (batch_h, batch_w)
+            })
+        return batch, metas
+
+    def _postprocess(self, prediction, proto, meta, conf, iou, max_det, classes=None):
+        """解码输出、NMS，并将框和掩码映射回原图；指定classes时只保留这些类别"""
+        h0, w0 = meta['orig_shape']
+        num_classes = len(self.names)
+
+        # (4 + nc + nm, A) -> (A, 4 + nc + nm)
+        prediction = prediction.T
+        class_scores = prediction[:, 4:4 + num_classes]
+        class_ids = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(class_scores)), class_ids]
+
+        candidates = scores > conf
+        if classes is not None:
+            # 在NMS和掩码解码之前过滤类别
+            candidates &= np.isin(class_ids, classes)
+        prediction, scores, class_ids = prediction[candidates], scores[candidates], class_ids[candidates]
+        if len(scores) == 0:
+            empty_masks = np.zeros((0, 1, 1), dtype=np.float32) if proto is not None else None
+            return YOLOPrediction(np.zeros((0, 4)), [], [], (h0, w0), empty_masks)
+
+        # cx, cy, w, h -> x1, y1, x2, y2（输入坐标）
+        xywh = prediction[:, :4]
+        boxes = np.empty_like(xywh)
+        boxes[:, :2] = xywh[:, :2] - xywh[:, 2:] / 2
+        boxes[:, 2:] = xywh[:, :2] + xywh[:, 2:] / 2
+
+        keep = batched_nms(boxes, scores, class_ids, iou)[:max_det]
+        boxes, scores, class_ids = boxes[keep], scores[keep], class_ids[keep]
+
+        masks = None
+        if proto is not None:
+            coefficients = prediction[keep, 4 + num_classes:]
+            masks = self._process_masks(proto, coefficients, boxes, meta)
+
+        # 输入坐标 -> 原图坐标
+        left, top = meta['pad']
+        boxes[:, [0, 2]] = ((boxes[:, [0, 2]] - left) / meta['ratio']).clip(0, w0)
+        boxes[:, [1, 3]] = ((boxes[:, [1, 3]] - top) / meta['ratio']).clip(0, h0)
+
+        return YOLOPrediction(boxes, scores, class_ids, (h0, w0), masks)
+
+    def _process_masks(self, proto, coefficients, boxes, meta):
+        """由原型掩码和系数生成实例掩码，裁剪到框内并去除填充区域"""
+        num_protos, mh, mw = proto.shape
+        logits = coefficients @ proto.reshape(num_protos, -1)
+        masks = (1.0 / (1.0 + np.exp(-logits))).reshape(-1, mh, mw).astype(np.float32)
+
+        input_h, input_w = meta['input_shape']
+        scale_x, scale_y = mw / input_w, mh / input_h
+
+        # 框外区域置零
+        cols = np.arange(mw, dtype=np.float32)[None, None, :]
+        rows = np.arange(mh, dtype=np.float32)[None, :, None]
+        x1 = (boxes[:, 0] * scale_x)[:, None, None]
+        y1 = (boxes[:, 1] * scale_y)[:, None, None]
+        x2 = (boxes[:, 2] * scale_x)[:, None, None]
+        y2 = (boxes[:, 3] * scale_y)[:, None, None]
+        masks *= (cols >= x1) & (cols < x2) & (rows >= y1) & (rows < y2)
+
+        # 去除letterbox填充，使掩码覆盖原图范围
+        left, top = meta['pad']
+        unpadded_h, unpadded_w = meta['unpadded']
+        y_start, x_start = int(round(top * scale_y)), int(round(left * scale_x))
+        y_end = max(y_start + 1, int(round((top + unpadded_h) * scale_y)))
+        x_end = max(x_start + 1, int(round((left + unpadded_w) * scale_x)))
+        return masks[:, y_start:y_end, x_start:x_end]
+
+
+def export_onnx(model, onnx_path, imgsz=640):
+    """将ultralytics模型导出为动态尺寸ONNX文件"""
+    exported_path = model.export(format='onnx', imgsz=imgsz, dynamic=True, simplify=True)
+    if os.path.abspath(str(exported_path)) != os.path.abspath(onnx_path):
+        shutil.move(str(exported_path), onnx_path)
+    return onnx_path
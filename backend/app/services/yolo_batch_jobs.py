@@ -0,0 +1,54 @@
+"""
+YOLO 批量任务
+按批解码和推理大量图像：下一批图像在后台线程解码，同一批内推理尺寸相同的图像合并为一次批量推理，
+供批量检测和批量分割接口使用
+"""
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+
+
+def _decode_chunk(image_paths):
+    """解码一批图像，无法读取的图像为None"""
+    return [cv2.imread(path) for path in image_paths]
+
+
+def iter_batch_predictions(service, model, model_name, image_paths, conf, imgsz=None, tiled=False, batch_size=8, classes=None):
+    """按输入顺序逐张产出 (图像路径, 图像, 推理结果, 推理尺寸)，图像无法读取时后三项为None；classes为推理时保留的类别ID"""
+    batch_size = max(1, int(batch_size))
+    chunks = [image_paths[i:i + batch_size] for i in range(0, len(image_paths), batch_size)]
+    if not chunks:
+        return
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix='yolo-batch-decode') as decoder:
+        pending = decoder.submit(_decode_chunk, chunks[0])
+        for index, chunk in enumerate(chunks):
+            images = pending.result()
+            # 当前批推理时预先解码下一批
+            if index + 1 < len(chunks):
+                pending = decoder.submit(_decode_chunk, chunks[index + 1])
+            yield from _predict_chunk(service, model, model_name, chunk, images, conf, imgsz, tiled, classes)
+
+
+def _predict_chunk(service, model, model_name, image_paths, images, conf, imgsz, tiled, classes=None):
+    """推理一批已解码的图像"""
+    sizes = [service._resolve_imgsz(imgsz, image, model_name, model) if image is not None else None
+             for image in images]
+    results = [None] * len(images)
+
+    if tiled:
+        # 切片推理内部已按切片批量推理
+        for i, image in enumerate(images):
+            if image is not None:
+                results[i] = service._predict(model, image, conf, sizes[i], tiled=True, classes=classes)
+    else:
+        groups = {}
+        for i, size in enumerate(sizes):
+            if size is not None:
+                groups.setdefault(size, []).append(i)
+        for size, indices in groups.items():
+            predictions = model.predict([images[i] for i in indices], conf=conf, imgsz=size, classes=classes)
+            for i, prediction in zip(indices, predictions):
+                results[i] = [prediction]
+
+    for image_path, image, result, size in zip(image_paths, images, results, sizes):
+        yield image_path, image, result, size
@@ -0,0 +1,173 @@
+"""
+YOLO 动态微批调度
+将短时间窗口内到达的单图推理请求合并为一次批量推理，
+结果按请求拆分后返回给各自的等待线程
+"""
+import queue
+import threading
+import time
+from .thread_budget import thread_budget
+
+
+# 关闭调度器时放入队列的结束标记
+_STOP = object()
+
+
+class _PendingRequest:
+    """等待批量推理的单个请求"""
+
+    __slots__ = ('image', 'conf', 'options', 'key', 'event', 'result', 'error', 'enqueued_at')
+
+    def __init__(self, image, conf, options):
+        self.image = image
+        self.conf = conf
+        self.options = options
+        # 只有推理参数（置信度除外）相同的请求才能合并到同一批次
+        self.key = tuple(sorted((k, repr(v)) for k, v in options.items()))
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.enqueued_at = time.perf_counter()
+
+
+class MicroBatchScheduler:
+    """单个模型的动态微批调度器"""
+
+    def __init__(self, entry, window_ms=10, max_batch_size=8):
+        self.entry = entry
+        self.window = max(0.0, float(window_ms)) / 1000.0
+        self.max_batch_size = max(1, int(max_batch_size))
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._workers = []
+        self._started = False
+        self._closed = False
+        self._start_lock = threading.Lock()
+
+        # 统计信息
+        self.total_requests = 0
+        self.total_batches = 0
+        self.max_queue_depth = 0
+        self.total_wait_ms = 0.0
+        self.batch_size_histogram = {}
+
+    def _ensure_started(self):
+        """按需启动批处理线程，线程数与模型副本数一致"""
+        if self._started:
+            return
+        with self._start_lock:
+            if self._started or self._closed:
+                return
+            for i in range(self.entry.max_replicas):
+                worker = threading.Thread(target=self._run, name=f'yolo-batch-{self.entry.name}-{i}', daemon=True)
+                worker.start()
+                self._workers.append(worker)
+            self._started = True
+
+    def submit(self, image, conf=0.25, **options):
+        """提交单张图像并等待其推理结果"""
+        self._ensure_started()
+        request = _PendingRequest(image, conf, options)
+        with self._start_lock:
+            closed = self._closed
+            if not closed:
+                self._queue.put(request)
+        if closed:
+            # 调度器已关闭（模型已被逐出），直接在副本上推理
+            with self.entry.acquire() as model:
+                return model([image], conf=conf, **options)
+
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            self.total_requests += 1
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+
+        request.event.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def close(self):
+        """停止批处理线程，已入队的请求仍会处理完毕"""
+        with self._start_lock:
+            if self._closed:
+                return
+            self._closed = True
+            for _ in self._workers:
+                self._queue.put(_STOP)
+
+    def _collect_batch(self):
+        """收集一个时间窗口内到达的请求，最多max_batch_size个，返回(批次, 是否收到结束标记)"""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is _STOP:
+                return batch, True
+            batch.append(request)
+        return batch, False
+
+    def _run(self):
+        """批处理线程主循环"""
+        stopped = False
+        while not stopped:
+            batch, stopped = self._collect_batch()
+            thread_budget.apply()
+
+            groups = {}
+            for request in batch:
+                groups.setdefault(request.key, []).append(request)
+
+            for group in groups.values():
+                self._run_group(group)
+
+    def _run_group(self, group):
+        """对参数相同的一组请求执行一次批量推理"""
+        started_at = time.perf_counter()
+        try:
+            # 以组内最低置信度推理，再按每个请求自己的置信度过滤
+            batch_conf = min(request.conf for request in group)
+            with self.entry.acquire() as model:
+                results = model([request.image for request in group], conf=batch_conf, **group[0].options)
+
+            for request, result in zip(group, results):
+                if request.conf > batch_conf:
+                    result = result.filter(result.scores >= request.conf)
+                request.result = [result]
+        except Exception as e:
+            for request in group:
+                request.error = e
+        finally:
+            with self._stats_lock:
+                self.total_batches += 1
+                size = len(group)
+                self.batch_size_histogram[size] = self.batch_size_histogram.get(size, 0) + 1
+                self.total_wait_ms += sum((started_at - request.enqueued_at) * 1000 for request in group)
+            for request in group:
+                request.event.set()
+
+    def get_stats(self):
+        """获取队列深度和批大小统计"""
+        with self._stats_lock:
+            batched_requests = sum(size * count for size, count in self.batch_size_histogram.items())
+            return {
+                'model_name': self.entry.name,
+                'window_ms': self.window * 1000,
+                'max_batch_size': self.max_batch_size,
+                'queue_depth': self._queue.qsize(),
+                'max_queue_depth': self.max_queue_depth,
+                'total_requests': self.total_requests,
+                'total_batches': self.total_batches,
+                'average_batch_size': round(batched_requests / self.total_batches, 2) if self.total_batches else 0,
+                'average_wait_ms': round(self.total_wait_ms / batched_requests, 2) if batched_requests else 0,
+                'batch_size_histogram': {str(size): count for size, count in sorted(self.batch_size_histogram.items())}
+            }
@@ -1,82 +1,85 @@
 import os
 import cv2
 import numpy as np
-from ultralytics import YOLO
 from PIL import Image, ImageDraw, ImageFont
 import time
 from flask import current_app
 from ..utils.helpers import allowed_file, save_uploaded_file
+from .yolo_model_registry import model_registry
+from .result_cache import result_cache
+from .thread_budget import limit_concurrency
+from .yolo_batch_jobs import iter_batch_predictions
+from .class_synonyms import canonical_classes, query_class_names, resolve_class_ids
+from .yolo_video import MotionGate, get_video_info, iter_sampled_frames
+from .yolo_resolution import DEFAULT_IMGSZ, resolve_imgsz
+from .yolo_tiling import predict_tiled
+from .yolo_prediction import keep_classes
 
 class YOLODetectionService:
     """YOLO目标检测服务"""
 
-    def __init__(self):
-        self.models = {
-            'yolo11n': None,  # YOLOv11 nano
-            'yolo11s': None,  # YOLOv11 small
-            'yolo11m': None,  # YOLOv11 medium
-            'yolo11l': None,  # YOLOv11 large
-            'yolo11x': None,  # YOLOv11 extra large
-        }
-        self.current_model = None
-        self.current_model_name = None
+    # 内容匹配验证使用的较低置信度阈值
+    VALIDATION_CONFIDENCE = 0.25
 
-    def load_model(self, model_name='yolo11n'):
-        """加载YOLO模型"""
+    def __init__(self):
+        self.models = [
+            'yolo11n',  # YOLOv11 nano
+            'yolo11s',  # YOLOv11 small
+            'yolo11m',  # YOLOv11 medium
+            'yolo11l',  # YOLOv11 large
+            'yolo11x',  # YOLOv11 extra large
+        ]
+
+    def load_model(self, model_name='yolo11n', backend=None, precision=None):
+        """加载YOLO模型，返回调用方独占使用的模型句柄"""
         try:
             if model_name not in self.models:
                 model_name = 'yolo11n'  # 默认使用nano版本
 
-            if self.models[model_name] is None:
-                # 使用配置中定义的模型目录
-                models_folder = current_app.config.get('MODELS_FOLDER')
-                if models_folder:
-                    model_path = os.path.join(models_folder, f'{model_name}.pt')
-                else:
-                    # 回退到当前目录
-                    model_path = f'{model_name}.pt'
-
-                if os.path.exists(model_path):
-                    print(f"找到本地模型文件: {model_path}")
-                    print(f"正在加载 {model_name} 模型...")
-                    self.models[model_name] = YOLO(model_path)
-                    print(f"{model_name} 模型加载完成")
-                else:
-                    print(f"本地未找到模型文件: {model_path}")
-                    print(f"正在下载并加载 {model_name} 模型...")
-                    # 如果本地没有，先尝试下载到模型目录
-                    if models_folder and os.path.exists(models_folder):
-                        # 下载到指定的模型目录
-                        self.models[model_name] = YOLO(f'{model_name}.pt')  # 先下载
-                        # 然后移动到正确位置（如果需要）
-                        downloaded_path = f'{model_name}.pt'
-                        if os.path.exists(downloaded_path) and downloaded_path != model_path:
-                            import shutil
-                            shutil.move(downloaded_path, model_path)
-                            print(f"模型文件已移动到: {model_path}")
-                        self.models[model_name] = YOLO(model_path)
-                    else:
-                        self.models[model_name] = YOLO(f'{model_name}.pt')  # 这会自动下载
-                    print(f"{model_name} 模型下载并加载完成")
-
-            self.current_model = self.models[model_name]
-            self.current_model_name = model_name
-            return True
+            return model_registry.get_handle(model_name, backend, precision)
 
         except Exception as e:
             print(f"加载YOLO模型失败: {str(e)}")
-            return False
-
-    def detect_objects(self, image_path, model_name='yolo11n', confidence=0.5, user_query=None):
-        """使用YOLO检测图像中的对象"""
+            return None
+
+    def detect_objects(self, image_path, model_name='yolo11n', confidence=0.5, user_query=None, single_pass=None, backend=None, precision=None, imgsz=None, tiled=False):
+        """使用YOLO检测图像中的对象，相同图像、参数和有效配置的成功结果直接从缓存返回"""
+        if single_pass is None:
+            single_pass = current_app.config.get('YOLO_SINGLE_PASS_VALIDATION', True)
+        cache_key = result_cache.make_key(
+            'yolo_detection', image_path=image_path, model_name=model_name, confidence=confidence, user_query=user_query,
+            single_pass=single_pass, imgsz=imgsz, tiled=bool(tiled), settings=model_registry.result_settings(backend, precision))
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        result = self._detect_objects(image_path, model_name, confidence, user_query, single_pass, backend, precision, imgsz, tiled)
+        if result.get('success'):
+            result_cache.set(cache_key, result)
+        return result
+
+    @limit_concurrency
+    def _detect_objects(self, image_path, model_name, confidence, user_query, single_pass, backend, precision, imgsz, tiled):
+        """执行YOLO检测"""
         try:
+            if single_pass is None:
+                single_pass = current_app.config.get('YOLO_SINGLE_PASS_VALIDATION', True)
+
             # 加载模型
-            if not self.load_model(model_name):
+            model = self.load_model(model_name, backend, precision)
+            if model is None:
                 return {
                     'success': False,
                     'error': f'无法加载YOLO模型: {model_name}'
                 }
 
+            # 查询无法对应到模型类别时直接返回，不执行推理
+            classes = None
+            if user_query:
+                classes = resolve_class_ids(user_query, model.names)
+                if not classes:
+                    return self._unsupported_class_response(user_query, model, model_name)
+
             # 读取图像
             image = cv2.imread(image_path)
             if image is None:
@@ -85,95 +88,25 @@ class YOLODetectionService:
                     'error': '无法读取图像文件'
                 }
 
-            # 如果提供了用户查询，验证内容匹配性
-            if user_query:
-                content_match_result = self._validate_content_match(image_path, user_query)
+            # 推理尺寸：指定数值或按图像大小和延迟预算自动选择
+            inference_imgsz = self._resolve_imgsz(imgsz, image, model_name, model)
+
+            # 单次推理模式：以验证阈值运行一次请求的模型，复用其结果做内容匹配
+            inference_confidence = confidence
+            if user_query and single_pass:
+                inference_confidence = min(confidence, self.VALIDATION_CONFIDENCE)
+
+            # 双次推理模式：先用nano模型验证，匹配后再运行请求的模型
+            content_match_result = None
+            if user_query and not single_pass:
+                content_match_result = self._validate_content_match(image_path, user_query, backend, precision, imgsz)
                 if not content_match_result['is_match']:
-                    return {
-                        'success': False,
-                        'error': f'未检测到目标：{user_query}',
-                        'message': f'图像中检测到的对象与您查询的"{user_query}"不匹配。{content_match_result["message"]}',
-                        'suggestion': content_match_result.get('suggestion', '请检查图像内容或修改查询词汇。'),
-                        'detected_objects': content_match_result.get('detected_objects', []),
-                        'alternative_queries': content_match_result.get('alternative_queries', [])
-                    }
-
-            # 进行检测
-            results = self.current_model(image, conf=confidence)
-
-            # 处理检测结果
-            detected_objects = []
-            bbox_images = []
-
-            # 创建汇总图像
-            summary_image = image.copy()
-
-            for result in results:
-                boxes = result.boxes
-                if boxes is not None:
-                    for i, box in enumerate(boxes):
-                        # 获取边界框坐标
-                        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy().astype(int)
-
-                        # 获取类别和置信度
-                        class_id = int(box.cls[0])
-                        confidence_score = float(box.conf[0])
-                        class_name = self.current_model.names[class_id]
-
-                        # 添加到检测结果
-                        detected_objects.append({
-                            'label': class_name,
-                            'confidence': confidence_score,
-                            'bbox': [int(x1), int(y1), int(x2), int(y2)]
-                        })
-
-                        # 在汇总图像上绘制边界框
-                        cv2.rectangle(summary_image, (x1, y1), (x2, y2), (0, 255, 0), 2)
-
-                        # 添加标签
-                        label_text = f"{class_name}: {confidence_score:.2f}"
-                        cv2.putText(summary_image, label_text, (x1, y1-10),
-                                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-
-                        # 创建单个对象的边界框图像
-                        bbox_image = image[y1:y2, x1:x2].copy()
-
-                        # 保存边界框图像
-                        timestamp = int(time.time() * 1000)
-                        bbox_filename = f"yolo_bbox_{timestamp}_{i}_{os.path.basename(image_path)}"
-                        bbox_path = os.path.join(current_app.config['GENERATED_FOLDER'], bbox_filename)
-                        cv2.imwrite(bbox_path, bbox_image)
-                        bbox_images.append(bbox_path)
-
-            # 保存汇总图像
-            if detected_objects:
-                timestamp = int(time.time() * 1000)
-                summary_filename = f"yolo_summary_{timestamp}_{os.path.basename(image_path)}"
-                summary_path = os.path.join(current_app.config['GENERATED_FOLDER'], summary_filename)
-                cv2.imwrite(summary_path, summary_image)
-
-                # 使用统一的URL生成函数
-                from ..utils.helpers import get_image_url
-                relative_bbox_images = [get_image_url(os.path.basename(img), 'generated') for img in bbox_images]
-                relative_summary_image = get_image_url(os.path.basename(summary_path), 'generated')
+                    return self._content_mismatch_response(user_query, content_match_result)
 
-                return {
-                    'success': True,
-                    'detected_objects': detected_objects,
-                    'bbox_images': relative_bbox_images,
-                    'summary_image': relative_summary_image,
-                    'method': f'YOLO {model_name}',
-                    'model_name': model_name,
-                    'total_objects': len(detected_objects)
-                }
-            else:
-                return {
-                    'success': False,
-                    'error': '未检测到任何对象',
-                    'method': f'YOLO {model_name}',
-                    'detected_objects': [],
-                    'total_objects': 0
-                }
+            # 进行检测：有查询时只推理查询对应的类别
+            results = self._predict(model, image, inference_confidence, inference_imgsz, tiled, classes)
+            return self._build_detection_response(image_path, image, results, model, model_name, confidence,
+                                                  user_query, inference_imgsz, tiled, content_match_result, classes)
 
         except Exception as e:
             print(f"YOLO检测错误: {str(e)}")
@@ -182,11 +115,225 @@ class YOLODetectionService:
                 'error': f'YOLO检测失败: {str(e)}'
             }
 
-    def _validate_content_match(self, image_path, user_query):
+    @limit_concurrency
+    def detect_objects_batch(self, image_paths, model_name='yolo11n', confidence=0.5, user_query=None, backend=None, precision=None, imgsz=None, tiled=False, batch_size=8):
+        """批量检测多张图像，模型只加载一次，按批推理并逐张产出 (图像路径, 检测结果)"""
+        model = self.load_model(model_name, backend, precision)
+        if model is None:
+            for image_path in image_paths:
+                yield image_path, {'success': False, 'error': f'无法加载YOLO模型: {model_name}'}
+            return
+
+        classes = None
+        if user_query:
+            classes = resolve_class_ids(user_query, model.names)
+            if not classes:
+                response = self._unsupported_class_response(user_query, model, model_name)
+                for image_path in image_paths:
+                    yield image_path, response
+                return
+
+        # 批量模式固定使用单次推理验证，避免每张图像额外运行验证模型
+        inference_confidence = min(confidence, self.VALIDATION_CONFIDENCE) if user_query else confidence
+        for image_path, image, results, inference_imgsz in iter_batch_predictions(
+                self, model, model_name, image_paths, inference_confidence, imgsz, tiled, batch_size, classes):
+            try:
+                if image is None:
+                    yield image_path, {'success': False, 'error': '无法读取图像文件'}
+                    continue
+                yield image_path, self._build_detection_response(image_path, image, results, model, model_name, confidence,
+                                                                 user_query, inference_imgsz, tiled, classes=classes)
+            except Exception as e:
+                print(f"YOLO批量检测错误: {str(e)}")
+                yield image_path, {'success': False, 'error': f'YOLO检测失败: {str(e)}'}
+
+    @limit_concurrency
+    def detect_video(self, video_path, model_name='yolo11n', confidence=0.5, backend=None, precision=None, imgsz=None, frame_stride=5, motion_threshold=2.0, max_frames=None):
+        """检测视频中的对象，逐帧产出检测结果，最后产出汇总信息"""
+        model = self.load_model(model_name, backend, precision)
+        if model is None:
+            yield {'type': 'error', 'success': False, 'error': f'无法加载YOLO模型: {model_name}'}
+            return
+
+        started_at = time.perf_counter()
+        gate = MotionGate(motion_threshold)
+        inference_imgsz = None
+        detections = []
+        processed = reused = 0
+        class_counts = {}
+
+        try:
+            for frame_index, timestamp_ms, frame in iter_sampled_frames(video_path, frame_stride, max_frames):
+                run_inference, motion = gate.check(frame)
+                if run_inference:
+                    # 同一视频的帧尺寸相同，推理尺寸只需确定一次
+                    if inference_imgsz is None:
+                        inference_imgsz = self._resolve_imgsz(imgsz, frame, model_name, model)
+                    result = model.predict(frame, conf=confidence, imgsz=inference_imgsz)[0]
+                    detections = [{
+                        'label': model.names[int(class_id)],
+                        'confidence': float(score),
+                        'bbox': [int(v) for v in box]
+                    } for box, class_id, score in zip(result.boxes, result.class_ids, result.scores)]
+                    processed += 1
+                    for detection in detections:
+                        class_counts[detection['label']] = class_counts.get(detection['label'], 0) + 1
+                else:
+                    reused += 1
+
+                yield {
+                    'type': 'frame',
+                    'frame_index': frame_index,
+                    'timestamp_ms': timestamp_ms,
+                    'reused': not run_inference,
+                    'motion': motion,
+                    'detected_objects': detections,
+                    'total_objects': len(detections)
+                }
+        except ValueError as e:
+            yield {'type': 'error', 'success': False, 'error': str(e)}
+            return
+
+        elapsed = time.perf_counter() - started_at
+        yield {
+            'type': 'summary',
+            'success': True,
+            'video': get_video_info(video_path),
+            'method': f'YOLO {model_name}',
+            'model_name': model_name,
+            'backend': model.backend,
+            'precision': model.precision,
+            'imgsz': inference_imgsz,
+            'frame_stride': frame_stride,
+            'motion_threshold': motion_threshold,
+            'frames_sampled': processed + reused,
+            'frames_inferred': processed,
+            'frames_reused': reused,
+            # 各类别在推理帧中出现的次数
+            'class_counts': class_counts,
+            'elapsed_ms': round(elapsed * 1000, 1)
+        }
+
+    def _unsupported_class_response(self, user_query, model, model_name):
+        """用户查询无法对应到模型任何类别时的响应"""
+        return {
+            'success': False,
+            'error': f'不支持的检测类别：{user_query}',
+            'message': f'查询"{user_query}"无法对应到 YOLO {model_name} 可识别的任何类别，未执行检测',
+            'suggestion': '请使用模型支持的类别名称（中英文均可）进行查询',
+            'supported_classes': list(model.names.values()),
+            'unsupported_class': True,
+            'method': f'YOLO {model_name}'
+        }
+
+    def _content_mismatch_response(self, user_query, content_match_result):
+        """用户查询与图像内容不匹配时的响应"""
+        return {
+            'success': False,
+            'error': f'未检测到目标：{user_query}',
+            'message': f'图像中检测到的对象与您查询的"{user_query}"不匹配。{content_match_result["message"]}',
+            'suggestion': content_match_result.get('suggestion', '请检查图像内容或修改查询词汇。'),
+            'detected_objects': content_match_result.get('detected_objects', []),
+            'alternative_queries': content_match_result.get('alternative_queries', [])
+        }
+
+    def _build_detection_response(self, image_path, image, results, model, model_name, confidence, user_query, inference_imgsz, tiled, content_match_result=None, classes=None):
+        """根据推理结果验证内容匹配、绘制并保存检测图像，生成响应；classes为推理时保留的类别ID"""
+        # 单次推理模式：结果已按查询类别过滤，检测到查询类别即为匹配；未检测到时才以全部类别
+        # 再推理一次，给出图像中实际包含的对象和备选查询
+        if user_query and content_match_result is None and not any(len(result) for result in results):
+            results = self._predict(model, image, min(confidence, self.VALIDATION_CONFIDENCE), inference_imgsz, tiled)
+            content_match_result = self._match_content(self._collect_detected_classes(results, model), user_query, model.names)
+            if not content_match_result['is_match']:
+                return self._content_mismatch_response(user_query, content_match_result)
+            results = keep_classes(results, classes)
+
+        # 处理检测结果
+        detected_objects = []
+        bbox_images = []
+
+        # 创建汇总图像
+        summary_image = image.copy()
+
+        for result in results:
+            if len(result):
+                for i, (box, class_id, score) in enumerate(zip(result.boxes, result.class_ids, result.scores)):
+                    # 获取边界框坐标
+                    x1, y1, x2, y2 = box.astype(int)
+
+                    # 获取类别和置信度
+                    confidence_score = float(score)
+                    class_name = model.names[int(class_id)]
+
+                    # 单次推理模式下过滤掉低于用户置信度的结果
+                    if confidence_score < confidence:
+                        continue
+
+                    # 添加到检测结果
+                    detected_objects.append({
+                        'label': class_name,
+                        'confidence': confidence_score,
+                        'bbox': [int(x1), int(y1), int(x2), int(y2)]
+                    })
+
+                    # 在汇总图像上绘制边界框
+                    cv2.rectangle(summary_image, (x1, y1), (x2, y2), (0, 255, 0), 2)
+
+                    # 添加标签
+                    label_text = f"{class_name}: {confidence_score:.2f}"
+                    cv2.putText(summary_image, label_text, (x1, y1-10),
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+
+                    # 创建单个对象的边界框图像
+                    bbox_image = image[y1:y2, x1:x2].copy()
+
+                    # 保存边界框图像
+                    timestamp = int(time.time() * 1000)
+                    bbox_filename = f"yolo_bbox_{timestamp}_{i}_{os.path.basename(image_path)}"
+                    bbox_path = os.path.join(current_app.config['GENERATED_FOLDER'], bbox_filename)
+                    cv2.imwrite(bbox_path, bbox_image)
+                    bbox_images.append(bbox_path)
+
+        # 保存汇总图像
+        if detected_objects:
+            timestamp = int(time.time() * 1000)
+            summary_filename = f"yolo_summary_{timestamp}_{os.path.basename(image_path)}"
+            summary_path = os.path.join(current_app.config['GENERATED_FOLDER'], summary_filename)
+            cv2.imwrite(summary_path, summary_image)
+
+            # 使用统一的URL生成函数
+            from ..utils.helpers import get_image_url
+            relative_bbox_images = [get_image_url(os.path.basename(img), 'generated') for img in bbox_images]
+            relative_summary_image = get_image_url(os.path.basename(summary_path), 'generated')
+
+            return {
+                'success': True,
+                'detected_objects': detected_objects,
+                'bbox_images': relative_bbox_images,
+                'summary_image': relative_summary_image,
+                'method': f'YOLO {model_name}',
+                'model_name': model_name,
+                'backend': model.backend,
+                'precision': model.precision,
+                'imgsz': inference_imgsz,
+                'tiled': bool(tiled),
+                'total_objects': len(detected_objects)
+            }
+        else:
+            return {
+                'success': False,
+                'error': '未检测到任何对象',
+                'method': f'YOLO {model_name}',
+                'detected_objects': [],
+                'total_objects': 0
+            }
+
+    def _validate_content_match(self, image_path, user_query, backend=None, precision=None, imgsz=None):
         """验证用户查询内容与图像内容的匹配性"""
         try:
             # 首先进行快速检测，获取图像中的对象
-            if not self.load_model('yolo11n'):  # 使用最快的模型进行检测
+            model = self.load_model('yolo11n', backend, precision)  # 使用最快的模型进行检测
+            if model is None:
                 return {
                     'is_match': True,  # 如果无法加载模型，允许继续
                     'message': '无法验证内容匹配性，将继续处理'
@@ -200,22 +347,54 @@ class YOLODetectionService:
                     'message': '无法读取图像，将继续处理'
                 }
 
-            # 进行快速检测
-            results = self.current_model(image, conf=0.25)  # 使用较低的置信度进行检测
+            # 进行快速检测，保留全部类别以便不匹配时给出备选查询
+            results = model.predict(image, conf=self.VALIDATION_CONFIDENCE,
+                                    imgsz=self._resolve_imgsz(imgsz, image, 'yolo11n', model))  # 使用较低的置信度进行检测
 
-            detected_objects = []
-            for result in results:
-                if result.boxes is not None:
-                    classes = result.boxes.cls.cpu().numpy()
-                    confidences = result.boxes.conf.cpu().numpy()
+            return self._match_content(self._collect_detected_classes(results, model), user_query, model.names)
 
-                    for cls, conf in zip(classes, confidences):
-                        class_name = self.current_model.names[int(cls)]
-                        detected_objects.append({
-                            'class_name': class_name,
-                            'confidence': float(conf)
-                        })
+        except Exception as e:
+            print(f"YOLO内容匹配验证错误: {str(e)}")
+            # 如果验证过程出错，允许继续处理
+            return {
+                'is_match': True,
+                'message': f'内容匹配验证出错，将继续处理: {str(e)}'
+            }
 
+    def _predict(self, model, image, confidence, imgsz, tiled=False, classes=None):
+        """执行推理，tiled时对大图使用重叠切片推理；classes为推理时保留的类别ID"""
+        if tiled:
+            return predict_tiled(
+                model, image, conf=confidence, imgsz=imgsz,
+                tile_size=current_app.config.get('YOLO_TILE_SIZE', 640),
+                overlap=current_app.config.get('YOLO_TILE_OVERLAP', 0.2),
+                batch_size=current_app.config.get('YOLO_TILE_BATCH_SIZE', 8),
+                classes=classes
+            )
+        return model.predict(image, conf=confidence, imgsz=imgsz, classes=classes)
+
+    def _resolve_imgsz(self, imgsz, image, model_name, model):
+        """解析推理尺寸，未指定时使用配置的默认值"""
+        if imgsz is None:
+            imgsz = current_app.config.get('YOLO_IMGSZ', DEFAULT_IMGSZ)
+        latency_budget_ms = current_app.config.get('YOLO_LATENCY_BUDGET_MS', 250)
+        return resolve_imgsz(imgsz, image.shape, model_name, latency_budget_ms, model.backend, model.precision)
+
+    def _collect_detected_classes(self, results, model):
+        """从推理结果中提取类别名称和置信度"""
+        detected_objects = []
+        for result in results:
+            for cls, conf in zip(result.class_ids, result.scores):
+                class_name = model.names[int(cls)]
+                detected_objects.append({
+                    'class_name': class_name,
+                    'confidence': float(conf)
+                })
+        return detected_objects
+
+    def _match_content(self, detected_objects, user_query, names):
+        """根据检测到的对象判断是否与用户查询匹配，names为模型类别名称映射"""
+        try:
             if not detected_objects:
                 return {
                     'is_match': False,
@@ -226,24 +405,10 @@ class YOLODetectionService:
 
             # 检查用户查询是否与检测到的对象匹配
             user_query_lower = user_query.lower().strip()
-            detected_names = [obj['class_name'].lower() for obj in detected_objects]
-
-            # 严格的关键词匹配，包括同义词
-            matched_objects = []
-
-            # 创建同义词映射
-            synonym_map = self._get_synonym_map()
-
-            # 获取用户查询的所有可能匹配词汇
-            query_words = self._expand_query_words(user_query_lower, synonym_map)
 
-            # 更严格的匹配逻辑
-            for obj in detected_objects:
-                class_name = obj['class_name'].lower()
-
-                # 检查精确匹配和同义词匹配
-                if self._is_strict_match(query_words, class_name, synonym_map):
-                    matched_objects.append(obj['class_name'])
+            # 与推理时的类别过滤使用同一类别索引，查询对应的类别即为匹配目标
+            target_names = query_class_names(user_query_lower, names)
+            matched_objects = [obj['class_name'] for obj in detected_objects if obj['class_name'] in target_names]
 
             is_match = len(matched_objects) > 0
 
@@ -257,7 +422,7 @@ class YOLODetectionService:
                 }
             else:
                 detected_names = [obj['class_name'] for obj in detected_objects[:5]]  # 只显示前5个
-                suggestions = self._generate_suggestions(user_query_lower, detected_names, synonym_map)
+                suggestions = self._generate_suggestions(user_query_lower, detected_names)
 
                 return {
                     'is_match': False,
@@ -275,142 +440,7 @@ class YOLODetectionService:
                 'message': f'内容匹配验证出错，将继续处理: {str(e)}'
             }
 
-    def _get_synonym_map(self):
-        """获取更完善的同义词映射表"""
-        return {
-            # 动物类 - 更详细的映射
-            'cat': ['kitten', 'feline', '猫', '小猫', 'kitty', '猫咪', '喵', '猫猫'],
-            'dog': ['puppy', 'canine', '狗', '小狗', 'doggy', '狗狗', '犬', '汪'],
-            'bird': ['飞鸟', '鸟类', 'avian', '鸟儿', '小鸟'],
-            'horse': ['马', 'equine', 'pony', '马匹', '小马'],
-            'cow': ['cattle', '牛', 'bull', '奶牛', '母牛'],
-            'sheep': ['羊', 'lamb', '绵羊', '小羊'],
-            'elephant': ['大象', '象'],
-            'bear': ['熊', '狗熊', '黑熊', '棕熊'],
-            'zebra': ['斑马'],
-            'giraffe': ['长颈鹿'],
-            'lion': ['狮子', '雄狮', '母狮'],
-            'tiger': ['老虎', '虎'],
-            'monkey': ['猴子', '猴'],
-            'rabbit': ['兔子', '小兔', '兔'],
-
-            # 交通工具
-            'car': ['automobile', 'vehicle', '汽车', '车辆', '轿车', '小车'],
-            'truck': ['lorry', '卡车', '货车', '大车'],
-            'bus': ['coach', '公交车', '巴士', '客车'],
-            'motorcycle': ['motorbike', '摩托车', '机车', '摩托'],
-            'bicycle': ['bike', '自行车', '单车', '脚踏车'],
-            'train': ['火车', 'locomotive', '列车'],
-            'airplane': ['plane', '飞机', 'aircraft', '客机'],
-            'boat': ['ship', '船', '轮船', '小船'],
-
-            # 人物
-            'person': ['people', 'human', '人', '人类', 'man', 'woman', 'individual', '人物'],
-            'child': ['kid', '孩子', '儿童', '小孩'],
-            'baby': ['infant', '婴儿', '宝宝', '小宝宝'],
-
-            # 物品
-            'phone': ['mobile', 'cellphone', '手机', '电话', 'smartphone', '移动电话'],
-            'laptop': ['computer', '笔记本', '电脑', 'notebook', '笔记本电脑'],
-            'book': ['书', '书籍', '图书'],
-            'bottle': ['瓶子', 'container', '水瓶'],
-            'cup': ['mug', '杯子', '茶杯', '水杯'],
-            'clock': ['时钟', '钟表', 'watch', '手表'],
-            'tv': ['television', '电视', 'monitor', '电视机'],
-            'remote': ['遥控器', 'controller', '遥控'],
-
-            # 食物
-            'apple': ['苹果'],
-            'banana': ['香蕉'],
-            'orange': ['橙子', '橘子', '桔子'],
-            'pizza': ['比萨', '披萨'],
-            'cake': ['蛋糕'],
-            'sandwich': ['三明治'],
-            'donut': ['甜甜圈', '油炸圈饼'],
-
-            # 家具
-            'chair': ['椅子', '座椅'],
-            'couch': ['sofa', '沙发'],
-            'bed': ['床', '床铺'],
-            'dining table': ['table', '桌子', '餐桌', '饭桌'],
-            'toilet': ['厕所', '马桶', '卫生间'],
-
-            # 运动用品
-            'sports ball': ['ball', '球', '运动球'],
-            'tennis racket': ['tennis', '网球拍', '球拍'],
-            'baseball bat': ['棒球棒', '球棒'],
-            'baseball glove': ['棒球手套', '手套'],
-            'skateboard': ['滑板'],
-            'surfboard': ['冲浪板'],
-            'ski': ['滑雪板'],
-
-            # 厨房用品
-            'knife': ['刀', '小刀', '菜刀'],
-            'spoon': ['勺子', '汤匙', '勺'],
-            'fork': ['叉子', '餐叉'],
-            'bowl': ['碗', '饭碗'],
-            'wine glass': ['酒杯', '红酒杯', '玻璃杯'],
-            'refrigerator': ['冰箱', 'fridge'],
-            'microwave': ['微波炉'],
-            'oven': ['烤箱'],
-            'toaster': ['烤面包机'],
-
-            # 电子设备
-            'keyboard': ['键盘'],
-            'mouse': ['鼠标'],
-            'cell phone': ['phone', '手机', 'mobile', '移动电话'],
-
-            # 植物和自然
-            'flower': ['花', '花朵', '鲜花'],
-            'tree': ['树', '树木', '大树'],
-            'grass': ['草', '草地', '草坪'],
-
-            # 建筑和结构
-            'building': ['建筑', '房子', '楼房', '大楼'],
-            'house': ['房子', '住宅', '房屋'],
-            'bridge': ['桥', '大桥', '桥梁'],
-        }
-
-    def _expand_query_words(self, query, synonym_map):
-        """扩展查询词汇，包括同义词"""
-        words = [query] + query.split()
-        expanded_words = set(words)
-
-        for word in words:
-            for key, synonyms in synonym_map.items():
-                if word in synonyms or word == key:
-                    expanded_words.add(key)
-                    expanded_words.update(synonyms)
-
-        return list(expanded_words)
-
-    def _is_strict_match(self, query_words, class_name, synonym_map):
-        """检查是否为严格匹配（包括同义词）"""
-        # 1. 直接精确匹配
-        for query_word in query_words:
-            if query_word == class_name:
-                return True
-
-        # 2. 同义词精确匹配
-        for query_word in query_words:
-            # 检查查询词是否是检测类别的同义词
-            for key, synonyms in synonym_map.items():
-                if key == class_name and query_word in synonyms:
-                    return True
-                if query_word == key and class_name in synonyms:
-                    return True
-
-        # 3. 严格的部分匹配（仅限于特定情况）
-        for query_word in query_words:
-            if len(query_word) > 4:  # 只对较长的词进行部分匹配
-                # 检查是否为复合词的一部分
-                if (query_word in class_name and len(query_word) / len(class_name) > 0.6) or \
-                   (class_name in query_word and len(class_name) / len(query_word) > 0.6):
-                    return True
-
-        return False
-
-    def _generate_suggestions(self, user_query, detected_names, synonym_map):
+    def _generate_suggestions(self, user_query, detected_names):
         """生成建议"""
         suggestions = []
 
@@ -420,10 +450,9 @@ class YOLODetectionService:
             suggestions.append(f"您可以尝试搜索: {', '.join(detected_names[:3])}")
 
         # 基于同义词生成建议
-        for key, synonyms in synonym_map.items():
-            if user_query in synonyms:
-                suggestions.append(f"您搜索的是'{user_query}'，请尝试使用'{key}'")
-                break
+        classes = canonical_classes(user_query)
+        if classes and user_query not in classes:
+            suggestions.append(f"您搜索的是'{user_query}'，请尝试使用'{sorted(classes)[0]}'")
 
         return '; '.join(suggestions) if suggestions else "请检查图像内容或修改查询词汇"
 
@@ -437,7 +466,7 @@ class YOLODetectionService:
 
     def get_available_models(self):
         """获取可用的YOLO模型列表"""
-        return {
+        models = {
             'yolo11n': {
                 'name': 'YOLOv11 Nano',
                 'description': '最快速度，较小精度',
@@ -465,6 +494,12 @@ class YOLODetectionService:
             }
         }
 
+        # 附加各推理后端/精度变体的缓存状态、大小和预期速度
+        for model_name, info in models.items():
+            info['variants'] = model_registry.describe_variants(model_name)
+        return models
+
+
     def compare_with_opencv(self, image_path, opencv_result, yolo_model='yolo11n', confidence=0.5):
         """与OpenCV检测结果进行对比"""
         try:
@@ -0,0 +1,622 @@
+"""
+YOLO 模型注册表
+进程级共享的YOLO模型缓存，每个模型权重只加载一次，
+由检测服务、分割服务和OpenCV内容验证共同使用
+"""
+import gc
+import os
+import queue
+import shutil
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+from contextlib import contextmanager
+from flask import current_app, has_app_context
+from .yolo_backends import SUPPORTED_BACKENDS, SUPPORTED_PRECISIONS, TorchYOLOBackend, ONNXYOLOBackend, export_onnx
+from .inference_workers import RemoteModelHandle
+from .thread_budget import thread_budget
+from .yolo_batching import MicroBatchScheduler
+from .yolo_quantization import EXPECTED_SPEEDUP, quantize_onnx_model
+from .yolo_resolution import downscale_long_side
+
+# 影响推理结果的配置项，与解析后的后端和精度一起作为结果缓存键的一部分
+RESULT_SETTINGS = ('YOLO_IMGSZ', 'YOLO_LATENCY_BUDGET_MS', 'YOLO_TILE_SIZE', 'YOLO_TILE_OVERLAP')
+
+
+class ModelEntry:
+    """已加载模型的副本池，每个副本同一时间只允许一个推理调用"""
+
+    def __init__(self, name, loader, max_replicas=1, backend='torch', precision='fp32', estimated_bytes=0):
+        self.name = name
+        self.backend = backend
+        self.precision = precision
+        self._loader = loader
+        self.max_replicas = max(1, int(max_replicas))
+        self._pool = queue.Queue()
+        self._lock = threading.Lock()
+        self.replicas = []
+        self.scheduler = None
+        self.load_ms = None
+        self.warmup_ms = None
+        # 无法统计实际内存时按权重文件大小估算
+        self.estimated_bytes = estimated_bytes
+        # 正在进行（含排队等待）的推理调用数，大于0时不允许逐出
+        self.active = 0
+        # 调用方持有的句柄数，句柄存在期间同样不允许逐出，避免调用方推理时重新加载出第二份权重
+        self.handles = 0
+        # 正在加载中的额外副本数，加载在锁外进行
+        self._loading = 0
+
+        # 首个副本立即加载，额外副本在并发需要时按需加载
+        started_at = time.perf_counter()
+        self._add_replica()
+        self.load_ms = round((time.perf_counter() - started_at) * 1000, 1)
+
+    def _add_replica(self):
+        """加载一个新的模型副本并放入池中"""
+        replica = self._loader(self.name)
+        self.replicas.append(replica)
+        self._pool.put(replica)
+        return replica
+
+    @property
+    def names(self):
+        """模型类别名称映射"""
+        return self.replicas[0].names
+
+    def memory_bytes(self):
+        """所有已加载副本的权重内存占用"""
+        sizes = [replica.memory_bytes() for replica in list(self.replicas)]
+        if any(size is None for size in sizes):
+            return None
+        return sum(sizes)
+
+    def footprint_bytes(self):
+        """用于内存预算的占用估计"""
+        memory = self.memory_bytes()
+        if memory is None:
+            return self.estimated_bytes * len(self.replicas)
+        return memory
+
+    @contextmanager
+    def in_use(self):
+        """标记模型正在使用，期间不会被逐出"""
+        with self._lock:
+            self.active += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def pin(self):
+        """句柄创建时调用，标记模型被持有"""
+        with self._lock:
+            self.handles += 1
+
+    def unpin(self):
+        """句柄释放时调用"""
+        with self._lock:
+            self.handles -= 1
+
+    @property
+    def evictable(self):
+        """没有进行中的推理且没有调用方持有句柄时才可以逐出"""
+        return not self.active and not self.handles
+
+    def close(self):
+        """从注册表逐出时停止微批调度线程"""
+        scheduler, self.scheduler = self.scheduler, None
+        if scheduler is not None:
+            scheduler.close()
+
+    def warm_up(self, imgsz=640):
+        """用空白图像执行一次前向推理，触发内核初始化和内存分配"""
+        dummy = np.zeros((imgsz, imgsz, 3), dtype=np.uint8)
+        started_at = time.perf_counter()
+        with self.in_use(), self.acquire() as model:
+            model(dummy, conf=0.25)
+        self.warmup_ms = round((time.perf_counter() - started_at) * 1000, 1)
+        return self.warmup_ms
+
+    @contextmanager
+    def acquire(self):
+        """借用一个空闲副本，使用完毕后归还"""
+        try:
+            replica = self._pool.get_nowait()
+        except queue.Empty:
+            replica = None
+            # 在锁内预留副本名额，在锁外加载，冷加载期间其他调用方仍可借用已有副本
+            with self._lock:
+                reserved = len(self.replicas) + self._loading < self.max_replicas
+                if reserved:
+                    self._loading += 1
+            if reserved:
+                try:
+                    replica = self._loader(self.name)
+                finally:
+                    with self._lock:
+                        self._loading -= 1
+                        if replica is not None:
+                            self.replicas.append(replica)
+            else:
+                replica = self._pool.get()
+        try:
+            yield replica
+        finally:
+            self._pool.put(replica)
+
+
+class ModelHandle:
+    """调用方持有的模型句柄，推理时从副本池借用模型实例，互不干扰；
+    句柄存在期间模型不会被逐出，可通过close()或with语句提前释放"""
+
+    def __init__(self, entry):
+        self._entry = entry
+        self.name = entry.name
+        self.backend = entry.backend
+        self.precision = entry.precision
+        self.max_replicas = entry.max_replicas
+        entry.pin()
+        self._closed = False
+
+    def close(self):
+        """释放句柄，之后模型可以被逐出"""
+        if not self._closed:
+            self._closed = True
+            self._entry.unpin()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __del__(self):
+        # 构造失败时_closed尚未设置
+        if getattr(self, '_closed', True) is False:
+            self.close()
+
+    @property
+    def names(self):
+        """模型类别名称映射"""
+        return self._entry.names
+
+    def predict(self, image, **kwargs):
+        """执行推理；大图先缩小到推理尺寸，结果再映射回原图坐标"""
+        imgsz = kwargs.get('imgsz')
+        images = image if isinstance(image, (list, tuple)) else [image]
+        large = [bool(imgsz) and max(img.shape[:2]) > imgsz for img in images]
+        if not any(large):
+            return self._predict(image, **kwargs)
+
+        # 区域插值缩小比模型内部的线性缩放更快且不产生混叠
+        resized = [downscale_long_side(img, imgsz) if is_large else img for img, is_large in zip(images, large)]
+        results = self._predict(resized if isinstance(image, (list, tuple)) else resized[0], **kwargs)
+        return [result.rescale(img.shape) if is_large else result
+                for result, img, is_large in zip(results, images, large)]
+
+    def _predict(self, image, **kwargs):
+        """在独占的模型副本上执行推理，启用微批时单图请求交给调度器合并"""
+        with self._entry.in_use():
+            scheduler = self._entry.scheduler
+            if scheduler is not None and not isinstance(image, (list, tuple)):
+                return scheduler.submit(image, **kwargs)
+            with self._entry.acquire() as model:
+                thread_budget.apply()
+                return model(image, **kwargs)
+
+    __call__ = predict
+
+    def warm_up(self, imgsz=640):
+        """预热模型，返回预热耗时（毫秒）"""
+        return self._entry.warm_up(imgsz)
+
+
+class YOLOModelRegistry:
+    """进程级YOLO模型注册表"""
+
+    def __init__(self):
+        # 按最近使用顺序排列，最久未使用的在前
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._artifact_lock = threading.Lock()
+        self.models_folder = None
+        self.max_replicas = 1
+        self.batching_enabled = False
+        self.batch_window_ms = 10
+        self.batch_max_size = 8
+        self.default_backend = 'torch'
+        self.default_precision = 'fp32'
+        self.calibration_folder = None
+        self.calibration_size = 32
+        # ONNX Runtime单个会话的线程数，0为自动
+        self.intra_op_threads = 0
+        # 启用多进程推理时由工作池执行推理，当前进程不加载模型
+        self.worker_pool = None
+
+        # 内存预算和缓存统计，预算为0表示不限制
+        self.memory_budget_mb = 0
+        self._pinned = set()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_evictions = 0
+        self.over_budget_loads = 0
+
+        # 启动预加载状态: idle / loading / ready / degraded（非必需模型失败）/ failed（必需模型失败）
+        self.preload_state = 'idle'
+        self.preload_targets = []
+        # 必须预热成功才算就绪的模型，其余模型预加载失败只记录，请求时仍可按需加载
+        self.preload_required = []
+        # 各预加载模型的状态: pending / loading / ready / failed
+        self.preload_models = {}
+        self.preload_errors = {}
+        # 失败的预加载在就绪检查时按该间隔（秒）于后台重试
+        self.preload_retry_seconds = 30
+        self._preload_lock = threading.Lock()
+        self._preload_running = False
+        self._preload_started_at = 0.0
+
+    def init_app(self, app):
+        """从应用配置初始化模型目录、副本数和微批参数"""
+        self.models_folder = app.config.get('MODELS_FOLDER')
+        self.max_replicas = app.config.get('YOLO_MODEL_REPLICAS', 1)
+        self.batching_enabled = app.config.get('YOLO_BATCHING_ENABLED', False)
+        self.batch_window_ms = app.config.get('YOLO_BATCH_WINDOW_MS', 10)
+        self.batch_max_size = app.config.get('YOLO_BATCH_MAX_SIZE', 8)
+        self.default_backend = app.config.get('YOLO_BACKEND', 'torch')
+        self.default_precision = app.config.get('YOLO_PRECISION', 'fp32')
+        self.calibration_folder = app.config.get('YOLO_CALIBRATION_FOLDER')
+        self.calibration_size = app.config.get('YOLO_CALIBRATION_SIZE', 32)
+        self.memory_budget_mb = app.config.get('YOLO_MODEL_MEMORY_BUDGET_MB', 0)
+        self.preload_retry_seconds = app.config.get('YOLO_PRELOAD_RETRY_SECONDS', 30)
+
+    def _get_models_folder(self):
+        """获取模型目录，优先使用当前应用配置"""
+        if has_app_context():
+            return current_app.config.get('MODELS_FOLDER') or self.models_folder
+        return self.models_folder
+
+    def get_model_path(self, model_name):
+        """获取模型权重文件路径"""
+        models_folder = self._get_models_folder()
+        if models_folder:
+            return os.path.join(models_folder, f'{model_name}.pt')
+        # 回退到当前目录
+        return f'{model_name}.pt'
+
+    def get_onnx_path(self, model_name, precision='fp32'):
+        """获取导出的ONNX模型文件路径，INT8模型使用.int8.onnx后缀"""
+        suffix = '.onnx' if precision == 'fp32' else f'.{precision}.onnx'
+        return os.path.splitext(self.get_model_path(model_name))[0] + suffix
+
+    def resolve_variant(self, backend=None, precision=None):
+        """解析推理后端和精度，未指定时使用配置的默认值；INT8仅由ONNX Runtime后端提供"""
+        precision = (precision or self.default_precision or 'fp32').lower()
+        if precision not in SUPPORTED_PRECISIONS:
+            raise ValueError(f"不支持的推理精度: {precision}，可选: {', '.join(SUPPORTED_PRECISIONS)}")
+        backend = 'onnx' if precision == 'int8' else (backend or self.default_backend or 'torch').lower()
+        if backend not in SUPPORTED_BACKENDS:
+            raise ValueError(f"不支持的推理后端: {backend}，可选: {', '.join(SUPPORTED_BACKENDS)}")
+        return backend, precision
+
+    def result_settings(self, backend=None, precision=None):
+        """影响推理结果的有效配置：解析默认值后的后端和精度及RESULT_SETTINGS配置项"""
+        try:
+            backend, precision = self.resolve_variant(backend, precision)
+        except ValueError:
+            # 无效参数在加载模型时报错，这里保留原值
+            pass
+        settings = {key: current_app.config.get(key) for key in RESULT_SETTINGS}
+        settings.update(backend=backend, precision=precision)
+        return settings
+
+    @staticmethod
+    def _entry_key(model_name, backend, precision='fp32'):
+        """注册表键，PyTorch后端沿用模型名，其他后端和精度附加后缀"""
+        if backend == 'torch':
+            return model_name
+        return f'{model_name}@{backend}' if precision == 'fp32' else f'{model_name}@{backend}-{precision}'
+
+    def has_weights(self, model_name):
+        """检查模型是否已驻留内存或本地存在权重文件"""
+        if any(key.split('@')[0] == model_name for key in self._models):
+            return True
+        return os.path.exists(self.get_model_path(model_name)) or os.path.exists(f'{model_name}.pt')
+
+    def is_loaded(self, model_name, backend='torch', precision='fp32'):
+        """检查模型是否已加载"""
+        return self._entry_key(model_name, backend, precision) in self._models
+
+    def loaded_models(self):
+        """获取已加载的模型名称列表"""
+        return list(self._models.keys())
+
+    def get_resident_models(self):
+        """获取常驻内存的模型信息，包括加载耗时、预热耗时和内存占用"""
+        resident = {}
+        for key, entry in list(self._models.items()):
+            memory = entry.memory_bytes()
+            resident[key] = {
+                'backend': entry.backend,
+                'precision': entry.precision,
+                'replicas': len(entry.replicas),
+                'load_ms': entry.load_ms,
+                'warmup_ms': entry.warmup_ms,
+                'memory_mb': round(memory / 1024 / 1024, 1) if memory is not None else None
+            }
+        return resident
+
+    def is_ready(self):
+        """预加载的必需模型是否已全部加载并预热完成；有失败的预加载时在后台按间隔重试"""
+        if self.worker_pool is not None:
+            return self.worker_pool.ready
+        self._retry_failed_preload()
+        return self.preload_state in ('idle', 'ready', 'degraded')
+
+    def failed_preloads(self):
+        """预加载失败的模型列表"""
+        return [spec for spec, status in list(self.preload_models.items()) if status == 'failed']
+
+    def preload(self, specs, background=False, required=None):
+        """加载并预热预加载列表中的模型，格式为 模型名[@后端[-精度]]；required中的模型失败时不就绪"""
+        targets = [spec.strip() for spec in specs if spec and spec.strip()]
+        self.preload_required = [spec.strip() for spec in required or () if spec and spec.strip()]
+        # 必需模型即使未列入预加载列表也需要预加载
+        self.preload_targets = targets + [spec for spec in self.preload_required if spec not in targets]
+        if not self.preload_targets:
+            return
+
+        self.preload_models = {spec: 'pending' for spec in self.preload_targets}
+        self.preload_errors = {}
+        self.preload_state = 'loading'
+        self._start_preload(self.preload_targets, background)
+
+    def _retry_failed_preload(self):
+        """距上次尝试超过重试间隔时，在后台线程重新预加载失败的模型"""
+        if self.preload_state not in ('degraded', 'failed') or self.preload_retry_seconds <= 0:
+            return
+        if time.monotonic() - self._preload_started_at < self.preload_retry_seconds:
+            return
+        failed = self.failed_preloads()
+        if failed:
+            self._start_preload(failed, background=True)
+
+    def _start_preload(self, specs, background):
+        """启动一轮预加载，同一时间只运行一轮"""
+        with self._preload_lock:
+            if self._preload_running:
+                return
+            self._preload_running = True
+            self._preload_started_at = time.monotonic()
+        if background:
+            threading.Thread(target=self._run_preload, args=(specs,), name='yolo-preload', daemon=True).start()
+        else:
+            self._run_preload(specs)
+
+    def _run_preload(self, specs):
+        """依次加载并预热模型，记录每个模型的状态和失败原因"""
+        try:
+            for spec in specs:
+                model_name, _, variant = spec.partition('@')
+                backend, _, precision = variant.partition('-')
+                self.preload_models[spec] = 'loading'
+                try:
+                    print(f"正在预加载模型: {spec}")
+                    handle = self.get_handle(model_name, backend or None, precision or None)
+                    # 预加载的模型常驻内存，不参与LRU逐出
+                    self._pinned.add(handle.name)
+                    warmup_ms = handle.warm_up()
+                    handle.close()
+                    print(f"模型 {spec} 预热完成，耗时 {warmup_ms}ms")
+                    self.preload_models[spec] = 'ready'
+                    self.preload_errors.pop(spec, None)
+                except Exception as e:
+                    print(f"预加载模型 {spec} 失败: {str(e)}")
+                    self.preload_models[spec] = 'failed'
+                    self.preload_errors[spec] = str(e)
+        finally:
+            failed = self.failed_preloads()
+            if any(spec in self.preload_required for spec in failed):
+                self.preload_state = 'failed'
+            else:
+                self.preload_state = 'degraded' if failed else 'ready'
+            with self._preload_lock:
+                self._preload_running = False
+
+    def get_batching_stats(self):
+        """获取各模型微批调度器的统计信息"""
+        return {
+            name: entry.scheduler.get_stats()
+            for name, entry in list(self._models.items())
+            if entry.scheduler is not None
+        }
+
+    def get_handle(self, model_name, backend=None, precision=None):
+        """获取模型句柄，首次使用时加载，之后所有调用方共享同一份权重"""
+        backend, precision = self.resolve_variant(backend, precision)
+        key = self._entry_key(model_name, backend, precision)
+        if self.worker_pool is not None:
+            return RemoteModelHandle(self.worker_pool, key, model_name, backend, precision)
+
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None:
+                self._models.move_to_end(key)
+                self.cache_hits += 1
+                return ModelHandle(entry)
+            # 每个模型使用独立的加载锁，避免并发请求重复加载同一权重
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            # 在注册表锁内创建句柄，查找和持有之间不会被其他线程逐出
+            with self._lock:
+                entry = self._models.get(key)
+                if entry is not None:
+                    self.cache_hits += 1
+                    return ModelHandle(entry)
+
+            with self._lock:
+                self.cache_misses += 1
+            # 加载前按权重文件大小预留空间，加载后按实际占用再检查一次
+            estimated_bytes = self._estimate_model_bytes(model_name, backend, precision)
+            self._evict_for(estimated_bytes)
+
+            loader = lambda _name: self._load_backend(model_name, backend, precision)
+            entry = ModelEntry(key, loader, self.max_replicas, backend, precision, estimated_bytes)
+            if self.batching_enabled:
+                entry.scheduler = MicroBatchScheduler(entry, self.batch_window_ms, self.batch_max_size)
+            # 先创建句柄再加入注册表，其他线程的逐出不会移除刚加载的模型
+            handle = ModelHandle(entry)
+            with self._lock:
+                self._models[key] = entry
+            self._evict_for(0, keep=key)
+            return handle
+
+    def _estimate_model_bytes(self, model_name, backend, precision):
+        """按权重文件大小估算模型加载后的内存占用"""
+        path = self.get_model_path(model_name) if backend == 'torch' else self.get_onnx_path(model_name, precision)
+        if not os.path.exists(path) and backend != 'torch':
+            # ONNX文件尚未生成时按PyTorch权重估算
+            path = self.get_model_path(model_name)
+        return os.path.getsize(path) if os.path.exists(path) else 0
+
+    def _evict_for(self, incoming_bytes, keep=None):
+        """按LRU顺序逐出空闲模型，直到已用内存加上新模型不超过预算"""
+        if not self.memory_budget_mb:
+            return
+        budget_bytes = self.memory_budget_mb * 1024 * 1024
+
+        evicted = []
+        with self._lock:
+            used_bytes = sum(entry.footprint_bytes() for entry in self._models.values())
+            for key, entry in list(self._models.items()):
+                if used_bytes + incoming_bytes <= budget_bytes:
+                    break
+                # 正在使用或被句柄持有、预加载常驻或刚加载的模型不逐出
+                if key == keep or key in self._pinned or not entry.evictable:
+                    continue
+                del self._models[key]
+                used_bytes -= entry.footprint_bytes()
+                evicted.append(entry)
+                self.cache_evictions += 1
+            # 只在加载完成后的检查中统计超预算，此时占用为实际值
+            over_budget = keep is not None and used_bytes > budget_bytes
+            if over_budget:
+                self.over_budget_loads += 1
+
+        for entry in evicted:
+            entry.close()
+            print(f"模型内存超出预算，已逐出: {entry.name}")
+        if evicted:
+            gc.collect()
+        if over_budget:
+            print(f"警告: 模型内存占用 {used_bytes / 1024 / 1024:.1f}MB 超出预算 {self.memory_budget_mb}MB，"
+                  f"其余模型均在使用中")
+
+    def get_cache_stats(self):
+        """获取模型缓存的命中、未命中、逐出统计和内存占用"""
+        with self._lock:
+            used_bytes = sum(entry.footprint_bytes() for entry in self._models.values())
+            lookups = self.cache_hits + self.cache_misses
+            return {
+                'memory_budget_mb': self.memory_budget_mb,
+                'memory_used_mb': round(used_bytes / 1024 / 1024, 1),
+                'resident_models': list(self._models.keys()),
+                'pinned_models': sorted(self._pinned),
+                'hits': self.cache_hits,
+                'misses': self.cache_misses,
+                'hit_rate': round(self.cache_hits / lookups, 4) if lookups else 0,
+                'evictions': self.cache_evictions,
+                'over_budget_loads': self.over_budget_loads
+            }
+
+    def ensure_onnx_artifact(self, model_name, precision='fp32'):
+        """确保ONNX模型文件存在，首次使用时导出并按需量化，之后直接复用缓存文件"""
+        onnx_path = self.get_onnx_path(model_name, precision)
+        if os.path.exists(onnx_path):
+            return onnx_path
+
+        with self._artifact_lock:
+            fp32_path = self.get_onnx_path(model_name)
+            if not os.path.exists(fp32_path):
+                print(f"正在将 {model_name} 导出为ONNX模型...")
+                export_onnx(self._load_model(model_name), fp32_path)
+                print(f"ONNX模型已导出到: {fp32_path}")
+
+            if precision == 'int8' and not os.path.exists(onnx_path):
+                # 先写入临时文件，避免中断后留下不完整的量化模型
+                tmp_path = onnx_path + '.tmp'
+                mode = quantize_onnx_model(fp32_path, tmp_path, self.calibration_folder, self.calibration_size)
+                os.replace(tmp_path, onnx_path)
+                print(f"INT8模型已生成（{mode}量化）: {onnx_path}")
+        return onnx_path
+
+    def describe_variants(self, model_name):
+        """列出模型的各推理变体，包括缓存状态、文件大小和预期相对速度"""
+        variants = []
+        pt_path = self.get_model_path(model_name)
+        pt_size = os.path.getsize(pt_path) if os.path.exists(pt_path) else None
+        for backend, precision in EXPECTED_SPEEDUP:
+            path = pt_path if backend == 'torch' else self.get_onnx_path(model_name, precision)
+            cached = os.path.exists(path)
+            if cached:
+                size_bytes = os.path.getsize(path)
+            elif pt_size is not None:
+                # 未生成时按权重字节数估算：INT8约为FP32的四分之一
+                size_bytes = pt_size // 4 if precision == 'int8' else pt_size
+            else:
+                size_bytes = None
+            variants.append({
+                'backend': backend,
+                'precision': precision,
+                'cached': cached,
+                'loaded': self.is_loaded(model_name, backend, precision),
+                'size': f'{size_bytes / 1024 / 1024:.1f}MB' if size_bytes is not None else None,
+                'size_estimated': not cached,
+                'expected_speedup': EXPECTED_SPEEDUP[(backend, precision)]
+            })
+        return variants
+
+    def _load_backend(self, model_name, backend, precision='fp32'):
+        """按后端和精度加载一个模型副本"""
+        if backend == 'onnx':
+            onnx_path = self.ensure_onnx_artifact(model_name, precision)
+            print(f"正在加载 {model_name} ONNX Runtime {precision.upper()} 模型...")
+            return ONNXYOLOBackend(onnx_path, self.intra_op_threads)
+        return TorchYOLOBackend(self._load_model(model_name))
+
+    def _load_model(self, model_name):
+        """从本地加载模型，不存在时下载到模型目录"""
+        from ultralytics import YOLO
+
+        models_folder = self._get_models_folder()
+        model_path = self.get_model_path(model_name)
+
+        if os.path.exists(model_path):
+            print(f"找到本地模型文件: {model_path}")
+            print(f"正在加载 {model_name} 模型...")
+            model = YOLO(model_path)
+            print(f"{model_name} 模型加载完成")
+            return model
+
+        print(f"本地未找到模型文件: {model_path}")
+        print(f"正在下载并加载 {model_name} 模型...")
+        if models_folder and os.path.exists(models_folder):
+            # 先下载到当前目录，再移动到模型目录
+            model = YOLO(f'{model_name}.pt')
+            downloaded_path = f'{model_name}.pt'
+            if os.path.exists(downloaded_path) and downloaded_path != model_path:
+                shutil.move(downloaded_path, model_path)
+                print(f"模型文件已移动到: {model_path}")
+                model = YOLO(model_path)
+        else:
+            model = YOLO(f'{model_name}.pt')  # 这会自动下载
+        print(f"{model_name} 模型下载并加载完成")
+        return model
+
+
+# 进程级共享实例
+model_registry = YOLOModelRegistry()
@@ -0,0 +1,119 @@
+"""
+YOLO 推理结果
+与推理后端（PyTorch / ONNX Runtime）无关的NumPy结果容器和后处理工具
+"""
+import cv2
+import numpy as np
+
+
+class YOLOPrediction:
+    """单张图像的YOLO推理结果，坐标均为原图像素坐标"""
+
+    def __init__(self, boxes, scores, class_ids, orig_shape, masks=None, mask_extents=None):
+        self.boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        self.scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+        self.class_ids = np.asarray(class_ids, dtype=np.int64).reshape(-1)
+        self.orig_shape = tuple(orig_shape[:2])
+        # 分割掩码 (N, mh, mw)，分辨率低于原图
+        self.masks = masks
+        # 每个掩码覆盖的原图区域 (N, 4) x1, y1, x2, y2，为None时覆盖整张原图
+        self.mask_extents = mask_extents
+
+    def __len__(self):
+        return len(self.scores)
+
+    def filter(self, keep):
+        """按布尔掩码或索引保留部分结果"""
+        return YOLOPrediction(
+            self.boxes[keep],
+            self.scores[keep],
+            self.class_ids[keep],
+            self.orig_shape,
+            self.masks[keep] if self.masks is not None else None,
+            self.mask_extents[keep] if self.mask_extents is not None else None
+        )
+
+    def get_mask_extent(self, index):
+        """获取第index个掩码覆盖的原图区域"""
+        if self.mask_extents is None:
+            return 0, 0, self.orig_shape[1], self.orig_shape[0]
+        return tuple(int(v) for v in self.mask_extents[index])
+
+    def mask_image(self, index, threshold=0.5):
+        """将第index个掩码还原为原图尺寸的二值图像(0/255)"""
+        h0, w0 = self.orig_shape
+        return self.mask_crop(index, (0, 0, w0, h0), threshold)
+
+    def mask_crop(self, index, roi, threshold=0.5):
+        """只在原图区域roi (x1, y1, x2, y2) 内还原第index个掩码，返回该区域大小的二值图像(0/255)"""
+        rx1, ry1, rx2, ry2 = roi
+        crop = np.zeros((ry2 - ry1, rx2 - rx1), dtype=np.uint8)
+        ex1, ey1, ex2, ey2 = self.get_mask_extent(index)
+        ix1, iy1, ix2, iy2 = max(rx1, ex1), max(ry1, ey1), min(rx2, ex2), min(ry2, ey2)
+        if ix2 <= ix1 or iy2 <= iy1:
+            return crop
+
+        # 按cv2.resize的像素中心对齐方式直接从低分辨率掩码采样，只计算区域内的像素
+        mask = self.masks[index]
+        sx, sy = mask.shape[1] / (ex2 - ex1), mask.shape[0] / (ey2 - ey1)
+        matrix = np.array([[sx, 0, (ix1 - ex1 + 0.5) * sx - 0.5],
+                           [0, sy, (iy1 - ey1 + 0.5) * sy - 0.5]], dtype=np.float64)
+        region = cv2.warpAffine(mask, matrix, (ix2 - ix1, iy2 - iy1),
+                                flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP,
+                                borderMode=cv2.BORDER_REPLICATE)
+        crop[iy1 - ry1:iy2 - ry1, ix1 - rx1:ix2 - rx1] = (region > threshold).astype(np.uint8) * 255
+        return crop
+
+    def rescale(self, orig_shape):
+        """将在缩小图像上得到的结果映射回原图坐标，掩码本身覆盖整图无需变换"""
+        h, w = self.orig_shape
+        h0, w0 = orig_shape[:2]
+        boxes = self.boxes * np.array([w0 / w, h0 / h, w0 / w, h0 / h], dtype=np.float32)
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, w0)
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, h0)
+        extents = None
+        if self.mask_extents is not None:
+            extents = np.round(self.mask_extents * np.array([w0 / w, h0 / h, w0 / w, h0 / h])).astype(np.int64)
+        return YOLOPrediction(boxes, self.scores, self.class_ids, (h0, w0), self.masks, extents)
+
+    @classmethod
+    def from_ultralytics(cls, result):
+        """从ultralytics的Results对象转换"""
+        if result.boxes is None:
+            return cls(np.zeros((0, 4)), [], [], result.orig_shape)
+
+        data = result.boxes.data.cpu().numpy()
+        masks = None
+        if result.masks is not None:
+            masks = result.masks.data.cpu().numpy()
+            # ultralytics的掩码位于letterbox输入尺寸上，去除填充区域使其与原图对齐
+            h0, w0 = result.orig_shape[:2]
+            mh, mw = masks.shape[1:]
+            gain = min(mh / h0, mw / w0)
+            pad_w, pad_h = (mw - w0 * gain) / 2, (mh - h0 * gain) / 2
+            top, left = int(round(pad_h - 0.1)), int(round(pad_w - 0.1))
+            bottom, right = mh - int(round(pad_h + 0.1)), mw - int(round(pad_w + 0.1))
+            masks = masks[:, top:bottom, left:right]
+
+        return cls(data[:, :4], data[:, 4], data[:, 5], result.orig_shape, masks)
+
+
+def batched_nms(boxes, scores, class_ids, iou_threshold=0.7):
+    """按类别的非极大值抑制（cv2.dnn.NMSBoxesBatched），返回保留的索引（按分数降序）"""
+    if len(boxes) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    boxes = np.asarray(boxes, dtype=np.float64)
+    # x1, y1, x2, y2 -> x, y, w, h
+    xywh = np.concatenate([boxes[:, :2], boxes[:, 2:] - boxes[:, :2]], axis=1)
+    # 分数阈值已在调用前应用，这里保留全部候选
+    keep = cv2.dnn.NMSBoxesBatched(xywh, np.asarray(scores, dtype=np.float32),
+                                   np.asarray(class_ids, dtype=np.int32), -1.0, float(iou_threshold))
+    return np.asarray(keep, dtype=np.int64).reshape(-1)
+
+
+def keep_classes(results, classes):
+    """只保留指定类别ID的结果，classes为空时原样返回"""
+    if not classes:
+        return results
+    return [result.filter(np.isin(result.class_ids, list(classes))) for result in results]
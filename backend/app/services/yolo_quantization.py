@@ -0,0 +1,87 @@
+"""
+YOLO INT8 量化
+基于ONNX Runtime量化工具生成INT8模型，有校准图像时使用静态量化，否则使用动态量化
+"""
+import os
+import cv2
+import numpy as np
+
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+# CPU上相对PyTorch FP32推理的经验加速比，用于模型列表中的预期速度说明
+EXPECTED_SPEEDUP = {
+    ('torch', 'fp32'): 1.0,
+    ('onnx', 'fp32'): 1.3,
+    ('onnx', 'int8'): 2.5
+}
+
+
+def list_calibration_images(calibration_folder, max_images=32):
+    """列出校准目录中的图像文件"""
+    if not calibration_folder or not os.path.isdir(calibration_folder):
+        return []
+    images = sorted(
+        os.path.join(calibration_folder, name)
+        for name in os.listdir(calibration_folder)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    return images[:max_images]
+
+
+def _letterbox_tensor(image, imgsz):
+    """将校准图像处理为与推理一致的NCHW输入"""
+    h0, w0 = image.shape[:2]
+    ratio = min(imgsz / h0, imgsz / w0)
+    new_w, new_h = int(round(w0 * ratio)), int(round(h0 * ratio))
+    image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, left = (imgsz - new_h) // 2, (imgsz - new_w) // 2
+    padded = cv2.copyMakeBorder(image, top, imgsz - new_h - top, left, imgsz - new_w - left,
+                                cv2.BORDER_CONSTANT, value=(114, 114, 114))
+    return (padded[:, :, ::-1].transpose(2, 0, 1)[None] / 255.0).astype(np.float32)
+
+
+def _create_calibration_reader(onnx_path, image_paths, imgsz):
+    """创建静态量化使用的校准数据读取器"""
+    import onnxruntime as ort
+    from onnxruntime.quantization import CalibrationDataReader
+
+    input_name = ort.InferenceSession(onnx_path, providers=['CPUExecutionProvider']).get_inputs()[0].name
+
+    class YOLOCalibrationReader(CalibrationDataReader):
+        """逐张读取校准图像"""
+
+        def __init__(self):
+            self._paths = iter(image_paths)
+
+        def get_next(self):
+            for path in self._paths:
+                image = cv2.imread(path)
+                if image is not None:
+                    return {input_name: _letterbox_tensor(image, imgsz)}
+            return None
+
+    return YOLOCalibrationReader()
+
+
+def quantize_onnx_model(onnx_path, output_path, calibration_folder=None, max_images=32, imgsz=640):
+    """将FP32 ONNX模型量化为INT8，返回使用的量化方式"""
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_dynamic, quantize_static
+
+    image_paths = list_calibration_images(calibration_folder, max_images)
+    if image_paths:
+        print(f"使用 {len(image_paths)} 张校准图像进行静态INT8量化: {onnx_path}")
+        quantize_static(
+            onnx_path,
+            output_path,
+            _create_calibration_reader(onnx_path, image_paths, imgsz),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=True
+        )
+        return 'static'
+
+    print(f"未找到校准图像，使用动态INT8量化: {onnx_path}")
+    quantize_dynamic(onnx_path, output_path, weight_type=QuantType.QUInt8)
+    return 'dynamic'
@@ -0,0 +1,79 @@
+"""
+YOLO 推理分辨率策略
+根据输入图像像素数、模型规模、推理后端和延迟预算选择推理尺寸
+"""
+import re
+import cv2
+from .yolo_quantization import EXPECTED_SPEEDUP
+
+
+# 候选推理尺寸，均为模型步长32的整数倍
+CANDIDATE_SIZES = (320, 416, 512, 640, 768, 960, 1280)
+MIN_IMGSZ = 160
+MAX_IMGSZ = 1920
+# 模型训练和默认推理使用的尺寸，未指定推理尺寸时使用
+DEFAULT_IMGSZ = 640
+
+# CPU上PyTorch FP32在640输入下的单图经验延迟（毫秒），按模型规模区分
+BASE_LATENCY_MS = {'n': 60, 's': 140, 'm': 330, 'l': 420, 'x': 850}
+# 分割模型额外的原型掩码分支开销
+SEGMENTATION_FACTOR = 1.3
+
+
+def estimate_latency_ms(model_name, imgsz, backend='torch', precision='fp32'):
+    """估算指定模型在给定推理尺寸下的单图延迟"""
+    match = re.match(r'yolo\d+([nslmx])', model_name)
+    base = BASE_LATENCY_MS.get(match.group(1) if match else 'n', BASE_LATENCY_MS['n'])
+    if model_name.endswith('-seg'):
+        base *= SEGMENTATION_FACTOR
+    speedup = EXPECTED_SPEEDUP.get((backend, precision), 1.0)
+    # 计算量与输入像素数近似成正比
+    return base * (imgsz / 640) ** 2 / speedup
+
+
+def choose_imgsz(image_shape, model_name, latency_budget_ms, backend='torch', precision='fp32'):
+    """在延迟预算内选择最大的推理尺寸，且不超过图像本身的长边；尺寸不低于模型默认尺寸（图像更小时除外），
+    默认尺寸也无法满足预算时仍使用默认尺寸，不为满足预算牺牲精度"""
+    long_side = max(image_shape[:2])
+    upper_bound = max(CANDIDATE_SIZES[0], -(-long_side // 32) * 32)
+    lower_bound = min(DEFAULT_IMGSZ, upper_bound)
+
+    chosen = None
+    for size in CANDIDATE_SIZES:
+        if size > upper_bound:
+            break
+        if size >= lower_bound and estimate_latency_ms(model_name, size, backend, precision) <= latency_budget_ms:
+            chosen = size
+    if chosen is None:
+        print(f"{model_name} 在推理尺寸 {lower_bound} 下无法满足 {latency_budget_ms}ms 延迟预算，使用该尺寸")
+        return lower_bound
+    return chosen
+
+
+def resolve_imgsz(value, image_shape, model_name, latency_budget_ms, backend='torch', precision='fp32'):
+    """解析imgsz参数：'auto'按策略选择，数值按步长32取整并限制范围，未指定时为模型默认尺寸"""
+    if value is None or str(value).strip() == '':
+        return DEFAULT_IMGSZ
+    if str(value).strip().lower() == 'auto':
+        return choose_imgsz(image_shape, model_name, latency_budget_ms, backend, precision)
+    imgsz = int(value)
+    imgsz = -(-imgsz // 32) * 32
+    return min(MAX_IMGSZ, max(MIN_IMGSZ, imgsz))
+
+
+def is_valid_imgsz(value):
+    """检查imgsz参数是否为'auto'或正整数"""
+    if value is None or str(value).strip().lower() == 'auto':
+        return True
+    try:
+        return int(value) > 0
+    except (TypeError, ValueError):
+        return False
+
+
+def downscale_long_side(image, size):
+    """使用区域插值将图像长边缩小到指定尺寸"""
+    h, w = image.shape[:2]
+    scale = size / max(h, w)
+    new_size = (max(1, int(round(w * scale))), max(1, int(round(h * scale))))
+    return cv2.resize(image, new_size, interpolation=cv2.INTER_AREA)
@@ -5,78 +5,75 @@ YOLO 图像分割服务
 import os
 import cv2
 import numpy as np
-from ultralytics import YOLO
 from PIL import Image, ImageDraw, ImageFont
 import time
 import base64
 import tempfile
 from flask import current_app
 from ..utils.helpers import allowed_file, save_uploaded_file
+from .yolo_model_registry import model_registry
+from .class_synonyms import query_class_names, resolve_class_ids
+from .segmentation_output import SegmentationEncoder
+from .result_cache import result_cache
+from .thread_budget import limit_concurrency
+from .yolo_batch_jobs import iter_batch_predictions
+from .yolo_resolution import DEFAULT_IMGSZ, resolve_imgsz
+from .yolo_tiling import predict_tiled
+from .yolo_prediction import keep_classes
 
 
 class YOLOSegmentationService:
     """YOLO图像分割服务"""
 
-    def __init__(self):
-        self.models = {
-            'yolo11n-seg': None,  # YOLOv11 nano segmentation
-            'yolo11s-seg': None,  # YOLOv11 small segmentation
-            'yolo11m-seg': None,  # YOLOv11 medium segmentation
-            'yolo11l-seg': None,  # YOLOv11 large segmentation
-            'yolo11x-seg': None,  # YOLOv11 extra large segmentation
-        }
-        self.current_model = None
-        self.current_model_name = None
+    # 内容匹配验证使用的较低置信度阈值
+    VALIDATION_CONFIDENCE = 0.3
 
-    def load_model(self, model_name='yolo11n-seg'):
-        """加载YOLO分割模型"""
+    def __init__(self):
+        self.models = [
+            'yolo11n-seg',  # YOLOv11 nano segmentation
+            'yolo11s-seg',  # YOLOv11 small segmentation
+            'yolo11m-seg',  # YOLOv11 medium segmentation
+            'yolo11l-seg',  # YOLOv11 large segmentation
+            'yolo11x-seg',  # YOLOv11 extra large segmentation
+        ]
+
+    def load_model(self, model_name='yolo11n-seg', backend=None, precision=None):
+        """加载YOLO分割模型，返回调用方独占使用的模型句柄"""
         try:
             if model_name not in self.models:
                 model_name = 'yolo11n-seg'  # 默认使用nano版本
 
-            if self.models[model_name] is None:
-                # 使用配置中定义的模型目录
-                models_folder = current_app.config.get('MODELS_FOLDER')
-                if models_folder:
-                    model_path = os.path.join(models_folder, f'{model_name}.pt')
-                else:
-                    # 回退到当前目录
-                    model_path = f'{model_name}.pt'
-
-                if os.path.exists(model_path):
-                    print(f"找到本地分割模型文件: {model_path}")
-                    print(f"正在加载 {model_name} 分割模型...")
-                    self.models[model_name] = YOLO(model_path)
-                    print(f"{model_name} 分割模型加载完成")
-                else:
-                    print(f"本地未找到分割模型文件: {model_path}")
-                    print(f"正在下载并加载 {model_name} 分割模型...")
-                    # 如果本地没有，先尝试下载到模型目录
-                    if models_folder and os.path.exists(models_folder):
-                        # 下载到指定的模型目录
-                        self.models[model_name] = YOLO(f'{model_name}.pt')  # 先下载
-                        # 然后移动到正确位置（如果需要）
-                        downloaded_path = f'{model_name}.pt'
-                        if os.path.exists(downloaded_path) and downloaded_path != model_path:
-                            import shutil
-                            shutil.move(downloaded_path, model_path)
-                            print(f"分割模型文件已移动到: {model_path}")
-                        self.models[model_name] = YOLO(model_path)
-                    else:
-                        self.models[model_name] = YOLO(f'{model_name}.pt')  # 这会自动下载
-                    print(f"{model_name} 分割模型下载并加载完成")
-
-            self.current_model = self.models[model_name]
-            self.current_model_name = model_name
-            return True
+            return model_registry.get_handle(model_name, backend, precision)
 
         except Exception as e:
             print(f"加载YOLO分割模型失败: {str(e)}")
-            return False
-
-    def segment_image_yolo(self, file=None, image_data=None, model_name='yolo11n-seg', confidence=0.5, user_query=None):
-        """使用YOLO进行图像分割"""
+            return None
+
+    def segment_image_yolo(self, file=None, image_data=None, model_name='yolo11n-seg', confidence=0.5, user_query=None, single_pass=None, backend=None, precision=None, imgsz=None, tiled=False, output_format='png'):
+        """使用YOLO进行图像分割，相同图像、参数和有效配置的成功结果直接从缓存返回，无需保存和解码图像"""
+        if single_pass is None:
+            single_pass = current_app.config.get('YOLO_SINGLE_PASS_VALIDATION', True)
+        cache_key = result_cache.make_key(
+            'yolo_segmentation', file=file, image_data=image_data, model_name=model_name, confidence=confidence,
+            user_query=user_query, single_pass=single_pass, imgsz=imgsz, tiled=bool(tiled), output_format=output_format,
+            settings=model_registry.result_settings(backend, precision))
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            return cached, 200
+
+        result, status_code = self._segment_image_yolo(file, image_data, model_name, confidence, user_query, single_pass,
+                                                       backend, precision, imgsz, tiled, output_format)
+        if status_code == 200 and result.get('success'):
+            result_cache.set(cache_key, result)
+        return result, status_code
+
+    @limit_concurrency
+    def _segment_image_yolo(self, file, image_data, model_name, confidence, user_query, single_pass, backend, precision, imgsz, tiled, output_format):
+        """执行YOLO分割，返回 (结果, 状态码)"""
         try:
+            if single_pass is None:
+                single_pass = current_app.config.get('YOLO_SINGLE_PASS_VALIDATION', True)
+
             # 处理文件输入
             if image_data:
                 image_data_clean = image_data.split(',')[1] if ',' in image_data else image_data
@@ -92,11 +89,20 @@ class YOLOSegmentationService:
                 filepath = save_uploaded_file(file, current_app.config['UPLOAD_FOLDER'])
 
             # 加载模型
-            if not self.load_model(model_name):
+            model = self.load_model(model_name, backend, precision)
+            if model is None:
                 return {
                     'success': False,
                     'error': f'无法加载YOLO分割模型: {model_name}'
-                }
+                }, 500
+
+            # 查询无法对应到模型类别时直接返回，不执行推理
+            has_query = bool(user_query and user_query.strip())
+            classes = None
+            if has_query:
+                classes = resolve_class_ids(user_query.strip(), model.names)
+                if not classes:
+                    return self._unsupported_class_response(user_query, model, model_name), 200
 
             # 读取图像
             image = cv2.imread(filepath)
@@ -104,284 +110,230 @@ class YOLOSegmentationService:
                 return {
                     'success': False,
                     'error': '无法读取图像文件'
-                }
+                }, 400
 
-            # 如果提供了用户查询，验证内容匹配性
-            if user_query and user_query.strip():
-                content_match_result = self._validate_content_match(filepath, user_query)
-                if not content_match_result['is_match']:
-                    return {
-                        'success': False,
-                        'error': f'未检测到目标：{user_query}',
-                        'message': f'图像中检测到的对象与您查询的"{user_query}"不匹配。{content_match_result["message"]}',
-                        'suggestion': content_match_result.get('suggestion', '请检查图像内容或修改查询词汇。'),
-                        'detected_objects': content_match_result.get('detected_objects', []),
-                        'alternative_queries': content_match_result.get('alternative_queries', [])
-                    }, 200  # 改为200状态码，让前端正确处理内容不匹配
-
-            # 进行分割
-            # 如果用户指定了查询对象，先进行内容匹配验证
-            if user_query and user_query.strip():
-                content_validation = self._validate_content_match(filepath, user_query.strip())
+            # 推理尺寸：指定数值或按图像大小和延迟预算自动选择
+            inference_imgsz = self._resolve_imgsz(imgsz, image, model_name, model)
+
+            # 单次推理模式：以验证阈值运行一次请求的模型，复用其结果做内容匹配
+            inference_confidence = confidence
+            if has_query and single_pass:
+                inference_confidence = min(confidence, self.VALIDATION_CONFIDENCE)
+
+            # 双次推理模式：先用nano模型验证，匹配后再运行请求的模型
+            content_validation = None
+            if has_query and not single_pass:
+                content_validation = self._validate_content_match(filepath, user_query.strip(), backend, precision, imgsz)
                 if not content_validation['is_match']:
-                    return {
-                        'success': False,
-                        'error': f'未检测到目标：{user_query.strip()}',
-                        'message': content_validation['message'],
-                        'suggestion': content_validation.get('suggestion', '请检查图像内容或修改查询词汇'),
-                        'detected_objects': content_validation.get('detected_objects', []),
-                        'alternative_queries': content_validation.get('alternative_queries', []),
-                        'content_mismatch': True,
-                        'user_query': user_query.strip()
-                    }, 200  # 改为200状态码，让前端正确处理内容不匹配
-
-            results = self.current_model(image, conf=confidence)
-
-            # 处理分割结果
-            segmented_objects = []
-            segment_images = []
-
-            for result in results:
-                if result.masks is not None:
-                    masks = result.masks.data.cpu().numpy()
-                    boxes = result.boxes.xyxy.cpu().numpy()
-                    classes = result.boxes.cls.cpu().numpy()
-                    confidences = result.boxes.conf.cpu().numpy()
-
-                    height, width = image.shape[:2]
-
-                    for i, (mask, box, cls, conf) in enumerate(zip(masks, boxes, classes, confidences)):
-                        # 获取类别名称
-                        class_name = self.current_model.names[int(cls)]
-
-                        # 如果有用户查询，只处理匹配的对象
-                        if user_query and user_query.strip():
-                            if not self._is_target_object(class_name, user_query):
-                                continue
-
-                        # 调整掩码大小到原图尺寸
-                        mask_resized = cv2.resize(mask, (width, height))
-                        mask_binary = (mask_resized > 0.5).astype(np.uint8) * 255
-
-                        # 使用精确轮廓分割
-                        segmented_image = self._create_precise_segment(image, mask_binary, box)
-
-                        # 获取边界框
-                        x1, y1, x2, y2 = box.astype(int)
-
-                        # 裁剪分割区域（保持完整对象）
-                        padding = 10
-                        x1_crop = max(0, x1 - padding)
-                        y1_crop = max(0, y1 - padding)
-                        x2_crop = min(width, x2 + padding)
-                        y2_crop = min(height, y2 + padding)
-
-                        cropped_segment = segmented_image[y1_crop:y2_crop, x1_crop:x2_crop]
+                    return self._content_mismatch_response(user_query, content_validation), 200
+
+            # 进行分割：有查询时只推理查询对应的类别，掩码也只为这些类别生成
+            results = self._predict(model, image, inference_confidence, inference_imgsz, tiled, classes)
+            return self._build_segmentation_response(filepath, image, results, model, model_name, confidence, user_query,
+                                                     inference_imgsz, tiled, output_format, content_validation, classes)
+
+        except Exception as e:
+            error_msg = f'YOLO 分割失败: {str(e)}'
+            print(f"YOLO 分割错误: {e}")
+            return {'success': False, 'error': error_msg}, 500
+
+    @limit_concurrency
+    def segment_images_batch(self, image_paths, model_name='yolo11n-seg', confidence=0.5, user_query=None, backend=None, precision=None, imgsz=None, tiled=False, output_format='png', batch_size=8):
+        """批量分割多张图像，模型只加载一次，按批推理并逐张产出 (图像路径, 分割结果, 状态码)"""
+        model = self.load_model(model_name, backend, precision)
+        if model is None:
+            for image_path in image_paths:
+                yield image_path, {'success': False, 'error': f'无法加载YOLO分割模型: {model_name}'}, 500
+            return
+
+        has_query = bool(user_query and user_query.strip())
+        classes = None
+        if has_query:
+            classes = resolve_class_ids(user_query.strip(), model.names)
+            if not classes:
+                response = self._unsupported_class_response(user_query, model, model_name)
+                for image_path in image_paths:
+                    yield image_path, response, 200
+                return
+
+        # 批量模式固定使用单次推理验证，避免每张图像额外运行验证模型
+        inference_confidence = min(confidence, self.VALIDATION_CONFIDENCE) if has_query else confidence
+        for image_path, image, results, inference_imgsz in iter_batch_predictions(
+                self, model, model_name, image_paths, inference_confidence, imgsz, tiled, batch_size, classes):
+            try:
+                if image is None:
+                    yield image_path, {'success': False, 'error': '无法读取图像文件'}, 400
+                    continue
+                result, status_code = self._build_segmentation_response(
+                    image_path, image, results, model, model_name, confidence, user_query,
+                    inference_imgsz, tiled, output_format, classes=classes)
+                yield image_path, result, status_code
+            except Exception as e:
+                print(f"YOLO 批量分割错误: {e}")
+                yield image_path, {'success': False, 'error': f'YOLO 分割失败: {str(e)}'}, 500
+
+    def _unsupported_class_response(self, user_query, model, model_name):
+        """用户查询无法对应到模型任何类别时的响应"""
+        return {
+            'success': False,
+            'error': f'不支持的分割类别：{user_query.strip()}',
+            'message': f'查询"{user_query.strip()}"无法对应到 YOLO {model_name} 可识别的任何类别，未执行分割',
+            'suggestion': '请使用模型支持的类别名称（中英文均可）进行查询',
+            'supported_classes': list(model.names.values()),
+            'unsupported_class': True,
+            'user_query': user_query.strip(),
+            'method': f'YOLO {model_name}'
+        }  # 调用方使用200状态码，让前端正确处理
+
+    def _content_mismatch_response(self, user_query, content_validation):
+        """用户查询与图像内容不匹配时的响应"""
+        return {
+            'success': False,
+            'error': f'未检测到目标：{user_query.strip()}',
+            'message': f'图像中检测到的对象与您查询的"{user_query.strip()}"不匹配。{content_validation["message"]}',
+            'suggestion': content_validation.get('suggestion', '请检查图像内容或修改查询词汇。'),
+            'detected_objects': content_validation.get('detected_objects', []),
+            'alternative_queries': content_validation.get('alternative_queries', []),
+            'content_mismatch': True,
+            'user_query': user_query.strip()
+        }  # 调用方使用200状态码，让前端正确处理内容不匹配
+
+    def _build_segmentation_response(self, filepath, image, results, model, model_name, confidence, user_query, inference_imgsz, tiled, output_format='png', content_validation=None, classes=None):
+        """根据推理结果验证内容匹配、编码并保存分割结果，生成响应；classes为推理时保留的类别ID"""
+        # 单次推理模式：结果已按查询类别过滤，检测到查询类别即为匹配；未检测到时才以全部类别
+        # 再推理一次，给出图像中实际包含的对象
+        if user_query and user_query.strip() and content_validation is None and not any(len(result) for result in results):
+            results = self._predict(model, image, min(confidence, self.VALIDATION_CONFIDENCE), inference_imgsz, tiled)
+            content_validation = self._match_content(self._collect_detected_classes(results, model), user_query.strip(), model.names)
+            if not content_validation['is_match']:
+                return self._content_mismatch_response(user_query, content_validation), 200
+            results = keep_classes(results, classes)
+
+        # 处理分割结果
+        segmented_objects = []
+        segment_images = []
+        image_stem = os.path.splitext(os.path.basename(filepath))[0]
+        encoder = SegmentationEncoder(output_format, image.shape, current_app.config['GENERATED_FOLDER'], f'yolo_{image_stem}')
+
+        for result in results:
+            if result.masks is not None:
+                height, width = image.shape[:2]
+
+                for i, (box, cls, conf) in enumerate(zip(result.boxes, result.class_ids, result.scores)):
+                    # 获取类别名称
+                    class_name = model.names[int(cls)]
+
+                    # 单次推理模式下过滤掉低于用户置信度的结果
+                    if conf < confidence:
+                        continue
+
+                    # 如果有用户查询，只处理查询对应类别的对象
+                    if classes and int(cls) not in classes:
+                        continue
+
+                    # 获取边界框
+                    x1, y1, x2, y2 = box.astype(int)
+
+                    # 裁剪分割区域（保持完整对象）
+                    padding = 10
+                    x1_crop = max(0, x1 - padding)
+                    y1_crop = max(0, y1 - padding)
+                    x2_crop = min(width, x2 + padding)
+                    y2_crop = min(height, y2 + padding)
+
+                    # 只在裁剪区域内还原掩码并提取轮廓，开销与对象大小而非图像大小相关
+                    mask_binary = result.mask_crop(i, (x1_crop, y1_crop, x2_crop, y2_crop))
+
+                    # 归一化坐标
+                    ymin = y1 / height
+                    xmin = x1 / width
+                    ymax = y2 / height
+                    xmax = x2 / width
+
+                    segment = {
+                        'label': f'{class_name}_{i+1}',
+                        'description': f'YOLO分割的{class_name}对象',
+                        'confidence': float(conf),
+                        'bbox': [ymin, xmin, ymax, xmax],
+                        'method': f'YOLO {model_name}',
+                        'class_id': int(cls),
+                        'class_name': class_name
+                    }
+
+                    if encoder.output_format == 'png':
+                        cropped_segment = self._create_precise_segment(
+                            image[y1_crop:y2_crop, x1_crop:x2_crop], mask_binary)
 
                         # 保存分割图像
                         timestamp = int(time.time())
-                        seg_filename = f"yolo_segment_{class_name}_{i}_{timestamp}.png"
+                        seg_filename = f"yolo_segment_{class_name}_{i}_{timestamp}_{image_stem}.png"
                         seg_filepath = os.path.join(current_app.config['GENERATED_FOLDER'], seg_filename)
                         cv2.imwrite(seg_filepath, cropped_segment)
 
                         segment_images.append(seg_filepath)
+                        segment['segment_image'] = seg_filepath
+                    else:
+                        # 几何格式直接编码裁剪区域内的掩码，不生成逐对象图像
+                        encoder.add(segment, mask_binary, (x1_crop, y1_crop))
 
-                        # 归一化坐标
-                        ymin = y1 / height
-                        xmin = x1 / width
-                        ymax = y2 / height
-                        xmax = x2 / width
-
-                        segmented_objects.append({
-                            'label': f'{class_name}_{i+1}',
-                            'description': f'YOLO分割的{class_name}对象',
-                            'confidence': float(conf),
-                            'bbox': [ymin, xmin, ymax, xmax],
-                            'segment_image': seg_filepath,
-                            'method': f'YOLO {model_name}',
-                            'class_id': int(cls),
-                            'class_name': class_name
-                        })
-
-            if segmented_objects:
+                    segmented_objects.append(segment)
+
+        label_map_path = encoder.save_label_map()
+        if label_map_path:
+            segment_images.append(label_map_path)
+
+        if segmented_objects:
+            return {
+                'success': True,
+                'original_image': filepath,
+                'segmented_objects': segmented_objects,
+                'segment_images': segment_images,
+                'method': f'YOLO {model_name}',
+                'backend': model.backend,
+                'precision': model.precision,
+                'imgsz': inference_imgsz,
+                'tiled': bool(tiled),
+                'output_format': encoder.output_format,
+                'label_map': label_map_path,
+                'total_objects': len(segmented_objects)
+            }, 200
+        else:
+            if user_query and user_query.strip():
                 return {
-                    'success': True,
-                    'original_image': filepath,
-                    'segmented_objects': segmented_objects,
-                    'segment_images': segment_images,
-                    'method': f'YOLO {model_name}',
-                    'total_objects': len(segmented_objects)
+                    'success': False,
+                    'error': f'未检测到指定的目标对象：{user_query}',
+                    'message': f'虽然图像中检测到了其他对象，但未找到与"{user_query}"匹配的对象',
+                    'method': f'YOLO {model_name}'
                 }, 200
             else:
-                if user_query and user_query.strip():
-                    return {
-                        'success': False,
-                        'error': f'未检测到指定的目标对象：{user_query}',
-                        'message': f'虽然图像中检测到了其他对象，但未找到与"{user_query}"匹配的对象',
-                        'method': f'YOLO {model_name}'
-                    }, 200
-                else:
-                    return {
-                        'success': False,
-                        'error': f'使用 YOLO {model_name} 未能分割出对象',
-                        'method': f'YOLO {model_name}'
-                    }, 200
-
-        except Exception as e:
-            error_msg = f'YOLO 分割失败: {str(e)}'
-            print(f"YOLO 分割错误: {e}")
-            return {'success': False, 'error': error_msg}, 500
+                return {
+                    'success': False,
+                    'error': f'使用 YOLO {model_name} 未能分割出对象',
+                    'method': f'YOLO {model_name}'
+                }, 200
 
-    def _create_precise_segment(self, image, mask_binary, box):
-        """创建精确的轮廓分割图像"""
+    def _create_precise_segment(self, image_crop, mask_binary):
+        """在对象裁剪区域内创建精确的轮廓分割图像"""
         # 找到掩码的轮廓
         contours, _ = cv2.findContours(mask_binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
-        if not contours:
+        if contours:
+            # 找到最大的轮廓，创建精确的轮廓掩码
+            largest_contour = max(contours, key=cv2.contourArea)
+            precise_mask = np.zeros(mask_binary.shape, dtype=np.uint8)
+            cv2.fillPoly(precise_mask, [largest_contour], 255)
+        else:
             # 如果没有找到轮廓，使用原始掩码
-            result = image.copy()
-            result[mask_binary == 0] = [255, 255, 255]
-            return result
-
-        # 找到最大的轮廓
-        largest_contour = max(contours, key=cv2.contourArea)
-
-        # 创建精确的轮廓掩码
-        precise_mask = np.zeros(mask_binary.shape, dtype=np.uint8)
-        cv2.fillPoly(precise_mask, [largest_contour], 255)
-
-        # 应用精确掩码到原图像
-        result = image.copy()
-        result[precise_mask == 0] = [255, 255, 255]  # 白色背景
+            precise_mask = mask_binary
 
+        # 白色背景上只复制掩码内的像素
+        result = np.full_like(image_crop, 255)
+        cv2.copyTo(image_crop, precise_mask, result)
         return result
 
-    def _is_target_object(self, class_name, user_query):
-        """检查检测到的对象是否与用户查询匹配"""
-        # 使用与检测服务相同的同义词映射
-        synonym_map = self._get_synonym_map()
-
-        user_query_lower = user_query.lower().strip()
-        class_name_lower = class_name.lower()
-
-        # 直接匹配
-        if user_query_lower == class_name_lower:
-            return True
-
-        # 同义词匹配
-        for key, synonyms in synonym_map.items():
-            if key == class_name_lower and user_query_lower in synonyms:
-                return True
-            if user_query_lower == key and class_name_lower in synonyms:
-                return True
-
-        # 部分匹配（严格条件）
-        if len(user_query_lower) > 3:
-            if (user_query_lower in class_name_lower and len(user_query_lower) / len(class_name_lower) > 0.6) or \
-               (class_name_lower in user_query_lower and len(class_name_lower) / len(user_query_lower) > 0.6):
-                return True
-
-        return False
-
-    def _get_synonym_map(self):
-        """获取同义词映射表（与检测服务保持一致）"""
-        return {
-            # 动物类
-            'cat': ['kitten', 'feline', '猫', '小猫', 'kitty', '猫咪', '喵', '猫猫'],
-            'dog': ['puppy', 'canine', '狗', '小狗', 'doggy', '狗狗', '犬', '汪'],
-            'bird': ['飞鸟', '鸟类', 'avian', '鸟儿', '小鸟'],
-            'horse': ['马', 'equine', 'pony', '马匹', '小马'],
-            'cow': ['cattle', '牛', 'bull', '奶牛', '母牛'],
-            'sheep': ['羊', 'lamb', '绵羊', '小羊'],
-            'elephant': ['大象', '象'],
-            'bear': ['熊', '狗熊', '黑熊', '棕熊'],
-            'zebra': ['斑马'],
-            'giraffe': ['长颈鹿'],
-            'lion': ['狮子', '雄狮', '母狮'],
-            'tiger': ['老虎', '虎'],
-            'monkey': ['猴子', '猴'],
-            'rabbit': ['兔子', '小兔', '兔'],
-
-            # 交通工具
-            'car': ['automobile', 'vehicle', '汽车', '车辆', '轿车', '小车'],
-            'truck': ['lorry', '卡车', '货车', '大车'],
-            'bus': ['coach', '公交车', '巴士', '客车'],
-            'motorcycle': ['motorbike', '摩托车', '机车', '摩托'],
-            'bicycle': ['bike', '自行车', '单车', '脚踏车'],
-            'train': ['火车', 'locomotive', '列车'],
-            'airplane': ['plane', '飞机', 'aircraft', '客机'],
-            'boat': ['ship', '船', '轮船', '小船'],
-
-            # 人物
-            'person': ['people', 'human', '人', '人类', 'man', 'woman', 'individual', '人物'],
-            'child': ['kid', '孩子', '儿童', '小孩'],
-            'baby': ['infant', '婴儿', '宝宝', '小宝宝'],
-
-            # 物品
-            'phone': ['mobile', 'cellphone', '手机', '电话', 'smartphone', '移动电话'],
-            'laptop': ['computer', '笔记本', '电脑', 'notebook', '笔记本电脑'],
-            'book': ['书', '书籍', '图书'],
-            'bottle': ['瓶子', 'container', '水瓶'],
-            'cup': ['mug', '杯子', '茶杯', '水杯'],
-            'clock': ['时钟', '钟表', 'watch', '手表'],
-            'tv': ['television', '电视', 'monitor', '电视机'],
-            'remote': ['遥控器', 'controller', '遥控'],
-
-            # 食物
-            'apple': ['苹果'],
-            'banana': ['香蕉'],
-            'orange': ['橙子', '橘子', '桔子'],
-            'pizza': ['比萨', '披萨'],
-            'cake': ['蛋糕'],
-            'sandwich': ['三明治'],
-            'donut': ['甜甜圈', '油炸圈饼'],
-
-            # 家具
-            'chair': ['椅子', '座椅'],
-            'couch': ['sofa', '沙发'],
-            'bed': ['床', '床铺'],
-            'dining table': ['table', '桌子', '餐桌', '饭桌'],
-            'toilet': ['厕所', '马桶', '卫生间'],
-
-            # 运动用品
-            'sports ball': ['ball', '球', '运动球'],
-            'tennis racket': ['tennis', '网球拍', '球拍'],
-            'baseball bat': ['棒球棒', '球棒'],
-            'baseball glove': ['棒球手套', '手套'],
-            'skateboard': ['滑板'],
-            'surfboard': ['冲浪板'],
-            'ski': ['滑雪板'],
-
-            # 厨房用品
-            'knife': ['刀', '小刀', '菜刀'],
-            'spoon': ['勺子', '汤匙', '勺'],
-            'fork': ['叉子', '餐叉'],
-            'bowl': ['碗', '饭碗'],
-            'wine glass': ['酒杯', '红酒杯', '玻璃杯'],
-            'refrigerator': ['冰箱', 'fridge'],
-            'microwave': ['微波炉'],
-            'oven': ['烤箱'],
-            'toaster': ['烤面包机'],
-
-            # 电子设备
-            'keyboard': ['键盘'],
-            'mouse': ['鼠标'],
-            'cell phone': ['phone', '手机', 'mobile', '移动电话'],
-
-            # 植物和自然
-            'flower': ['花', '花朵', '鲜花'],
-            'tree': ['树', '树木', '大树'],
-            'grass': ['草', '草地', '草坪'],
-
-            # 建筑和结构
-            'building': ['建筑', '房子', '楼房', '大楼'],
-            'house': ['房子', '住宅', '房屋'],
-            'bridge': ['桥', '大桥', '桥梁'],
-        }
-
     def get_available_models(self):
         """获取可用的YOLO分割模型列表"""
-        return {
+        models = {
             'yolo11n-seg': {
                 'name': 'YOLOv11 Nano Segmentation',
                 'description': '最快速度，较小精度',
@@ -409,6 +361,12 @@ class YOLOSegmentationService:
             }
         }
 
+        # 附加各推理后端/精度变体的缓存状态、大小和预期速度
+        for model_name, info in models.items():
+            info['variants'] = model_registry.describe_variants(model_name)
+        return models
+
+
     def compare_with_opencv(self, image_path, opencv_result, yolo_model='yolo11n-seg', confidence=0.5):
         """与OpenCV分割结果进行对比"""
         try:
@@ -460,11 +418,12 @@ class YOLOSegmentationService:
                 'error': f'YOLO分割对比失败: {str(e)}'
             }
 
-    def _validate_content_match(self, image_path, user_query):
+    def _validate_content_match(self, image_path, user_query, backend=None, precision=None, imgsz=None):
         """验证用户查询内容与图像内容的匹配性"""
         try:
             # 首先进行快速检测，获取图像中的对象
-            if not self.load_model('yolo11n-seg'):  # 使用最快的模型进行检测
+            model = self.load_model('yolo11n-seg', backend, precision)  # 使用最快的模型进行检测
+            if model is None:
                 return {
                     'is_match': True,  # 如果无法加载模型，允许继续
                     'message': '无法验证内容匹配性，将继续处理'
@@ -478,22 +437,54 @@ class YOLOSegmentationService:
                     'message': '无法读取图像，将继续处理'
                 }
 
-            # 进行快速检测
-            results = self.current_model(image, conf=0.3)  # 使用较低的置信度进行检测
+            # 进行快速检测，保留全部类别以便不匹配时给出备选查询
+            results = model.predict(image, conf=self.VALIDATION_CONFIDENCE,
+                                    imgsz=self._resolve_imgsz(imgsz, image, 'yolo11n-seg', model))  # 使用较低的置信度进行检测
 
-            detected_objects = []
-            for result in results:
-                if result.boxes is not None:
-                    classes = result.boxes.cls.cpu().numpy()
-                    confidences = result.boxes.conf.cpu().numpy()
+            return self._match_content(self._collect_detected_classes(results, model), user_query, model.names)
 
-                    for cls, conf in zip(classes, confidences):
-                        class_name = self.current_model.names[int(cls)]
-                        detected_objects.append({
-                            'class_name': class_name,
-                            'confidence': float(conf)
-                        })
+        except Exception as e:
+            print(f"内容匹配验证错误: {str(e)}")
+            # 如果验证过程出错，允许继续处理
+            return {
+                'is_match': True,
+                'message': f'内容匹配验证出错，将继续处理: {str(e)}'
+            }
 
+    def _predict(self, model, image, confidence, imgsz, tiled=False, classes=None):
+        """执行推理，tiled时对大图使用重叠切片推理；classes为推理时保留的类别ID"""
+        if tiled:
+            return predict_tiled(
+                model, image, conf=confidence, imgsz=imgsz,
+                tile_size=current_app.config.get('YOLO_TILE_SIZE', 640),
+                overlap=current_app.config.get('YOLO_TILE_OVERLAP', 0.2),
+                batch_size=current_app.config.get('YOLO_TILE_BATCH_SIZE', 8),
+                classes=classes
+            )
+        return model.predict(image, conf=confidence, imgsz=imgsz, classes=classes)
+
+    def _resolve_imgsz(self, imgsz, image, model_name, model):
+        """解析推理尺寸，未指定时使用配置的默认值"""
+        if imgsz is None:
+            imgsz = current_app.config.get('YOLO_IMGSZ', DEFAULT_IMGSZ)
+        latency_budget_ms = current_app.config.get('YOLO_LATENCY_BUDGET_MS', 250)
+        return resolve_imgsz(imgsz, image.shape, model_name, latency_budget_ms, model.backend, model.precision)
+
+    def _collect_detected_classes(self, results, model):
+        """从推理结果中提取类别名称和置信度"""
+        detected_objects = []
+        for result in results:
+            for cls, conf in zip(result.class_ids, result.scores):
+                class_name = model.names[int(cls)]
+                detected_objects.append({
+                    'class_name': class_name,
+                    'confidence': float(conf)
+                })
+        return detected_objects
+
+    def _match_content(self, detected_objects, user_query, names):
+        """根据检测到的对象判断是否与用户查询匹配，names为模型类别名称映射"""
+        try:
             if not detected_objects:
                 return {
                     'is_match': False,
@@ -502,61 +493,11 @@ class YOLOSegmentationService:
                     'detected_objects': []
                 }
 
-            # 分析用户查询与检测到的对象的匹配性
-            user_query_lower = user_query.lower()
-            detected_classes = [obj['class_name'].lower() for obj in detected_objects]
-
-            # 创建类别映射（英文到中文，以及常见的同义词）
-            class_mapping = {
-                'person': ['人', '人物', '人类', '男人', '女人', '小孩', '儿童'],
-                'dog': ['狗', '小狗', '犬', '宠物狗'],
-                'cat': ['猫', '小猫', '猫咪', '宠物猫'],
-                'car': ['汽车', '车', '轿车', '小车'],
-                'truck': ['卡车', '货车', '大车'],
-                'bird': ['鸟', '小鸟', '鸟类'],
-                'horse': ['马', '马匹'],
-                'cow': ['牛', '奶牛', '母牛'],
-                'sheep': ['羊', '绵羊'],
-                'bicycle': ['自行车', '单车', '脚踏车'],
-                'motorcycle': ['摩托车', '机车'],
-                'airplane': ['飞机', '客机'],
-                'boat': ['船', '小船', '船只'],
-                'bottle': ['瓶子', '水瓶'],
-                'chair': ['椅子', '座椅'],
-                'table': ['桌子', '餐桌'],
-                'laptop': ['笔记本电脑', '电脑'],
-                'phone': ['手机', '电话'],
-                'book': ['书', '书本'],
-                'clock': ['时钟', '钟表'],
-                'flower': ['花', '花朵'],
-                'tree': ['树', '树木'],
-                'building': ['建筑', '房子', '楼房']
-            }
-
-            # 检查是否匹配
-            is_match = False
-            matched_objects = []
-
-            # 直接匹配检测到的类别
-            for detected_class in detected_classes:
-                if detected_class in user_query_lower or user_query_lower in detected_class:
-                    is_match = True
-                    matched_objects.append(detected_class)
-
-            # 通过映射检查匹配
-            if not is_match:
-                for english_class, chinese_variants in class_mapping.items():
-                    if english_class in detected_classes:
-                        for chinese_variant in chinese_variants:
-                            if chinese_variant in user_query_lower:
-                                is_match = True
-                                matched_objects.append(english_class)
-                                break
-
-                    # 反向检查：用户输入英文，图像中有对应对象
-                    if english_class in user_query_lower and english_class in detected_classes:
-                        is_match = True
-                        matched_objects.append(english_class)
+            # 与推理时的类别过滤使用同一类别索引，查询对应的类别即为匹配目标
+            target_names = query_class_names(user_query, names)
+            matched_objects = list(dict.fromkeys(obj['class_name'] for obj in detected_objects
+                                                 if obj['class_name'] in target_names))
+            is_match = bool(matched_objects)
 
             if is_match:
                 return {
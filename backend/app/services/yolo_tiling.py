@@ -0,0 +1,152 @@
+"""
+YOLO 切片推理
+将大图切分为相互重叠的切片批量推理，合并后用NMS去除重复检测，
+用于无人机航拍、文档扫描等小目标在整体缩放后会丢失的场景
+"""
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from .yolo_prediction import YOLOPrediction, batched_nms
+
+
+# 框边缘与切片内部边缘的距离不超过该像素数时视为被切片截断
+SEAM_TOLERANCE = 2
+
+
+def tile_windows(height, width, tile_size, overlap=0.2):
+    """计算覆盖整张图像的重叠切片窗口 (x1, y1, x2, y2)"""
+    stride = max(1, int(tile_size * (1 - overlap)))
+
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        positions = list(range(0, length - tile_size, stride))
+        # 最后一个切片贴齐图像边缘，保证所有切片大小一致
+        positions.append(length - tile_size)
+        return positions
+
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in starts(height)
+        for x in starts(width)
+    ]
+
+
+def predict_tiled(model, image, conf=0.25, imgsz=640, tile_size=640, overlap=0.2,
+                  batch_size=8, merge_threshold=0.6, include_full_image=True, classes=None):
+    """切片推理并合并结果，返回与普通推理相同格式的结果列表"""
+    height, width = image.shape[:2]
+    windows = tile_windows(height, width, tile_size, overlap)
+    if len(windows) <= 1:
+        return model.predict(image, conf=conf, imgsz=imgsz, classes=classes)
+
+    tiles = [image[y1:y2, x1:x2] for x1, y1, x2, y2 in windows]
+    chunks = [list(range(i, min(i + batch_size, len(tiles)))) for i in range(0, len(tiles), batch_size)]
+
+    def run_chunk(indices):
+        return model.predict([tiles[i] for i in indices], conf=conf, imgsz=tile_size, classes=classes)
+
+    # 切片分批推理，模型有多个副本时各批并行
+    workers = min(len(chunks), max(1, model.max_replicas))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            chunk_results = list(executor.map(run_chunk, chunks))
+    else:
+        chunk_results = [run_chunk(indices) for indices in chunks]
+
+    parts = []
+    for indices, results in zip(chunks, chunk_results):
+        for index, result in zip(indices, results):
+            parts.append((windows[index], result))
+
+    # 整图推理补充跨越多个切片的大目标
+    if include_full_image:
+        parts.append(((0, 0, width, height), model.predict(image, conf=conf, imgsz=imgsz, classes=classes)[0]))
+
+    return [_merge_parts(parts, (height, width), merge_threshold)]
+
+
+def _truncated_at_seam(boxes, window, orig_shape):
+    """切片坐标下的框是否贴着切片的内部边缘（即被切片截断），图像自身的边缘不算"""
+    x1, y1, x2, y2 = window
+    height, width = orig_shape
+    return (((x1 > 0) & (boxes[:, 0] <= SEAM_TOLERANCE)) |
+            ((y1 > 0) & (boxes[:, 1] <= SEAM_TOLERANCE)) |
+            ((x2 < width) & (boxes[:, 2] >= x2 - x1 - SEAM_TOLERANCE)) |
+            ((y2 < height) & (boxes[:, 3] >= y2 - y1 - SEAM_TOLERANCE)))
+
+
+def seam_aware_nms(boxes, scores, class_ids, sources, truncated, threshold):
+    """合并切片结果的NMS，返回保留的索引（按分数降序）
+
+    所有框先按IoU做类别NMS，嵌套的同类目标（人群中的人、桌上的杯子）得以保留；
+    之后只有跨越切片接缝的框对才按交集与较小框面积之比（IoS）合并：较小的框被其切片边缘截断，
+    且两个框来自不同的切片（或整图推理），此时去除被截断的较小框
+    """
+    keep = batched_nms(boxes, scores, class_ids, threshold)
+    positions = np.flatnonzero(truncated[keep])
+    if positions.size == 0:
+        return keep
+
+    kept_boxes = np.asarray(boxes, dtype=np.float64)[keep]
+    areas = (kept_boxes[:, 2] - kept_boxes[:, 0]).clip(0) * (kept_boxes[:, 3] - kept_boxes[:, 1]).clip(0)
+    cut = kept_boxes[positions]
+    inter_w = (np.minimum(cut[:, None, 2], kept_boxes[None, :, 2]) -
+               np.maximum(cut[:, None, 0], kept_boxes[None, :, 0])).clip(0)
+    inter_h = (np.minimum(cut[:, None, 3], kept_boxes[None, :, 3]) -
+               np.maximum(cut[:, None, 1], kept_boxes[None, :, 1])).clip(0)
+    cut_areas = areas[positions][:, None]
+    ios = inter_w * inter_h / (np.minimum(cut_areas, areas[None, :]) + 1e-7)
+
+    # 面积相同时保留排序靠前（分数较高）的框
+    ranks = np.arange(len(keep))
+    larger = (areas[None, :] > cut_areas) | ((areas[None, :] == cut_areas) & (ranks[None, :] < positions[:, None]))
+    kept_classes, kept_sources = class_ids[keep], sources[keep]
+    seam_pairs = ((kept_classes[positions][:, None] == kept_classes[None, :]) &
+                  (kept_sources[positions][:, None] != kept_sources[None, :]) &
+                  larger & (ios > threshold))
+
+    # 被截断的框只是目标的一部分，无论分数高低都去除，保留更完整的较大框
+    suppressed = np.zeros(len(keep), dtype=bool)
+    suppressed[positions[seam_pairs.any(axis=1)]] = True
+    return keep[~suppressed]
+
+
+def _merge_parts(parts, orig_shape, merge_threshold):
+    """将各切片结果平移到原图坐标并合并去重"""
+    boxes, scores, class_ids, masks, extents, sources, truncated = [], [], [], [], [], [], []
+    has_masks = any(result.masks is not None for _, result in parts)
+    mask_shape = next((result.masks.shape[1:] for _, result in parts
+                       if result.masks is not None and len(result)), None)
+
+    for index, ((x1, y1, x2, y2), result) in enumerate(parts):
+        if not len(result):
+            continue
+        truncated.append(_truncated_at_seam(result.boxes, (x1, y1, x2, y2), orig_shape))
+        sources.append(np.full(len(result), index))
+        boxes.append(result.boxes + np.array([x1, y1, x1, y1], dtype=np.float32))
+        scores.append(result.scores)
+        class_ids.append(result.class_ids)
+        if has_masks:
+            # 掩码统一到相同分辨率后堆叠，通过覆盖范围映射回原图
+            for mask in result.masks:
+                if mask.shape != mask_shape:
+                    mask = cv2.resize(mask, (mask_shape[1], mask_shape[0]))
+                masks.append(mask)
+            extents.append(np.tile([x1, y1, x2, y2], (len(result), 1)))
+
+    if not boxes:
+        empty_masks = np.zeros((0, 1, 1), dtype=np.float32) if has_masks else None
+        return YOLOPrediction(np.zeros((0, 4)), [], [], orig_shape, empty_masks)
+
+    merged = YOLOPrediction(
+        np.concatenate(boxes),
+        np.concatenate(scores),
+        np.concatenate(class_ids),
+        orig_shape,
+        np.stack(masks) if has_masks else None,
+        np.concatenate(extents).astype(np.int64) if has_masks else None
+    )
+    keep = seam_aware_nms(merged.boxes, merged.scores, merged.class_ids,
+                          np.concatenate(sources), np.concatenate(truncated), merge_threshold)
+    return merged.filter(keep)
@@ -7,13 +7,17 @@
 import os
 import base64
 import json
+import shutil
+import time
+import uuid
+import zipfile
 import requests
 from PIL import Image, ImageDraw, ImageFont
 from io import BytesIO
 import numpy as np
 from google import genai
 from google.genai import types
-from flask import current_app, request
+from flask import Response, current_app, request, stream_with_context
 
 
 def allowed_file(filename):
@@ -40,6 +44,123 @@ def save_uploaded_file(file, upload_folder):
     return filepath
 
 
+def save_batch_uploads(files, upload_folder, max_images=None, max_entry_size=None, max_total_size=None):
+    """保存批量上传的图像（多个文件或zip压缩包），返回 [(原始文件名, 保存路径)]，不支持的文件路径为None
+
+    max_entry_size和max_total_size限制压缩包内单个文件和全部文件解压后的字节数，超出时抛出ValueError
+    """
+    batch_folder = os.path.join(upload_folder, f"batch_{int(time.time() * 1000)}_{uuid.uuid4().hex[:8]}")
+    os.makedirs(batch_folder, exist_ok=True)
+    saved = []
+    extracted = [0]
+
+    def add(name, writer):
+        if max_images and len(saved) >= max_images:
+            raise ValueError(f'单次最多处理 {max_images} 张图像')
+        if not allowed_file(name):
+            saved.append((name, None))
+            return
+        # 序号前缀避免压缩包内不同目录的同名文件互相覆盖
+        path = os.path.join(batch_folder, f"{len(saved):05d}_{os.path.basename(name)}")
+        writer(path)
+        saved.append((name, path))
+
+    def check_size(name, size):
+        if max_entry_size and size > max_entry_size:
+            raise ValueError(f'压缩包内文件过大: {name}')
+        if max_total_size and extracted[0] + size > max_total_size:
+            raise ValueError(f'压缩包解压后总大小超过 {max_total_size // (1024 * 1024)}MB')
+
+    def extract_from(archive, info):
+        def extract(path):
+            check_size(info.filename, info.file_size)
+            # 按实际读出的字节数再次检查，防止压缩包头中的文件大小被篡改
+            written = 0
+            with archive.open(info) as source, open(path, 'wb') as target:
+                while True:
+                    chunk = source.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    written += len(chunk)
+                    check_size(info.filename, written)
+                    target.write(chunk)
+            extracted[0] += written
+        return extract
+
+    try:
+        for file in files:
+            if not file or not file.filename:
+                continue
+            if file.filename.lower().endswith('.zip'):
+                try:
+                    archive = zipfile.ZipFile(file.stream)
+                except zipfile.BadZipFile:
+                    raise ValueError(f'无效的zip压缩包: {file.filename}')
+                with archive:
+                    for info in archive.infolist():
+                        if info.is_dir() or info.filename.startswith('__MACOSX/'):
+                            continue
+                        try:
+                            add(info.filename, extract_from(archive, info))
+                        except zipfile.BadZipFile:
+                            # 校验和或文件头损坏的条目在解压时才会发现
+                            raise ValueError(f'压缩包内文件已损坏: {info.filename}')
+            else:
+                add(file.filename, file.save)
+    except Exception:
+        shutil.rmtree(batch_folder, ignore_errors=True)
+        raise
+
+    if not any(path for _, path in saved):
+        shutil.rmtree(batch_folder, ignore_errors=True)
+    return saved
+
+
+def save_batch_request_uploads(files):
+    """按配置的批量上传限制保存批量请求中的图像"""
+    config = current_app.config
+    return save_batch_uploads(files, config['UPLOAD_FOLDER'], config.get('YOLO_BATCH_JOB_MAX_IMAGES', 1000),
+                              config.get('BATCH_MAX_ENTRY_SIZE'), config.get('BATCH_MAX_UNCOMPRESSED_SIZE'))
+
+
+def batch_ndjson_response(uploads, results):
+    """将批量处理结果以NDJSON流式返回，每张图像一行，按完成顺序输出，输出结束后删除批量上传目录
+
+    uploads为save_batch_uploads的返回值，results逐张产出 (保存路径, 结果字典)
+    """
+    indices = {path: (index, name) for index, (name, path) in enumerate(uploads) if path}
+    batch_folders = {os.path.dirname(path) for path in indices}
+
+    def generate():
+        try:
+            for index, (name, path) in enumerate(uploads):
+                if path is None:
+                    yield {'index': index, 'filename': name, 'success': False, 'error': '无效的文件类型'}
+            for path, result in results:
+                index, name = indices[path]
+                line = {'index': index, 'filename': name}
+                line.update(result)
+                yield line
+        finally:
+            # 先关闭结果生成器，释放其占用的计算名额和模型句柄
+            close = getattr(results, 'close', None)
+            if close:
+                close()
+            for folder in batch_folders:
+                shutil.rmtree(folder, ignore_errors=True)
+
+    return ndjson_response(generate())
+
+
+def ndjson_response(items):
+    """将字典序列以NDJSON流式返回，每个字典一行"""
+    def generate():
+        for item in items:
+            yield json.dumps(item, ensure_ascii=False, default=str) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
 def image_to_bytes(image_path):
     """将图像文件转换为字节"""
     with open(image_path, 'rb') as f:
@@ -307,6 +428,39 @@ def translate_chinese_to_english(chinese_text, client):
         return chinese_text
 
 
+def parse_bool_param(value, default=None):
+    """解析请求中的布尔参数，支持JSON布尔值和表单字符串"""
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def is_positive_int(value):
+    """检查请求参数是否为正整数"""
+    try:
+        return int(value) > 0
+    except (TypeError, ValueError):
+        return False
+
+
+def is_non_negative_int(value):
+    """检查请求参数是否为非负整数"""
+    try:
+        return int(value) >= 0
+    except (TypeError, ValueError):
+        return False
+
+
+def is_non_negative_number(value):
+    """检查请求参数是否为有限的非负数"""
+    try:
+        return 0 <= float(value) < float('inf')
+    except (TypeError, ValueError):
+        return False
+
+
 def init_gemini_client():
     """初始化 Gemini 客户端"""
     # 首先尝试从环境变量获取API密钥
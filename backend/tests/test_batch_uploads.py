@@ -0,0 +1,108 @@
+"""批量上传保存测试：普通文件、zip压缩包、大小限制和无效压缩包"""
+import io
+import os
+import zipfile
+
+import pytest
+from flask import Flask
+from werkzeug.datastructures import FileStorage
+
+from app.utils.helpers import save_batch_uploads
+
+
+@pytest.fixture(autouse=True)
+def app_context():
+    app = Flask(__name__)
+    app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg'}
+    with app.app_context():
+        yield
+
+
+def _file(name, data=b'image'):
+    return FileStorage(stream=io.BytesIO(data), filename=name)
+
+
+def _zip(name, entries):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for entry_name, data in entries.items():
+            archive.writestr(entry_name, data)
+    buffer.seek(0)
+    return FileStorage(stream=buffer, filename=name)
+
+
+def _batch_folders(upload_folder):
+    return os.listdir(upload_folder) if os.path.exists(upload_folder) else []
+
+
+def test_files_and_zip_entries_are_saved(tmp_path):
+    archive = _zip('photos.zip', {'a.png': b'aa', 'notes.txt': b'x', '__MACOSX/._a.png': b'meta'})
+    saved = save_batch_uploads([_file('b.jpg', b'bb'), archive, None], str(tmp_path))
+
+    assert [name for name, _ in saved] == ['b.jpg', 'a.png', 'notes.txt']
+    # 不支持的文件保留文件名，路径为None
+    assert saved[2][1] is None
+    with open(saved[1][1], 'rb') as f:
+        assert f.read() == b'aa'
+
+
+def test_nested_duplicate_names_do_not_overwrite(tmp_path):
+    archive = _zip('photos.zip', {'day1/img.png': b'first', 'day2/img.png': b'second'})
+    saved = save_batch_uploads([archive], str(tmp_path))
+
+    paths = [path for _, path in saved]
+    assert len(set(paths)) == 2
+    assert all(os.path.dirname(path) == os.path.dirname(paths[0]) for path in paths)
+    contents = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            contents.append(f.read())
+    assert contents == [b'first', b'second']
+
+
+def test_oversized_entry_is_rejected_and_folder_removed(tmp_path):
+    archive = _zip('photos.zip', {'small.png': b'x' * 10, 'big.png': b'x' * 1000})
+    with pytest.raises(ValueError, match='big.png'):
+        save_batch_uploads([archive], str(tmp_path), max_entry_size=100)
+    assert _batch_folders(str(tmp_path)) == []
+
+
+def test_total_uncompressed_size_is_limited(tmp_path):
+    archive = _zip('photos.zip', {f'{i}.png': b'x' * 600 for i in range(3)})
+    with pytest.raises(ValueError, match='总大小'):
+        save_batch_uploads([archive], str(tmp_path), max_entry_size=1000, max_total_size=1500)
+    assert _batch_folders(str(tmp_path)) == []
+
+
+def test_corrupted_entry_raises_value_error(tmp_path):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as archive:
+        archive.writestr('big.png', b'x' * 1000)
+    # 篡改中央目录中记录的解压后大小，解压时校验和不匹配
+    data = bytearray(buffer.getvalue())
+    central = data.rfind(b'PK\x01\x02')
+    data[central + 24:central + 28] = (10).to_bytes(4, 'little')
+    archive = FileStorage(stream=io.BytesIO(bytes(data)), filename='photos.zip')
+
+    with pytest.raises(ValueError, match='已损坏'):
+        save_batch_uploads([archive], str(tmp_path))
+    assert _batch_folders(str(tmp_path)) == []
+
+
+def test_malformed_zip_raises_value_error(tmp_path):
+    with pytest.raises(ValueError, match='无效的zip压缩包'):
+        save_batch_uploads([_file('broken.zip', b'not a zip')], str(tmp_path))
+    assert _batch_folders(str(tmp_path)) == []
+
+
+def test_max_images_limit(tmp_path):
+    archive = _zip('photos.zip', {f'{i}.png': b'x' for i in range(3)})
+    with pytest.raises(ValueError, match='最多处理 2 张'):
+        save_batch_uploads([archive], str(tmp_path), max_images=2)
+    assert _batch_folders(str(tmp_path)) == []
+
+
+def test_folder_removed_when_nothing_saved(tmp_path):
+    saved = save_batch_uploads([_file('notes.txt')], str(tmp_path))
+    assert saved == [('notes.txt', None)]
+    assert _batch_folders(str(tmp_path)) == []
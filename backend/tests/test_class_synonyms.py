@@ -0,0 +1,63 @@
+"""查询到类别ID解析及检测、分割服务内容匹配的一致性测试"""
+import pytest
+
+from app.services.class_synonyms import class_index, resolve_class_ids
+from app.services.yolo_detection_service import YOLODetectionService
+from app.services.yolo_segmentation_service import YOLOSegmentationService
+
+
+COCO_NAMES = dict(enumerate([
+    'person', 'bicycle', 'car', 'motorcycle', 'airplane', 'bus', 'train', 'truck', 'boat', 'traffic light',
+    'fire hydrant', 'stop sign', 'parking meter', 'bench', 'bird', 'cat', 'dog', 'horse', 'sheep', 'cow',
+    'elephant', 'bear', 'zebra', 'giraffe', 'backpack', 'umbrella', 'handbag', 'tie', 'suitcase', 'frisbee',
+    'skis', 'snowboard', 'sports ball', 'kite', 'baseball bat', 'baseball glove', 'skateboard', 'surfboard',
+    'tennis racket', 'bottle', 'wine glass', 'cup', 'fork', 'knife', 'spoon', 'bowl', 'banana', 'apple',
+    'sandwich', 'orange', 'broccoli', 'carrot', 'hot dog', 'pizza', 'donut', 'cake', 'chair', 'couch',
+    'potted plant', 'bed', 'dining table', 'toilet', 'tv', 'laptop', 'mouse', 'remote', 'keyboard', 'cell phone',
+    'microwave', 'oven', 'toaster', 'sink', 'refrigerator', 'book', 'clock', 'vase', 'scissors', 'teddy bear',
+    'hair drier', 'toothbrush'
+]))
+ID = {name: class_id for class_id, name in COCO_NAMES.items()}
+
+QUERIES = ['cat', 'Cats', 'dogs', 'kitty', '小猫', 'bike', 'bikes', 'kite', 'kites', 'sofa', 'phone', 'plane',
+           'red car', 'a cat and a dog', '动物', 'tennis', 'teddy', 'tvs', 'xyz', '车', 'traffic lights']
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('cat', {'cat'}),
+    ('小猫', {'cat'}),
+    ('dogs', {'dog'}),
+    ('Bicycles', {'bicycle'}),
+    ('red car', {'car'}),
+    ('sofa', {'couch'}),
+    ('phone', {'cell phone'}),
+    ('车', {'car', 'truck', 'bus'}),
+    ('xyz', set()),
+])
+def test_resolve_class_ids(query, expected):
+    assert resolve_class_ids(query, COCO_NAMES) == sorted(ID[name] for name in expected)
+
+
+def test_semantic_group_alias_covers_member_classes():
+    resolved = set(resolve_class_ids('动物', COCO_NAMES))
+    assert {ID['dog'], ID['cat'], ID['horse'], ID['mouse']} <= resolved
+    assert ID['car'] not in resolved
+
+
+def test_index_is_built_once_per_class_table():
+    names = dict(COCO_NAMES)
+    assert class_index(names) is class_index(names)
+    assert class_index(names) is not class_index(dict(COCO_NAMES))
+    # 列表形式的类别表按下标作为类别ID
+    assert resolve_class_ids('dog', list(COCO_NAMES.values())) == [ID['dog']]
+
+
+@pytest.mark.parametrize('service_cls', [YOLODetectionService, YOLOSegmentationService])
+@pytest.mark.parametrize('query', QUERIES)
+def test_content_match_agrees_with_class_filter(service_cls, query):
+    """检测到的类别是否算作匹配，必须与推理时按查询保留的类别一致"""
+    service = service_cls()
+    resolved = set(resolve_class_ids(query, COCO_NAMES))
+    for class_id, class_name in COCO_NAMES.items():
+        result = service._match_content([{'class_name': class_name, 'confidence': 0.9}], query, COCO_NAMES)
+        assert result['is_match'] == (class_id in resolved), (query, class_name)
@@ -0,0 +1,89 @@
+"""颜色K-means快速模式（抽样/直方图拟合 + 查找表分配）与完整K-means一致性的测试"""
+import itertools
+
+import numpy as np
+import pytest
+
+from app.services.color_kmeans import (LUT_BITS, assign_centers, fit_centers_full, fit_centers_histogram,
+                                       fit_centers_sample)
+
+
+PALETTE = np.array([[30, 40, 200], [40, 180, 60], [200, 90, 30], [220, 220, 220]], dtype=np.float64)
+
+
+def _clustered_image(seed, height=240, width=320, noise=12):
+    """由若干颜色块加噪声组成的图像，聚类结构明确"""
+    rng = np.random.default_rng(seed)
+    regions = np.zeros((height, width), dtype=np.int64)
+    regions[:, width // 3:] = 1
+    regions[height // 2:, width // 2:] = 2
+    regions[height // 4:height // 2, :width // 4] = 3
+    image = PALETTE[regions] + rng.normal(0, noise, (height, width, 3))
+    return image.clip(0, 255).astype(np.uint8), regions
+
+
+def _agreement(labels, reference, k):
+    """两个标签图在最佳聚类编号对应下的一致比例"""
+    best = 0.0
+    for permutation in itertools.permutations(range(k)):
+        best = max(best, float(np.mean(np.asarray(permutation)[labels] == reference)))
+    return best
+
+
+def test_assign_centers_matches_quantized_nearest_center():
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, (300, 200, 3), dtype=np.uint8)
+    centers = rng.uniform(0, 255, (5, 3)).astype(np.float32)
+    labels = assign_centers(image, centers)
+
+    # 查找表按量化格子的中心颜色计算最近中心
+    step = 256 >> LUT_BITS
+    quantized = (image // step) * step + step / 2
+    distances = ((quantized[..., None, :] - centers.astype(np.float64)) ** 2).sum(axis=-1)
+    np.testing.assert_array_equal(labels, distances.argmin(axis=-1))
+
+    # 与按原始颜色计算的最近中心只在中心之间的边界附近不同
+    exact = ((image[..., None, :].astype(np.float64) - centers) ** 2).sum(axis=-1).argmin(axis=-1)
+    assert np.mean(labels == exact) > 0.95
+
+
+def test_assign_centers_handles_strips():
+    rng = np.random.default_rng(1)
+    image = rng.integers(0, 256, (1000, 7, 3), dtype=np.uint8)
+    centers = rng.uniform(0, 255, (3, 3))
+    labels = assign_centers(image, centers)
+    assert labels.shape == (1000, 7)
+    np.testing.assert_array_equal(labels[600:], assign_centers(image[600:], centers))
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_fast_modes_agree_with_full_kmeans(seed):
+    image, regions = _clustered_image(seed)
+    k = len(PALETTE)
+    full_labels, full_centers = fit_centers_full(image, k, seed)
+    assert _agreement(full_labels, regions, k) > 0.99
+
+    for centers in (fit_centers_sample(image, k, seed, 5000), fit_centers_histogram(image, k, seed, 32)):
+        assert centers.shape == (k, 3)
+        labels = assign_centers(image, centers)
+        assert _agreement(labels, full_labels, k) > 0.99
+        # 每个中心都接近完整K-means的某个中心
+        gaps = np.sqrt(((centers[:, None, :] - full_centers[None]) ** 2).sum(axis=-1)).min(axis=1)
+        assert gaps.max() < 8
+
+
+def test_fits_are_reproducible_for_a_seed():
+    image, _ = _clustered_image(7)
+    np.testing.assert_array_equal(fit_centers_sample(image, 4, 3, 2000), fit_centers_sample(image, 4, 3, 2000))
+    np.testing.assert_array_equal(fit_centers_histogram(image, 4, 3, 32), fit_centers_histogram(image, 4, 3, 32))
+    np.testing.assert_array_equal(fit_centers_full(image, 4, 3)[0], fit_centers_full(image, 4, 3)[0])
+
+
+def test_histogram_mode_with_fewer_colors_than_k():
+    image = np.zeros((50, 50, 3), dtype=np.uint8)
+    image[:, 25:] = (0, 0, 255)
+    centers = fit_centers_histogram(image, 5, 0, 32)
+    assert len(centers) == 2
+    labels = assign_centers(image, centers)
+    assert len(np.unique(labels[:, :25])) == 1 and len(np.unique(labels[:, 25:])) == 1
+    assert labels[0, 0] != labels[0, 49]
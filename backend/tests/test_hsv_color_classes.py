@@ -0,0 +1,87 @@
+"""HSV颜色分类查找表与cv2.inRange一致性的测试"""
+import cv2
+import numpy as np
+import pytest
+
+from app.services.hsv_color_classes import DETECTION_COLORS, FEATURE_COLORS, HSVColorClasses
+
+
+def _random_hsv(seed, height=120, width=160):
+    rng = np.random.default_rng(seed)
+    hsv = np.empty((height, width, 3), dtype=np.uint8)
+    hsv[..., 0] = rng.integers(0, 181, (height, width))
+    hsv[..., 1:] = rng.integers(0, 256, (height, width, 2))
+    return hsv
+
+
+def _in_ranges(hsv, ranges):
+    mask = np.zeros(hsv.shape[:2], dtype=np.uint8)
+    for lower, upper in ranges:
+        mask |= cv2.inRange(hsv, np.array(lower), np.array(upper))
+    return mask
+
+
+# 相互重叠的范围：同一像素可同时属于多个类别，同名类别分别统计
+OVERLAPPING = [
+    ('暖色', [((0, 50, 50), (30, 255, 255)), ((160, 50, 50), (180, 255, 255))]),
+    ('橙色', [((10, 100, 100), (25, 255, 255))]),
+    ('亮色', [((0, 0, 200), (180, 255, 255))]),
+    ('暖色', [((20, 0, 0), (40, 255, 255))])
+]
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_overlapping_masks_and_areas_match_in_range(seed):
+    classes = HSVColorClasses(OVERLAPPING)
+    hsv = _random_hsv(seed)
+    labels = classes.classify(hsv)
+    areas = classes.areas(labels)
+    for index, (_, ranges) in enumerate(OVERLAPPING):
+        expected = _in_ranges(hsv, ranges)
+        np.testing.assert_array_equal(classes.mask(labels, index), expected)
+        assert areas[index] == int(np.count_nonzero(expected))
+
+
+@pytest.mark.parametrize('classes', [FEATURE_COLORS, DETECTION_COLORS], ids=['feature', 'detection'])
+def test_builtin_areas_match_masks(classes):
+    labels = classes.classify(_random_hsv(5))
+    areas = classes.areas(labels)
+    for index in range(len(classes.names)):
+        mask = classes.mask(labels, index)
+        assert mask.dtype == np.uint8 and set(np.unique(mask)) <= {0, 255}
+        assert areas[index] == int(np.count_nonzero(mask))
+
+
+def test_builtin_classes_match_in_range():
+    hsv = _random_hsv(10)
+    red_low = cv2.inRange(hsv, np.array((0, 50, 50)), np.array((10, 255, 255)))
+    red_high = cv2.inRange(hsv, np.array((170, 50, 50)), np.array((180, 255, 255)))
+    labels = DETECTION_COLORS.classify(hsv)
+    np.testing.assert_array_equal(DETECTION_COLORS.mask(labels, 0), red_low)
+    np.testing.assert_array_equal(DETECTION_COLORS.mask(labels, 1), red_high)
+
+    labels = FEATURE_COLORS.classify(hsv)
+    np.testing.assert_array_equal(FEATURE_COLORS.mask(labels, 0),
+                                  _in_ranges(hsv, [((0, 0, 100), (10, 255, 255)), ((170, 255, 255), (180, 255, 255))]))
+    np.testing.assert_array_equal(FEATURE_COLORS.mask(labels, 5), _in_ranges(hsv, [((0, 0, 0), (180, 255, 50))]))
+
+
+def test_overlapping_pixel_belongs_to_every_matching_class():
+    classes = HSVColorClasses(OVERLAPPING)
+    # 橙色且明亮：同时属于暖色（第一个）、橙色和亮色；色相15不在第二个暖色范围内
+    labels = classes.classify(np.array([[[15, 200, 220]]], dtype=np.uint8))
+    masks = [classes.mask(labels, i) for i in range(4)]
+    assert all(mask.shape == (1, 1) for mask in masks)
+    assert [bool(mask[0, 0]) for mask in masks] == [True, True, True, False]
+
+
+@pytest.mark.parametrize('shape', [(1, 1), (2, 1), (4, 1), (1, 4), (5, 1)])
+def test_tiny_label_maps_keep_their_shape(shape):
+    hsv = np.full(shape + (3,), (5, 100, 100), dtype=np.uint8)
+    mask = DETECTION_COLORS.mask(DETECTION_COLORS.classify(hsv), 0)
+    assert mask.shape == shape and (mask == 255).all()
+
+
+def test_too_many_ranges_rejected():
+    with pytest.raises(ValueError):
+        HSVColorClasses([('c', [((i, 0, 0), (i, 255, 255))]) for i in range(HSVColorClasses.MAX_RANGES + 1)])
@@ -0,0 +1,105 @@
+"""图像上下文金字塔层选择和掩码映射回原图的测试"""
+import math
+
+import numpy as np
+import pytest
+
+from app.services.image_context import ImageContext, upscale_mask
+
+
+def _context(height, width):
+    rng = np.random.default_rng(height * 7 + width)
+    return ImageContext('test.png', rng.integers(0, 256, (height, width, 3), dtype=np.uint8))
+
+
+def test_pyramid_level_zero_or_small_image_is_original():
+    context = _context(300, 400)
+    assert context.pyramid_level(0) is context
+    assert context.pyramid_level(1024) is context
+    assert context.area_scale(0) == 1.0
+
+
+@pytest.mark.parametrize('height, width, max_side', [
+    (3000, 4000, 1024),
+    (1080, 1920, 1024),
+    (4000, 600, 800),
+    (1449, 1449, 1024),
+    (1450, 1200, 1024),
+    (5000, 5000, 640),
+])
+def test_pyramid_level_is_closest_halving(height, width, max_side):
+    context = _context(height, width)
+    level = context.pyramid_level(max_side)
+    long_side = max(level.height, level.width)
+
+    # 所选层不小于max_side的1/√2，再缩小一半则会小于该值
+    assert level is context or long_side >= max_side / math.sqrt(2)
+    assert long_side / 2 < max_side / math.sqrt(2)
+    assert level.area_scale(max_side) == pytest.approx((long_side / max_side) ** 2)
+
+    # 各层缓存复用，并各自缓存派生平面
+    assert context.pyramid_level(max_side) is level
+    assert level.gray.shape == (level.height, level.width)
+    assert level.gray is level.gray
+
+
+def test_upscale_mask_is_identity_on_original():
+    context = _context(100, 120)
+    mask = np.ones((10, 20), dtype=np.uint8)
+    assert upscale_mask(mask, (3, 4), context, context) == (mask, (3, 4))
+
+
+@pytest.mark.parametrize('height, width', [(3000, 4000), (1001, 1999), (777, 333)])
+def test_upscale_mask_maps_region_back_to_original(height, width):
+    original = _context(height, width)
+    level = original.pyramid_level(256)
+    assert level is not original
+    scale_x, scale_y = original.width / level.width, original.height / level.height
+
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        w, h = (int(v) for v in rng.integers(1, 40, 2))
+        x = int(rng.integers(0, level.width - w + 1))
+        y = int(rng.integers(0, level.height - h + 1))
+        mask = np.ones((h, w), dtype=np.uint8)
+        upscaled, (ox, oy) = upscale_mask(mask, (x, y), level, original)
+
+        uh, uw = upscaled.shape
+        assert (ox, oy) == (round(x * scale_x), round(y * scale_y))
+        assert ox + uw <= original.width and oy + uh <= original.height
+        assert abs(ox + uw - (x + w) * scale_x) <= 1 and abs(oy + uh - (y + h) * scale_y) <= 1
+        assert upscaled.all()
+
+
+def test_upscale_mask_keeps_mask_pattern():
+    original = _context(800, 800)
+    level = original.pyramid_level(200)
+    mask = np.zeros((level.height, level.width), dtype=np.uint8)
+    mask[50:100, 20:60] = 1
+    upscaled, offset = upscale_mask(mask, (0, 0), level, original)
+    assert offset == (0, 0) and upscaled.shape == (800, 800)
+    factor = 800 // level.width
+    assert np.array_equal(np.argwhere(upscaled)[[0, -1]],
+                          [[50 * factor, 20 * factor], [100 * factor - 1, 60 * factor - 1]])
+
+
+@pytest.mark.parametrize('analysis_size', [0, 512])
+def test_contour_mask_segmentation_runs_on_analysis_level(tmp_path, analysis_size):
+    from flask import Flask
+    from app.services.opencv_service import OpenCVService
+
+    image = np.zeros((1200, 1600, 3), dtype=np.uint8)
+    image[200:700, 200:700] = 200
+    context = ImageContext('test.png', image)
+    app = Flask(__name__)
+    app.config.update(GENERATED_FOLDER=str(tmp_path), OPENCV_ANALYSIS_SIZE=analysis_size)
+    with app.app_context():
+        segments = OpenCVService()._contour_mask_segmentation(context, 'test.png', 'obj', 'rle')
+
+    assert segments
+    # 缩小分析时阈值和轮廓只在分析层上计算，掩码映射回原图尺寸
+    assert ('adaptive' in context._planes) == (analysis_size == 0)
+    for segment in segments:
+        assert segment['rle']['size'] == [1200, 1600]
+        ymin, xmin, ymax, xmax = segment['bbox']
+        assert 0 <= ymin < ymax <= 1 and 0 <= xmin < xmax <= 1
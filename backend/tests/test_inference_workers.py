@@ -0,0 +1,151 @@
+"""多进程推理工作池的共享内存传输、结果打包和工作进程退出处理测试，不启动真实子进程"""
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pytest
+
+from app.services import inference_workers
+from app.services.inference_workers import (InferenceWorkerPool, SharedImage, _attached_images, _Worker,
+                                            pack_prediction, split_cpus, unpack_prediction)
+from app.services.yolo_prediction import YOLOPrediction
+
+
+class FakeProcess:
+    """工作进程的替身，可随时标记为已退出"""
+
+    def __init__(self):
+        self.alive = True
+        self.exitcode = None
+        self.pid = 1234
+
+    def is_alive(self):
+        return self.alive
+
+
+class FakeTaskQueue:
+    """收到任务时在当前线程中调用handler，模拟工作进程处理任务"""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.tasks = []
+
+    def put(self, task):
+        self.tasks.append(task)
+        self.handler(task)
+
+
+def _make_pool(handler, num_workers=1):
+    pool = InferenceWorkerPool(num_workers, timeout=5)
+    pool._workers = [_Worker(i, [0], FakeProcess(), FakeTaskQueue(handler)) for i in range(num_workers)]
+    pool.ready = True
+    return pool
+
+
+def _reply(pool, task_id, payload):
+    future = pool._futures.pop(task_id)
+    future['result'] = payload
+    future['event'].set()
+
+
+def test_split_cpus_covers_each_worker():
+    subsets = split_cpus(2, 1)
+    assert len(subsets) == 2
+    assert all(len(cpus) == 1 for cpus in subsets)
+
+
+def test_pack_prediction_round_trip():
+    masks = np.array([[[0.0, 0.5], [1.0, 0.25]]], dtype=np.float32)
+    prediction = YOLOPrediction(np.array([[1.0, 2.0, 3.0, 4.0]]), np.array([0.9]), np.array([3]), (20, 30),
+                                masks=masks, mask_extents=(10, 15))
+    data = pack_prediction(prediction)
+    assert data['masks'].dtype == np.uint8
+
+    restored = unpack_prediction(data)
+    assert np.array_equal(restored.boxes, prediction.boxes)
+    assert np.array_equal(restored.class_ids, prediction.class_ids)
+    assert restored.orig_shape == (20, 30) and restored.mask_extents == (10, 15)
+    # 掩码量化为uint8后误差不超过1/255
+    assert np.abs(restored.masks - masks).max() <= 1 / 255
+
+
+def test_pack_prediction_without_masks():
+    prediction = YOLOPrediction(np.zeros((0, 4)), np.zeros(0), np.zeros(0, dtype=int), (8, 8))
+    assert unpack_prediction(pack_prediction(prediction)).masks is None
+
+
+def test_shared_image_attach_and_release():
+    image = np.arange(2 * 3 * 3, dtype=np.uint8).reshape(2, 3, 3)
+    shared = SharedImage(image)
+    with _attached_images([shared.ref, shared.ref]) as images:
+        assert len(images) == 2
+        assert np.array_equal(images[0], image)
+        # 工作进程只读映射，不能修改父进程的图像
+        assert not images[0].flags.writeable
+    shared.release()
+    with pytest.raises(FileNotFoundError):
+        inference_workers.shared_memory.SharedMemory(name=shared.ref[0])
+
+
+def test_predict_returns_unpacked_results_and_releases_images():
+    received = {}
+
+    def handler(task):
+        task_id, kind, payload, refs = task
+        with _attached_images(refs) as images:
+            received['image'] = images[0].copy()
+        prediction = YOLOPrediction(np.zeros((1, 4)), np.array([0.8]), np.array([5]), images[0].shape)
+        _reply(pool, task_id, (True, [pack_prediction(prediction)]))
+
+    pool = _make_pool(handler)
+    image = np.full((4, 4, 3), 7, dtype=np.uint8)
+    results = pool.predict('yolo11n', 'torch', 'fp32', image, conf=0.5)
+
+    assert np.array_equal(received['image'], image)
+    assert list(results[0].class_ids) == [5]
+    task_id, kind, payload, refs = pool._workers[0].task_queue.tasks[0]
+    assert kind == 'yolo' and payload == ('yolo11n', 'torch', 'fp32', {'conf': 0.5})
+    # 任务完成后共享内存已释放
+    with pytest.raises(FileNotFoundError):
+        inference_workers.shared_memory.SharedMemory(name=refs[0])
+    assert pool._workers[0].pending == 0 and pool._workers[0].completed == 1
+
+
+def test_worker_error_is_raised_in_caller():
+    pool = _make_pool(lambda task: _reply(pool, task[0], (False, 'ValueError: 坏参数')))
+    with pytest.raises(RuntimeError, match='坏参数'):
+        pool.run_opencv('_detect_contours', np.zeros((4, 4, 3), dtype=np.uint8))
+
+
+def test_task_fails_fast_when_worker_exits(monkeypatch):
+    monkeypatch.setattr(inference_workers, '_LIVENESS_INTERVAL', 0.01)
+
+    def handler(task):
+        # 工作进程在处理任务时崩溃，不返回结果
+        worker.process.alive = False
+        worker.process.exitcode = -9
+
+    pool = _make_pool(handler)
+    worker = pool._workers[0]
+    with pytest.raises(BrokenProcessPool, match='退出码 -9'):
+        pool.predict('yolo11n', 'torch', 'fp32', np.zeros((4, 4, 3), dtype=np.uint8))
+
+    assert not pool.ready
+    assert pool._futures == {}
+    assert worker.pending == 0
+    refs = worker.task_queue.tasks[0][3]
+    with pytest.raises(FileNotFoundError):
+        inference_workers.shared_memory.SharedMemory(name=refs[0])
+
+    # 没有存活的工作进程时直接失败
+    with pytest.raises(BrokenProcessPool):
+        pool.get_names('yolo11n', 'torch', 'fp32')
+
+
+def test_tasks_go_to_least_loaded_live_worker():
+    pool = _make_pool(lambda task: _reply(pool, task[0], (True, {0: 'person'})), num_workers=2)
+    pool._workers[0].process.alive = False
+    assert pool.get_names('yolo11n', 'torch', 'fp32') == {0: 'person'}
+    assert pool._workers[1].completed == 1 and pool._workers[0].completed == 0
+    # 类别名称缓存后不再提交任务
+    pool.get_names('yolo11n', 'torch', 'fp32')
+    assert pool._workers[1].completed == 1
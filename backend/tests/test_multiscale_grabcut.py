@@ -0,0 +1,89 @@
+"""多尺度GrabCut的测试：低分辨率求解加窄带细化的结果与目标一致，窄带以外沿用低分辨率结果"""
+import cv2
+import numpy as np
+import pytest
+
+from app.services import multiscale_grabcut
+from app.services.multiscale_grabcut import segment_box, segment_boxes
+
+
+def _scene(seed=0, height=600, width=800):
+    """噪声背景上的一个起伏边界椭圆目标，返回 (图像, 目标掩码)"""
+    rng = np.random.default_rng(seed)
+    image = (rng.normal(0, 15, (height, width, 3)) + [60, 120, 60]).clip(0, 255).astype(np.uint8)
+    yy, xx = np.mgrid[:height, :width]
+    target = (((yy - height / 2) / (height * 0.3)) ** 2 + ((xx - width / 2) / (width * 0.3)) ** 2 +
+              0.15 * np.sin(xx / 15) * np.cos(yy / 20)) < 1
+    image[target] = (rng.normal(0, 15, (int(target.sum()), 3)) + [150, 70, 170]).clip(0, 255).astype(np.uint8)
+    return image, target
+
+
+def _paste(mask, offset, shape):
+    full = np.zeros(shape[:2], dtype=bool)
+    x, y = offset
+    full[y:y + mask.shape[0], x:x + mask.shape[1]] = mask > 0
+    return full
+
+
+def _iou(a, b):
+    return np.logical_and(a, b).sum() / np.logical_or(a, b).sum()
+
+
+BOX = (140, 110, 660, 490)
+
+
+def test_full_resolution_solve_when_level_is_original():
+    image, target = _scene()
+    mask, offset = segment_box(image, image, BOX)
+    assert _iou(_paste(mask, offset, image.shape), target) > 0.97
+
+
+def test_multiscale_solve_refines_coarse_boundary():
+    image, target = _scene(1)
+    level = cv2.pyrDown(cv2.pyrDown(image))
+    mask, offset = segment_box(image, level, BOX, band_width=6)
+    result = _paste(mask, offset, image.shape)
+    assert _iou(result, target) > 0.97
+
+    # 细化后的边界比直接放大的低分辨率结果更接近目标
+    original_refine = multiscale_grabcut._refine_band
+    try:
+        multiscale_grabcut._refine_band = lambda roi, labels, band: multiscale_grabcut._foreground(labels)
+        coarse, coarse_offset = segment_box(image, level, BOX, band_width=6)
+    finally:
+        multiscale_grabcut._refine_band = original_refine
+    assert _iou(result, target) > _iou(_paste(coarse, coarse_offset, image.shape), target)
+
+
+def test_refine_band_only_changes_band_pixels():
+    image, target = _scene(2)
+    labels = np.where(target, cv2.GC_FGD, cv2.GC_BGD).astype(np.uint8)
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (13, 13))
+    band = cv2.morphologyEx(target.astype(np.uint8), cv2.MORPH_GRADIENT, kernel) > 0
+    # 故意把窄带内的标签设为相反的可能值，细化应按颜色纠正
+    labels[band] = np.where(target[band], cv2.GC_PR_BGD, cv2.GC_PR_FGD)
+
+    result = multiscale_grabcut._refine_band(image, labels, band).astype(bool)
+    np.testing.assert_array_equal(result[~band], target[~band])
+    assert np.mean(result[band] == target[band]) > 0.95
+
+
+def test_refine_band_skips_blocks_without_both_classes():
+    image, _ = _scene(3, 256, 256)
+    labels = np.full((256, 256), cv2.GC_BGD, dtype=np.uint8)
+    band = np.zeros((256, 256), dtype=bool)
+    band[10:20, 10:20] = True
+    labels[band] = cv2.GC_PR_BGD
+    assert not multiscale_grabcut._refine_band(image, labels, band).any()
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_segment_boxes_keeps_box_order(workers):
+    image, target = _scene(4)
+    level = cv2.pyrDown(image)
+    boxes = [BOX, (0, 0, 60, 60), (600, 400, 790, 590)]
+    results = segment_boxes(image, level, boxes, band_width=6, workers=workers)
+    margin = multiscale_grabcut.ROI_MARGIN
+    assert [offset for _, offset in results] == [
+        (max(0, x1 - int((x2 - x1) * margin)), max(0, y1 - int((y2 - y1) * margin))) for x1, y1, x2, y2 in boxes]
+    assert _iou(_paste(*results[0], image.shape), target) > 0.97
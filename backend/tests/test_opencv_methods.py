@@ -0,0 +1,105 @@
+"""OpenCV多方法一次执行的测试：method参数解析、中间平面共享和单个方法失败隔离"""
+from collections import Counter
+
+import numpy as np
+import pytest
+from flask import Flask
+
+from app.services import image_context
+from app.services.image_context import ImageContext
+from app.services.opencv_service import DETECTION_METHODS, SEGMENTATION_METHODS, OpenCVService
+
+
+@pytest.fixture
+def service(tmp_path):
+    app = Flask(__name__)
+    app.config.update(GENERATED_FOLDER=str(tmp_path), OPENCV_KMEANS_K=2)
+    with app.app_context():
+        yield OpenCVService()
+
+
+@pytest.fixture
+def plane_builds(monkeypatch):
+    """记录每个图像上下文中各派生平面的计算次数"""
+    builds = Counter()
+
+    def counting(name, build):
+        def wrapper(context):
+            builds[(id(context), name)] += 1
+            return build(context)
+        return wrapper
+
+    builders = {name: counting(name, build) for name, build in image_context._PLANE_BUILDERS.items()}
+    monkeypatch.setattr(image_context, '_PLANE_BUILDERS', builders)
+    return builds
+
+
+def _image():
+    image = np.full((160, 200, 3), 230, dtype=np.uint8)
+    image[30:90, 40:120] = (30, 40, 200)
+    image[100:150, 130:190] = (200, 60, 20)
+    return image
+
+
+@pytest.mark.parametrize('method, expected', [
+    ('contour', None),
+    ('all', list(DETECTION_METHODS)),
+    ('edge, color', ['edge', 'color']),
+    (['color', 'edge', 'color'], ['color', 'edge']),
+    ('contour,all', ['contour', 'haar', 'color', 'edge']),
+])
+def test_parse_detection_methods(service, method, expected):
+    assert service._parse_methods(method, DETECTION_METHODS) == expected
+
+
+def test_parse_methods_all_uses_applicable_methods(service):
+    applicable = [name for name in DETECTION_METHODS if name != 'haar']
+    assert service._parse_methods('all', DETECTION_METHODS, applicable) == applicable
+    # 显式指定的方法不受all_methods限制
+    assert service._parse_methods('haar,all', DETECTION_METHODS, applicable) == ['haar'] + applicable
+
+
+@pytest.mark.parametrize('method, message', [
+    ('kmeans,sift', '不支持的OpenCV方法: sift'),
+    (' , ', '未指定OpenCV方法'),
+    ([], '未指定OpenCV方法'),
+])
+def test_parse_methods_rejects_invalid(service, method, message):
+    with pytest.raises(ValueError, match=message):
+        service._parse_methods(method, SEGMENTATION_METHODS)
+
+
+def test_haar_applicable_only_for_faces():
+    assert OpenCVService._haar_applicable('')
+    assert OpenCVService._haar_applicable('人脸')
+    assert OpenCVService._haar_applicable('Face')
+    assert not OpenCVService._haar_applicable('汽车')
+
+
+def test_detect_methods_share_planes(service, plane_builds):
+    context = ImageContext('test.png', _image())
+    results, errors = service._detect_methods(context, DETECTION_METHODS, '对象')
+
+    assert errors == {}
+    assert set(results) == set(DETECTION_METHODS)
+    assert plane_builds and max(plane_builds.values()) == 1
+
+
+def test_segment_methods_share_planes(service, plane_builds):
+    context = ImageContext('test.png', _image())
+    results, errors = service._segment_methods(context, 'test.png', SEGMENTATION_METHODS, '对象', 'rle')
+
+    assert errors == {}
+    assert set(results) == set(SEGMENTATION_METHODS)
+    assert plane_builds and max(plane_builds.values()) == 1
+
+
+def test_failed_method_does_not_stop_others(service, monkeypatch):
+    def broken(context, object_name):
+        raise RuntimeError('颜色空间错误')
+
+    monkeypatch.setattr(service, '_detect_by_color', broken)
+    results, errors = service._detect_methods(ImageContext('test.png', _image()), ['contour', 'color', 'edge'])
+
+    assert set(results) == {'contour', 'edge'}
+    assert list(errors) == ['color'] and '颜色空间错误' in errors['color']
@@ -0,0 +1,145 @@
+"""分析结果缓存的键和失效检查测试"""
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.result_cache import ResultCache
+
+
+@pytest.fixture
+def folders(tmp_path):
+    paths = {name: tmp_path / name for name in ('uploads', 'generated', 'cache')}
+    for path in paths.values():
+        path.mkdir()
+    return paths
+
+
+def _make_cache(folders, **overrides):
+    config = {
+        'RESULT_CACHE_ENABLED': True,
+        'RESULT_CACHE_MEMORY_ITEMS': 16,
+        'RESULT_CACHE_DISK_MB': 1,
+        'RESULT_CACHE_FOLDER': str(folders['cache']),
+        'UPLOAD_FOLDER': str(folders['uploads']),
+        'GENERATED_FOLDER': str(folders['generated'])
+    }
+    config.update(overrides)
+    cache = ResultCache()
+    cache.init_app(SimpleNamespace(config=config))
+    return cache
+
+
+def _write(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+    return str(path)
+
+
+def test_key_depends_on_content_namespace_and_params(folders):
+    cache = _make_cache(folders)
+    first = _write(folders['uploads'] / 'a.jpg', b'image-a')
+    copy = _write(folders['uploads'] / 'copy.jpg', b'image-a')
+    other = _write(folders['uploads'] / 'b.jpg', b'image-b')
+
+    key = cache.make_key('yolo_detection', image_path=first, confidence=0.5, settings={'YOLO_IMGSZ': '640'})
+    assert key == cache.make_key('yolo_detection', image_path=copy, confidence=0.5, settings={'YOLO_IMGSZ': '640'})
+    assert key != cache.make_key('yolo_detection', image_path=other, confidence=0.5, settings={'YOLO_IMGSZ': '640'})
+    assert key != cache.make_key('yolo_segmentation', image_path=first, confidence=0.5, settings={'YOLO_IMGSZ': '640'})
+    assert key != cache.make_key('yolo_detection', image_path=first, confidence=0.5, settings={'YOLO_IMGSZ': 'auto'})
+
+
+def test_disabled_cache_or_missing_image_has_no_key(folders):
+    image = _write(folders['uploads'] / 'a.jpg', b'image-a')
+    assert _make_cache(folders, RESULT_CACHE_ENABLED=False).make_key('ns', image_path=image) is None
+    assert _make_cache(folders).make_key('ns', image_path=str(folders['uploads'] / 'missing.jpg')) is None
+
+
+def test_result_is_stale_when_generated_file_changes(folders):
+    cache = _make_cache(folders)
+    image = _write(folders['uploads'] / 'a.jpg', b'image-a')
+    _write(folders['generated'] / 'summary.jpg', b'summary')
+    result = {'success': True, 'summary_image': '/storage/generated/summary.jpg'}
+    key = cache.make_key('yolo_detection', image_path=image)
+
+    cache.set(key, result)
+    assert cache.get(key) == result
+
+    # 生成的文件被覆盖后，缓存的结果不再可用，并从两层中删除
+    _write(folders['generated'] / 'summary.jpg', b'another summary')
+    assert cache.get(key) is None
+    assert cache.stale == 1
+    assert not os.listdir(folders['cache'])
+    assert cache.get(key) is None
+
+
+def test_result_is_stale_when_generated_file_is_deleted(folders):
+    cache = _make_cache(folders)
+    image = _write(folders['uploads'] / 'a.jpg', b'image-a')
+    segment = _write(folders['generated'] / 'segment.png', b'segment')
+    key = cache.make_key('opencv_segmentation', image_path=image)
+
+    cache.set(key, {'success': True, 'segments': [{'segment_image': segment}]})
+    os.remove(segment)
+    assert cache.get(key) is None
+    assert cache.stale == 1
+
+
+def test_disk_tier_survives_restart_and_is_validated(folders):
+    image = _write(folders['uploads'] / 'a.jpg', b'image-a')
+    _write(folders['generated'] / 'summary.jpg', b'summary')
+    result = {'success': True, 'summary_image': '/storage/generated/summary.jpg'}
+    cache = _make_cache(folders)
+    key = cache.make_key('yolo_detection', image_path=image)
+    cache.set(key, result)
+
+    # 新进程只能从磁盘层读取
+    restarted = _make_cache(folders)
+    assert restarted.get(key) == result
+    assert restarted.disk_hits == 1
+
+    restarted = _make_cache(folders)
+    _write(folders['generated'] / 'summary.jpg', b'changed')
+    assert restarted.get(key) is None
+    assert restarted.stale == 1
+
+
+def test_yolo_settings_resolve_request_defaults():
+    from flask import Flask
+    from app.services.yolo_model_registry import YOLOModelRegistry
+
+    app = Flask(__name__)
+    app.config.update(YOLO_IMGSZ='640', YOLO_LATENCY_BUDGET_MS=250)
+    registry = YOLOModelRegistry()
+    with app.app_context():
+        implicit = registry.result_settings()
+        assert implicit == registry.result_settings('torch', 'fp32')
+        assert implicit['backend'] == 'torch' and implicit['precision'] == 'fp32'
+        assert registry.result_settings(precision='int8')['backend'] == 'onnx'
+
+        # 默认配置或推理设置改变后，缓存键中的有效配置随之改变
+        registry.default_backend = 'onnx'
+        assert registry.result_settings() != implicit
+        registry.default_backend = 'torch'
+        app.config['YOLO_IMGSZ'] = 'auto'
+        assert registry.result_settings() != implicit
+
+
+def test_opencv_settings_include_yolo_settings(monkeypatch):
+    from flask import Flask
+    from app.services.opencv_service import OpenCVService
+    from app.services.yolo_model_registry import model_registry
+
+    app = Flask(__name__)
+    app.config.update(OPENCV_ANALYSIS_SIZE=0, YOLO_IMGSZ='640')
+    service = OpenCVService()
+    with app.app_context():
+        settings = service._analysis_settings()
+        assert settings['OPENCV_ANALYSIS_SIZE'] == 0 and settings['backend'] == 'torch'
+
+        # YOLO内容验证和种子框的配置改变时OpenCV结果也不能复用
+        app.config['YOLO_IMGSZ'] = 'auto'
+        assert service._analysis_settings() != settings
+        app.config['YOLO_IMGSZ'] = '640'
+        monkeypatch.setattr(model_registry, 'default_backend', 'onnx')
+        assert service._analysis_settings() != settings
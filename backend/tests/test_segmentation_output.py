@@ -0,0 +1,135 @@
+"""分割结果RLE和多边形编码的测试"""
+import cv2
+import numpy as np
+import pytest
+
+from app.services.segmentation_output import encode_polygons, encode_rle
+
+
+def _decode_rle(rle):
+    """按COCO (pycocotools) 规则解码压缩RLE，返回原图大小的二值掩码"""
+    string = rle['counts']
+    counts = []
+    position = 0
+    while position < len(string):
+        value, shift, more = 0, 0, True
+        while more:
+            c = ord(string[position]) - 48
+            value |= (c & 0x1f) << shift
+            more = bool(c & 0x20)
+            position += 1
+            shift += 5
+            if not more and c & 0x10:
+                value |= -1 << shift
+        if len(counts) > 2:
+            value += counts[-2]
+        counts.append(value)
+
+    height, width = rle['size']
+    flat = np.zeros(height * width, dtype=bool)
+    index = 0
+    for i, count in enumerate(counts):
+        assert count >= 0
+        if i % 2:
+            flat[index:index + count] = True
+        index += count
+    assert index == height * width
+    return flat.reshape((height, width), order='F')
+
+
+def _random_mask(rng, height, width):
+    kind = rng.integers(3)
+    if kind == 0:
+        return rng.random((height, width)) < rng.uniform(0.05, 0.95)
+    if kind == 1:
+        mask = np.zeros((height, width), dtype=np.uint8)
+        for _ in range(int(rng.integers(1, 5))):
+            center = (int(rng.integers(width)), int(rng.integers(height)))
+            axes = (int(rng.integers(1, width + 1)), int(rng.integers(1, height + 1)))
+            cv2.ellipse(mask, center, axes, float(rng.uniform(0, 180)), 0, 360, 1, -1)
+        return mask > 0
+    # 整列为前景，验证相邻列首尾相接的前景段被合并
+    mask = np.zeros((height, width), dtype=bool)
+    mask[:, rng.integers(width):] = True
+    return mask
+
+
+def test_encode_rle_round_trips_random_crops():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        height, width = (int(v) for v in rng.integers(1, 80, 2))
+        full = rng.random() < 0.3
+        h = height if full else int(rng.integers(1, height + 1))
+        w = int(rng.integers(1, width + 1))
+        x0, y0 = int(rng.integers(width - w + 1)), 0 if full else int(rng.integers(height - h + 1))
+        crop = _random_mask(rng, h, w)
+
+        rle = encode_rle(crop, (x0, y0), (height, width, 3))
+        expected = np.zeros((height, width), dtype=bool)
+        expected[y0:y0 + h, x0:x0 + w] = crop
+        assert rle['size'] == [height, width]
+        np.testing.assert_array_equal(_decode_rle(rle), expected)
+
+
+def test_encode_rle_matches_coco_strings():
+    # 按列优先的游程 [4, 1, 2, 1, 1, 1, 2]，第3个之后的游程与前第2个做差分，-1编码为'O'
+    mask = np.zeros((3, 4), dtype=np.uint8)
+    mask[1, 1:3] = 1
+    mask[0, 3] = 1
+    assert encode_rle(mask) == {'size': [3, 4], 'counts': '4120O01'}
+    assert encode_rle(np.array([[0], [1], [1], [0]])) == {'size': [4, 1], 'counts': '121'}
+
+
+def test_encode_rle_whole_image_and_empty_mask():
+    mask = np.zeros((7, 5), dtype=np.uint8)
+    assert _decode_rle(encode_rle(mask)).sum() == 0
+    mask[:] = 255
+    assert _decode_rle(encode_rle(mask)).all()
+
+
+def test_encode_polygons_rectangle_at_offset():
+    mask = np.zeros((40, 60), dtype=np.uint8)
+    mask[10:30, 5:50] = 1
+    polygons = encode_polygons(mask, offset=(100, 200))
+    assert len(polygons) == 1
+    points = np.asarray(polygons[0]).reshape(-1, 2)
+    assert sorted(map(tuple, points.tolist())) == [(105, 210), (105, 229), (149, 210), (149, 229)]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_encode_polygons_approximates_blobs(seed):
+    rng = np.random.default_rng(seed)
+    mask = np.zeros((300, 400), dtype=np.uint8)
+    cv2.circle(mask, (120, 150), 80, 1, -1)
+    cv2.ellipse(mask, (300, 100), (60, 30), float(rng.uniform(0, 180)), 0, 360, 1, -1)
+    polygons = encode_polygons(mask)
+    assert len(polygons) == 2
+
+    # 多边形栅格化后与原掩码基本一致
+    rendered = np.zeros_like(mask)
+    cv2.fillPoly(rendered, [np.asarray(p, dtype=np.int32).reshape(-1, 2) for p in polygons], 1)
+    intersection = np.logical_and(rendered, mask).sum()
+    union = np.logical_or(rendered, mask).sum()
+    assert intersection / union > 0.95
+
+
+@pytest.mark.parametrize('mode, analysis_size', [('full', 0), ('full', 64), ('histogram', 64)])
+def test_kmeans_segment_bbox_matches_mask(tmp_path, mode, analysis_size):
+    from flask import Flask
+    from app.services.image_context import ImageContext
+    from app.services.opencv_service import OpenCVService
+
+    image = np.full((256, 256, 3), 200, dtype=np.uint8)
+    image[32:128, 64:192] = (20, 30, 220)
+    app = Flask(__name__)
+    app.config.update(GENERATED_FOLDER=str(tmp_path), OPENCV_KMEANS_MODE=mode, OPENCV_KMEANS_K=2,
+                      OPENCV_ANALYSIS_SIZE=analysis_size)
+    with app.app_context():
+        segments = OpenCVService()._kmeans_segmentation(ImageContext('test.png', image), 'test.png', 'rle')
+
+    assert len(segments) == 2
+    for segment in segments:
+        ys, xs = np.nonzero(_decode_rle(segment['rle']))
+        expected = [ys.min() / 256, xs.min() / 256, (ys.max() + 1) / 256, (xs.max() + 1) / 256]
+        assert segment['bbox'] == pytest.approx(expected, abs=2 / 256)
+    assert sorted(segment['bbox'] for segment in segments)[-1] == pytest.approx([0.125, 0.25, 0.5, 0.75], abs=2 / 256)
@@ -0,0 +1,113 @@
+"""计算名额并发限制和limit_concurrency装饰器测试"""
+import threading
+import time
+
+import pytest
+
+from app.services import thread_budget as thread_budget_module
+from app.services.thread_budget import ThreadBudget, limit_concurrency
+from app.services.yolo_model_registry import model_registry
+
+
+@pytest.fixture
+def budget(monkeypatch):
+    """替换进程级线程预算，避免测试修改全局配置"""
+    for name in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+        monkeypatch.setenv(name, '1')
+    monkeypatch.setattr(model_registry, 'intra_op_threads', model_registry.intra_op_threads)
+    budget = ThreadBudget()
+    monkeypatch.setattr(thread_budget_module, 'thread_budget', budget)
+    return budget
+
+
+def test_compute_slots_limit_concurrent_requests(budget):
+    budget.configure(request_concurrency=2)
+    lock = threading.Lock()
+    running = []
+    peak = []
+
+    @limit_concurrency
+    def work():
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        time.sleep(0.02)
+        with lock:
+            running.pop()
+
+    threads = [threading.Thread(target=work) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert max(peak) == 2
+    assert budget.active_requests == 0 and budget.waiting_requests == 0
+
+
+def test_nested_calls_take_one_slot(budget):
+    budget.configure(request_concurrency=1)
+
+    @limit_concurrency
+    def inner():
+        return budget.active_requests
+
+    @limit_concurrency
+    def outer():
+        return inner()
+
+    # 名额只有一个时嵌套调用不能死锁
+    assert outer() == 1
+    assert budget.active_requests == 0
+
+
+def test_generator_holds_slot_only_while_computing_items(budget):
+    budget.configure(request_concurrency=1)
+    active_inside = []
+    closed = []
+
+    @limit_concurrency
+    def stream():
+        try:
+            for i in range(3):
+                active_inside.append(budget.active_requests)
+                yield i
+        finally:
+            closed.append(True)
+
+    @limit_concurrency
+    def single():
+        return 'done'
+
+    items = stream()
+    assert next(items) == 0
+    # 产出后名额已释放，消费方暂停期间其他请求可以计算
+    assert budget.active_requests == 0
+    result = []
+    thread = threading.Thread(target=lambda: result.append(single()))
+    thread.start()
+    thread.join(timeout=5)
+    assert result == ['done']
+
+    assert list(items) == [1, 2]
+    assert active_inside == [1, 1, 1]
+    assert closed == [True]
+
+
+def test_closing_generator_early_runs_cleanup(budget):
+    budget.configure(request_concurrency=1)
+    closed = []
+
+    @limit_concurrency
+    def stream():
+        try:
+            yield 1
+            yield 2
+        finally:
+            closed.append(budget.active_requests)
+
+    items = stream()
+    next(items)
+    items.close()
+    assert closed == [0]
+    assert budget.active_requests == 0
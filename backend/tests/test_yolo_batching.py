@@ -0,0 +1,135 @@
+"""动态微批调度器的分组、按请求过滤和错误传递测试，使用记录调用的假模型"""
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pytest
+
+from app.services.yolo_batching import MicroBatchScheduler
+from app.services.yolo_prediction import YOLOPrediction
+
+
+class FakeModel:
+    """每张图像返回分数为0.2/0.5/0.9的三个检测框，类别ID为图像的像素值"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, images, conf=0.25, **options):
+        with self.lock:
+            self.calls.append({'size': len(images), 'conf': conf, 'options': options})
+        if self.fail:
+            raise RuntimeError('推理失败')
+        results = []
+        for image in images:
+            scores = np.array([0.2, 0.5, 0.9])
+            keep = scores >= conf
+            results.append(YOLOPrediction(np.zeros((3, 4))[keep], scores[keep],
+                                          np.full(3, int(image[0, 0, 0]))[keep], image.shape))
+        return results
+
+
+class FakeEntry:
+    """模型注册表条目的替身，只提供调度器使用的接口"""
+
+    def __init__(self, model, max_replicas=1):
+        self.name = 'fake'
+        self.model = model
+        self.max_replicas = max_replicas
+
+    @contextmanager
+    def acquire(self):
+        yield self.model
+
+
+def _image(value):
+    return np.full((4, 4, 3), value, dtype=np.uint8)
+
+
+def _submit_concurrently(scheduler, requests):
+    """同时提交多个 (图像值, 置信度, 选项) 请求，按提交顺序返回结果或异常"""
+    results = [None] * len(requests)
+    barrier = threading.Barrier(len(requests))
+
+    def run(index, value, conf, options):
+        barrier.wait()
+        try:
+            results[index] = scheduler.submit(_image(value), conf=conf, **options)
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=run, args=(i,) + request) for i, request in enumerate(requests)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    return results
+
+
+def test_concurrent_requests_share_one_batch():
+    model = FakeModel()
+    scheduler = MicroBatchScheduler(FakeEntry(model), window_ms=200, max_batch_size=8)
+    results = _submit_concurrently(scheduler, [(value, 0.25, {}) for value in range(4)])
+    scheduler.close()
+
+    assert [call['size'] for call in model.calls] == [4]
+    # 每个请求拿回自己图像的结果
+    for value, result in enumerate(results):
+        assert len(result) == 1 and set(result[0].class_ids) == {value}
+    stats = scheduler.get_stats()
+    assert stats['total_requests'] == 4 and stats['total_batches'] == 1
+    assert stats['batch_size_histogram'] == {'4': 1}
+
+
+def test_batch_runs_at_lowest_confidence_and_filters_per_request():
+    model = FakeModel()
+    scheduler = MicroBatchScheduler(FakeEntry(model), window_ms=200, max_batch_size=8)
+    low, high = _submit_concurrently(scheduler, [(1, 0.1, {}), (2, 0.6, {})])
+    scheduler.close()
+
+    assert [call['conf'] for call in model.calls] == [0.1]
+    assert sorted(low[0].scores) == pytest.approx([0.2, 0.5, 0.9])
+    assert list(high[0].scores) == pytest.approx([0.9])
+
+
+def test_requests_with_different_options_are_not_merged():
+    model = FakeModel()
+    scheduler = MicroBatchScheduler(FakeEntry(model), window_ms=200, max_batch_size=8)
+    results = _submit_concurrently(scheduler, [(1, 0.25, {'imgsz': 640}), (2, 0.25, {'imgsz': 640}),
+                                               (3, 0.25, {'imgsz': 320}), (4, 0.25, {'classes': [4]})])
+    scheduler.close()
+
+    assert sorted(call['size'] for call in model.calls) == [1, 1, 2]
+    assert sorted(tuple(sorted(call['options'].items())) for call in model.calls) == [
+        (('classes', [4]),), (('imgsz', 320),), (('imgsz', 640),)]
+    assert all(set(result[0].class_ids) == {value} for value, result in zip((1, 2, 3, 4), results))
+
+
+def test_max_batch_size_splits_batches():
+    model = FakeModel()
+    scheduler = MicroBatchScheduler(FakeEntry(model), window_ms=200, max_batch_size=2)
+    _submit_concurrently(scheduler, [(value, 0.25, {}) for value in range(5)])
+    scheduler.close()
+
+    assert all(call['size'] <= 2 for call in model.calls)
+    assert sum(call['size'] for call in model.calls) == 5
+
+
+def test_model_error_is_raised_in_every_request():
+    scheduler = MicroBatchScheduler(FakeEntry(FakeModel(fail=True)), window_ms=200, max_batch_size=8)
+    results = _submit_concurrently(scheduler, [(1, 0.25, {}), (2, 0.25, {})])
+    scheduler.close()
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_closed_scheduler_runs_requests_directly():
+    model = FakeModel()
+    scheduler = MicroBatchScheduler(FakeEntry(model), window_ms=10, max_batch_size=8)
+    scheduler.close()
+
+    result = scheduler.submit(_image(7), conf=0.6)
+    assert set(result[0].class_ids) == {7}
+    assert scheduler.get_stats()['total_batches'] == 0
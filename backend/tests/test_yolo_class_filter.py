@@ -0,0 +1,130 @@
+"""按查询类别过滤推理的测试：类别ID传入推理后端，未检测到查询类别时才以全部类别推理"""
+import base64
+
+import cv2
+import numpy as np
+import pytest
+from flask import Flask
+
+from app.services.yolo_detection_service import YOLODetectionService
+from app.services.yolo_prediction import YOLOPrediction
+from app.services.yolo_segmentation_service import YOLOSegmentationService
+
+
+NAMES = {0: 'person', 15: 'cat', 16: 'dog'}
+
+
+class FakeModel:
+    """记录每次推理参数的模型句柄，只返回classes允许的预设检测结果"""
+
+    backend = 'torch'
+    precision = 'fp32'
+    names = NAMES
+
+    def __init__(self, detections, with_masks=False):
+        # (类别ID, 置信度, x1, y1, x2, y2)
+        self.detections = detections
+        self.with_masks = with_masks
+        self.calls = []
+
+    def predict(self, image, conf=0.25, imgsz=None, classes=None):
+        self.calls.append({'conf': conf, 'imgsz': imgsz, 'classes': classes})
+        images = image if isinstance(image, list) else [image]
+        return [self._predict_one(img, conf, classes) for img in images]
+
+    def _predict_one(self, image, conf, classes):
+        rows = [row for row in self.detections if row[1] >= conf and (classes is None or row[0] in classes)]
+        masks = None
+        if self.with_masks:
+            masks = np.zeros((len(rows),) + image.shape[:2], dtype=np.float32)
+            for mask, row in zip(masks, rows):
+                x1, y1, x2, y2 = row[2:]
+                mask[y1:y2, x1:x2] = 1.0
+        return YOLOPrediction([row[2:] for row in rows], [row[1] for row in rows], [row[0] for row in rows],
+                              image.shape, masks)
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config.update(GENERATED_FOLDER=str(tmp_path), UPLOAD_FOLDER=str(tmp_path), YOLO_IMGSZ=64)
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def image_path(tmp_path):
+    path = str(tmp_path / 'image.jpg')
+    cv2.imwrite(path, np.full((64, 64, 3), 128, dtype=np.uint8))
+    return path
+
+
+def _detect(model, image_path, user_query):
+    service = YOLODetectionService()
+    service.load_model = lambda *args, **kwargs: model
+    return service._detect_objects(image_path, 'yolo11n', 0.5, user_query, True, None, None, None, False)
+
+
+def test_detection_passes_query_classes_to_backend(app, image_path):
+    model = FakeModel([(16, 0.9, 8, 8, 40, 40), (15, 0.9, 20, 20, 60, 60)])
+    result = _detect(model, image_path, 'dog')
+
+    assert [call['classes'] for call in model.calls] == [[16]]
+    assert result['success']
+    assert [obj['label'] for obj in result['detected_objects']] == ['dog']
+
+
+def test_detection_without_query_is_unfiltered(app, image_path):
+    model = FakeModel([(16, 0.9, 8, 8, 40, 40), (15, 0.9, 20, 20, 60, 60)])
+    result = _detect(model, image_path, None)
+
+    assert [call['classes'] for call in model.calls] == [None]
+    assert result['total_objects'] == 2
+
+
+def test_detection_falls_back_to_all_classes_for_mismatch(app, image_path):
+    model = FakeModel([(15, 0.9, 20, 20, 60, 60)])
+    result = _detect(model, image_path, 'dog')
+
+    # 过滤推理没有结果时才以全部类别推理一次，给出图像中实际的对象
+    assert [call['classes'] for call in model.calls] == [[16], None]
+    assert not result['success']
+    assert result['alternative_queries'] == ['cat']
+    assert [obj['class_name'] for obj in result['detected_objects']] == ['cat']
+
+
+def test_batch_detection_passes_query_classes_to_backend(app, image_path):
+    model = FakeModel([(16, 0.9, 8, 8, 40, 40), (0, 0.9, 20, 20, 60, 60)])
+    service = YOLODetectionService()
+    service.load_model = lambda *args, **kwargs: model
+    results = list(service.detect_objects_batch([image_path, image_path], user_query='狗', batch_size=2))
+
+    assert [call['classes'] for call in model.calls] == [[16]]
+    assert [result['detected_objects'][0]['label'] for _, result in results] == ['dog', 'dog']
+
+
+def test_segmentation_passes_query_classes_to_backend(app, image_path):
+    model = FakeModel([(16, 0.9, 8, 8, 40, 40), (15, 0.9, 20, 20, 60, 60)], with_masks=True)
+    service = YOLOSegmentationService()
+    service.load_model = lambda *args, **kwargs: model
+    with open(image_path, 'rb') as f:
+        image_data = base64.b64encode(f.read()).decode()
+    result, status_code = service._segment_image_yolo(None, image_data, 'yolo11n-seg', 0.5, 'dog', True,
+                                                      None, None, None, False, 'rle')
+
+    assert status_code == 200 and result['success']
+    assert [call['classes'] for call in model.calls] == [[16]]
+    assert [obj['class_name'] for obj in result['segmented_objects']] == ['dog']
+
+
+def test_segmentation_falls_back_to_all_classes_for_mismatch(app, image_path):
+    model = FakeModel([(15, 0.9, 20, 20, 60, 60)], with_masks=True)
+    service = YOLOSegmentationService()
+    image = cv2.imread(image_path)
+    results = service._predict(model, image, 0.3, 64, classes=[16])
+    result, _ = service._build_segmentation_response(
+        image_path, image, results, model, 'yolo11n-seg', 0.5, 'dog', 64, False, 'rle', classes=[16])
+
+    assert [call['classes'] for call in model.calls] == [[16], None]
+    assert result['content_mismatch']
+    assert [obj['class_name'] for obj in result['detected_objects']] == ['cat']
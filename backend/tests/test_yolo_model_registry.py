@@ -0,0 +1,146 @@
+"""模型注册表的预加载就绪状态和LRU逐出测试，使用桩模型代替真实权重"""
+import pytest
+
+from app.services.yolo_model_registry import YOLOModelRegistry
+
+
+class StubReplica:
+    """只记录调用的模型副本，内存占用固定"""
+
+    names = {0: 'person'}
+
+    def __init__(self, size_mb=10):
+        self.size_mb = size_mb
+        self.calls = 0
+
+    def memory_bytes(self):
+        return self.size_mb * 1024 * 1024
+
+    def __call__(self, image, **kwargs):
+        self.calls += 1
+        return []
+
+
+def _make_registry(fail=()):
+    """fail中的模型加载时抛出异常，可在测试中修改"""
+    registry = YOLOModelRegistry()
+    registry.failing = set(fail)
+
+    def load_backend(model_name, backend, precision='fp32'):
+        if model_name in registry.failing:
+            raise RuntimeError(f'{model_name} 下载失败')
+        return StubReplica()
+
+    registry._load_backend = load_backend
+    return registry
+
+
+def test_all_preloads_succeed():
+    registry = _make_registry()
+    registry.preload(['yolo11n', 'yolo11n-seg'])
+    assert registry.is_ready()
+    assert registry.preload_state == 'ready'
+    assert registry.preload_models == {'yolo11n': 'ready', 'yolo11n-seg': 'ready'}
+    assert registry.get_cache_stats()['pinned_models'] == ['yolo11n', 'yolo11n-seg']
+
+
+def test_optional_preload_failure_is_degraded_but_ready():
+    registry = _make_registry(fail={'yolo11x'})
+    registry.preload(['yolo11n', 'yolo11x'])
+    assert registry.is_ready()
+    assert registry.preload_state == 'degraded'
+    assert registry.failed_preloads() == ['yolo11x']
+    assert 'yolo11x' in registry.preload_errors
+
+
+def test_required_preload_failure_is_retried(monkeypatch):
+    registry = _make_registry(fail={'yolo11n'})
+    registry.preload_retry_seconds = 60
+    # 后台重试改为同步执行，便于检查结果
+    start_preload = registry._start_preload
+    monkeypatch.setattr(registry, '_start_preload', lambda specs, background: start_preload(specs, False))
+    registry.preload(['yolo11n', 'yolo11s'], required=['yolo11n'])
+    assert not registry.is_ready()
+    assert registry.preload_state == 'failed'
+
+    registry.failing.clear()
+    # 模拟距上次尝试已超过重试间隔
+    registry._preload_started_at -= 60
+    assert registry.is_ready()
+    assert registry.preload_state == 'ready'
+    assert registry.preload_errors == {}
+
+
+def test_required_models_are_preloaded_even_if_not_listed():
+    registry = _make_registry()
+    registry.preload([], required=['yolo11n'])
+    assert registry.preload_targets == ['yolo11n']
+    assert registry.is_loaded('yolo11n')
+
+
+def test_no_retry_before_interval():
+    registry = _make_registry(fail={'yolo11n'})
+    registry.preload(['yolo11n'], required=['yolo11n'])
+    registry.failing.clear()
+    assert not registry.is_ready()
+    assert registry.preload_state == 'failed'
+
+
+def _load(registry, *names):
+    """依次加载模型并立即释放句柄"""
+    for name in names:
+        registry.get_handle(name).close()
+
+
+def test_lru_model_is_evicted_over_budget():
+    registry = _make_registry()
+    registry.memory_budget_mb = 25
+    _load(registry, 'stub-a', 'stub-b')
+    # 再次使用a，b成为最久未使用的模型
+    _load(registry, 'stub-a', 'stub-c')
+    assert registry.loaded_models() == ['stub-a', 'stub-c']
+    stats = registry.get_cache_stats()
+    assert stats['evictions'] == 1 and stats['over_budget_loads'] == 0
+    assert stats['hits'] == 1 and stats['misses'] == 3
+    assert stats['memory_used_mb'] == 20
+
+
+def test_held_handle_is_not_evicted():
+    registry = _make_registry()
+    registry.memory_budget_mb = 15
+    handle = registry.get_handle('stub-a')
+    _load(registry, 'stub-b')
+    # a被句柄持有，新加载的b同样保留，只记录超预算
+    assert registry.loaded_models() == ['stub-a', 'stub-b']
+    assert registry.get_cache_stats()['over_budget_loads'] == 1
+
+    handle.close()
+    _load(registry, 'stub-c')
+    assert registry.loaded_models() == ['stub-c']
+
+
+def test_model_in_use_is_not_evictable():
+    registry = _make_registry()
+    with registry.get_handle('stub-a'):
+        pass
+    entry = registry._models['stub-a']
+    assert entry.evictable
+    with entry.in_use():
+        assert not entry.evictable
+    assert entry.evictable
+
+
+def test_preloaded_models_are_never_evicted():
+    registry = _make_registry()
+    registry.memory_budget_mb = 15
+    registry.preload(['stub-a'])
+    _load(registry, 'stub-b', 'stub-c')
+    assert registry.loaded_models() == ['stub-a', 'stub-c']
+    assert registry.get_cache_stats()['evictions'] == 1
+
+
+def test_no_budget_keeps_all_models():
+    registry = _make_registry()
+    _load(registry, 'stub-a', 'stub-b', 'stub-c')
+    assert registry.loaded_models() == ['stub-a', 'stub-b', 'stub-c']
+    assert registry.get_cache_stats()['evictions'] == 0
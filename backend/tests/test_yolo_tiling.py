@@ -0,0 +1,104 @@
+"""切片窗口布局和切片结果合并NMS的测试"""
+import numpy as np
+import pytest
+
+from app.services.yolo_prediction import batched_nms
+from app.services.yolo_tiling import seam_aware_nms, tile_windows
+
+
+def _greedy_nms(boxes, scores, class_ids, threshold):
+    """逐框贪心的按类别NMS，作为参照实现"""
+    order = np.argsort(-scores, kind='stable')
+    keep = []
+    for i in order:
+        suppressed = False
+        for j in keep:
+            if class_ids[i] != class_ids[j]:
+                continue
+            w = max(0.0, min(boxes[i, 2], boxes[j, 2]) - max(boxes[i, 0], boxes[j, 0]))
+            h = max(0.0, min(boxes[i, 3], boxes[j, 3]) - max(boxes[i, 1], boxes[j, 1]))
+            inter = w * h
+            union = ((boxes[i, 2] - boxes[i, 0]) * (boxes[i, 3] - boxes[i, 1]) +
+                     (boxes[j, 2] - boxes[j, 0]) * (boxes[j, 3] - boxes[j, 1]) - inter)
+            if inter / union > threshold:
+                suppressed = True
+                break
+        if not suppressed:
+            keep.append(i)
+    return keep
+
+
+@pytest.mark.parametrize('height, width, tile_size, overlap', [
+    (1080, 1920, 640, 0.2),
+    (3000, 4000, 640, 0.25),
+    (641, 1281, 640, 0.0),
+    (5000, 700, 512, 0.5),
+])
+def test_tile_windows_cover_image_with_equal_tiles(height, width, tile_size, overlap):
+    windows = tile_windows(height, width, tile_size, overlap)
+    covered = np.zeros((height, width), dtype=bool)
+    for x1, y1, x2, y2 in windows:
+        assert (x2 - x1, y2 - y1) == (tile_size, tile_size)
+        assert 0 <= x1 and 0 <= y1 and x2 <= width and y2 <= height
+        covered[y1:y2, x1:x2] = True
+    assert covered.all()
+
+    # 相邻切片至少重叠overlap比例
+    xs = sorted({x1 for x1, _, _, _ in windows})
+    assert all(b - a <= int(tile_size * (1 - overlap)) for a, b in zip(xs, xs[1:]))
+
+
+def test_tile_windows_small_image_is_single_window():
+    assert tile_windows(480, 600, 640) == [(0, 0, 600, 480)]
+
+
+def test_batched_nms_matches_greedy_reference():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        n = int(rng.integers(1, 60))
+        xy = rng.uniform(0, 500, (n, 2))
+        wh = rng.uniform(5, 150, (n, 2))
+        boxes = np.concatenate([xy, xy + wh], axis=1)
+        scores = rng.uniform(0.05, 1.0, n)
+        class_ids = rng.integers(0, 3, n)
+        threshold = float(rng.uniform(0.3, 0.8))
+        keep = batched_nms(boxes, scores, class_ids, threshold)
+        assert sorted(keep.tolist()) == sorted(_greedy_nms(boxes, scores, class_ids, threshold))
+        # 按分数降序返回
+        assert np.all(np.diff(scores[keep]) <= 0)
+
+
+def test_batched_nms_empty():
+    assert batched_nms(np.zeros((0, 4)), np.zeros(0), np.zeros(0)).size == 0
+
+
+def _seam_nms(entries, threshold=0.6):
+    """entries为 (框, 分数, 类别, 来源, 是否被截断)"""
+    boxes = np.array([e[0] for e in entries], dtype=np.float32)
+    scores = np.array([e[1] for e in entries], dtype=np.float32)
+    class_ids = np.array([e[2] for e in entries])
+    sources = np.array([e[3] for e in entries])
+    truncated = np.array([e[4] for e in entries])
+    return sorted(seam_aware_nms(boxes, scores, class_ids, sources, truncated, threshold).tolist())
+
+
+def test_seam_nms_keeps_nested_objects_of_same_class():
+    # 人群框中的人：同类嵌套、均未被截断，IoS为1但不应合并
+    crowd = ([100, 100, 600, 400], 0.8, 0, 0, False)
+    person = ([150, 150, 220, 350], 0.9, 0, 1, False)
+    assert _seam_nms([crowd, person]) == [0, 1]
+
+
+def test_seam_nms_drops_truncated_fragment_even_with_higher_score():
+    # 切片边缘截断的半张桌子与整图推理得到的完整桌子
+    full = ([500, 200, 900, 400], 0.7, 60, 9, False)
+    fragment = ([500, 200, 640, 400], 0.95, 60, 0, True)
+    assert _seam_nms([full, fragment]) == [0]
+
+
+def test_seam_nms_keeps_truncated_box_without_larger_partner():
+    fragment = ([500, 200, 640, 400], 0.95, 60, 0, True)
+    other_class = ([500, 200, 900, 400], 0.7, 41, 9, False)
+    same_source = ([480, 180, 900, 420], 0.7, 60, 0, False)
+    assert _seam_nms([fragment, other_class]) == [0, 1]
+    assert _seam_nms([fragment, same_source]) == [0, 1]
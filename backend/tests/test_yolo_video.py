@@ -0,0 +1,98 @@
+"""视频检测的抽帧、运动门控和请求参数校验测试"""
+import cv2
+import numpy as np
+import pytest
+
+from app.services.yolo_video import SEEK_MIN_STRIDE, MotionGate, iter_sampled_frames
+from app.utils.helpers import is_non_negative_int, is_non_negative_number, is_positive_int
+
+
+@pytest.mark.parametrize('value, positive, non_negative', [
+    (5, True, True),
+    ('5', True, True),
+    (0, False, True),
+    ('0', False, True),
+    (-3, False, False),
+    ('1.5', False, False),
+    ('abc', False, False),
+    (None, False, False),
+])
+def test_integer_params(value, positive, non_negative):
+    assert is_positive_int(value) is positive
+    assert is_non_negative_int(value) is non_negative
+
+
+@pytest.mark.parametrize('value, expected', [
+    (2.0, True), ('0.5', True), (0, True), (-1, False), ('abc', False), ('nan', False), ('inf', False), (None, False),
+])
+def test_motion_threshold_param(value, expected):
+    assert is_non_negative_number(value) is expected
+
+
+def _write_video(path, count, fps=10):
+    """写入帧亮度依次为0, 2, 4...的测试视频，读回时可按亮度识别帧序号"""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), fps, (32, 32))
+    if not writer.isOpened():
+        pytest.skip('当前OpenCV不支持写入MJPG视频')
+    for index in range(count):
+        writer.write(np.full((32, 32, 3), index * 2, dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+
+def _frame_number(frame):
+    return int(round(frame.mean() / 2))
+
+
+@pytest.mark.parametrize('stride', [1, 3, SEEK_MIN_STRIDE])
+def test_iter_sampled_frames_stride(tmp_path, stride):
+    path = _write_video(tmp_path / 'clip.avi', 100)
+    frames = list(iter_sampled_frames(path, frame_stride=stride))
+
+    expected = list(range(0, 100, stride))
+    assert [index for index, _, _ in frames] == expected
+    assert [_frame_number(frame) for _, _, frame in frames] == expected
+    assert [timestamp for _, timestamp, _ in frames] == [index * 100.0 for index in expected]
+
+
+def test_iter_sampled_frames_max_frames(tmp_path):
+    path = _write_video(tmp_path / 'clip.avi', 20)
+    frames = list(iter_sampled_frames(path, frame_stride=2, max_frames=4))
+    assert [index for index, _, _ in frames] == [0, 2, 4, 6]
+
+
+def test_iter_sampled_frames_rejects_unreadable_file(tmp_path):
+    path = tmp_path / 'broken.avi'
+    path.write_bytes(b'not a video')
+    with pytest.raises(ValueError):
+        list(iter_sampled_frames(str(path)))
+
+
+def test_motion_gate_skips_static_frames():
+    gate = MotionGate(threshold=2.0)
+    frame = np.full((90, 120, 3), 100, dtype=np.uint8)
+
+    assert gate.check(frame) == (True, None)
+    run, motion = gate.check(frame + 1)
+    assert not run and motion == pytest.approx(1.0)
+
+    moved = frame.copy()
+    moved[:, :60] = 200
+    run, motion = gate.check(moved)
+    assert run and motion > 2.0
+
+
+def test_motion_gate_compares_with_last_inferred_frame():
+    gate = MotionGate(threshold=2.0)
+    frame = np.full((90, 120, 3), 100, dtype=np.uint8)
+    gate.check(frame)
+    # 每帧缓慢变化低于阈值，但累计差异超过阈值后仍会重新推理
+    assert not gate.check(frame + 1)[0]
+    assert gate.check(frame + 3)[0]
+
+
+def test_motion_gate_disabled_with_zero_threshold():
+    gate = MotionGate(threshold=0)
+    frame = np.zeros((90, 120, 3), dtype=np.uint8)
+    assert gate.check(frame) == (True, None)
+    assert gate.check(frame) == (True, None)